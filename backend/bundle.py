@@ -0,0 +1,522 @@
+###############################################################################
+# Model bundles
+#
+# A bundle is a directory holding everything the predictor needs to serve a
+# tree ensemble:
+#   manifest.json  - format version, feature schema, schema hash and metadata
+#   <block>.npy    - uncompressed NumPy arrays with the flattened trees
+#
+# Blocks are opened with np.load(mmap_mode='r'), so loading a bundle only reads
+# the manifest and the .npy headers, and every process serving the same bundle
+# shares the pages through the OS page cache.
+###############################################################################
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+if __package__ in (None, ''):
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.constants import APP_ROOT
+from backend.encoders import PLAYER_ABSENT, PLAYER_CT, PLAYER_PREFIX, PLAYER_T, TeamIdEncoder
+from backend.player_store import PLAYER_STAT_FEATURES
+
+BUNDLE_FORMAT_VERSION = 1
+BUNDLES_DIR = os.path.join(APP_ROOT, "model", "bundles")
+CURRENT_POINTER = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+
+NUMERIC_FEATURES = ['team_ct_current_equip_value', 'team_t_current_equip_value', 'round']
+
+# name -> dtype of every tree block stored in a bundle
+TREE_BLOCKS = {
+    'roots': np.int32,
+    'children_left': np.int32,
+    'children_right': np.int32,
+    'feature': np.int32,
+    'threshold': np.float64,
+    'proba': np.float64,
+}
+
+
+class BundleSchemaError(ValueError):
+    """Raised when a bundle does not match the feature schema it is used with."""
+
+
+def schema_hash(features: Iterable[str]) -> str:
+    """
+    Hash the ordered list of feature names.
+
+    Args:
+        features (Iterable[str]): Feature names in model column order.
+
+    Returns:
+        str: Hex sha256 digest identifying the column layout.
+    """
+    payload = json.dumps([str(f) for f in features], separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def new_version(kind: str = 'round_winner') -> str:
+    """
+    '<kind>-<UTC timestamp>-<random suffix>': sorts by time, and two exports
+    within the same second still get their own directory.
+    """
+    return f"{kind}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+class FeatureSchema():
+    """
+    Ordered feature layout of a model and the encoder for request rows.
+
+    Columns are addressed by name, so the layout stays valid when new maps or
+    players are appended at the end of the feature list.
+    """
+
+    def __init__(self, features: List[str], maps: List[str], players: List[str], numeric: List[str] = None):
+        self.features = [str(f) for f in features]
+        self.maps = [str(m) for m in maps]
+        self.players = [str(p) for p in players]
+        self.numeric = list(NUMERIC_FEATURES if numeric is None else numeric)
+        self.index = {name: i for i, name in enumerate(self.features)}
+
+        missing = [c for c in self.maps + self.numeric + self.player_columns if c not in self.index]
+        if missing:
+            raise BundleSchemaError(f"Schema lists columns that are not features: {missing[:5]}")
+        if len(self.index) != len(self.features):
+            raise BundleSchemaError("Schema has duplicated feature names")
+
+        self.map_idx = np.array([self.index[m] for m in self.maps], dtype=np.int64)
+        self.player_idx = np.array([self.index[c] for c in self.player_columns], dtype=np.int64)
+        # The training encoder, fixed to this schema's players
+        self.team_ids = TeamIdEncoder.from_classes(self.players)
+
+    @property
+    def player_columns(self) -> List[str]:
+        return [f'{PLAYER_PREFIX}{p}' for p in self.players]
+
+    @property
+    def player_stat_features(self) -> List[str]:
+        # Numeric columns that come from the player store, which the rows must be given
+        return [name for name in self.numeric if name in PLAYER_STAT_FEATURES]
+
+    @property
+    def n_features(self) -> int:
+        return len(self.features)
+
+    @property
+    def hash(self) -> str:
+        return schema_hash(self.features)
+
+    @classmethod
+    def from_feature_names(cls, feature_names: Iterable[str]) -> "FeatureSchema":
+        """
+        Infer the schema from the column names a model was fitted with.
+
+        Player columns start with 'player_', the numeric columns are the fixed
+        ones plus the player store features (backend.player_store) and every
+        other column is a one-hot encoded map.
+        """
+        features = [str(f) for f in feature_names]
+        players = [f[len(PLAYER_PREFIX):] for f in features if f.startswith(PLAYER_PREFIX)]
+        numeric = [f for f in NUMERIC_FEATURES + PLAYER_STAT_FEATURES if f in features]
+        maps = [f for f in features if not f.startswith(PLAYER_PREFIX) and f not in numeric]
+        return cls(features, maps, players, numeric)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FeatureSchema":
+        return cls(data['features'], data['maps'], data['players'], data.get('numeric'))
+
+    def to_dict(self) -> dict:
+        return {
+            'features': self.features,
+            'maps': self.maps,
+            'players': self.players,
+            'numeric': self.numeric,
+            'encoding': {'absent': PLAYER_ABSENT, 'ct': PLAYER_CT, 't': PLAYER_T},
+        }
+
+    def extend(self, maps: Iterable[str] = (), players: Iterable[str] = (),
+               numeric: Iterable[str] = ()) -> "FeatureSchema":
+        """
+        The schema with unseen maps, players and numeric features appended as new columns.
+
+        Existing columns keep their index, so a model fitted on this schema
+        still reads the right values from rows encoded with the extended one.
+        """
+        new_maps = [str(m) for m in dict.fromkeys(maps) if str(m) not in self.maps]
+        new_players = [str(p) for p in dict.fromkeys(players) if str(p) not in set(self.players)]
+        new_numeric = [str(n) for n in dict.fromkeys(numeric) if str(n) not in self.numeric]
+        if not new_maps and not new_players and not new_numeric:
+            return self
+        return FeatureSchema(self.features + new_maps + [f'{PLAYER_PREFIX}{p}' for p in new_players] + new_numeric,
+                             self.maps + new_maps, self.players + new_players, self.numeric + new_numeric)
+
+    def map_column(self, map_name: str) -> Optional[int]:
+        # Same rule as the training one-hot: the first known map contained in the name
+        for m, idx in zip(self.maps, self.map_idx):
+            if m in (map_name or ''):
+                return int(idx)
+        return None
+
+    def encode_rows(self, rows: List[dict]) -> np.ndarray:
+        """
+        Encode request rows into the model's column order.
+
+        Args:
+            rows (List[dict]): Each row has 'map', 'ct_players', 't_players' and
+                every numeric feature of the schema by name (None counts as 0).
+
+        Returns:
+            np.ndarray: float32 matrix of shape (len(rows), n_features).
+
+        Raises:
+            BundleSchemaError: A row lacks a numeric feature.
+        """
+        X = np.zeros((len(rows), self.n_features), dtype=np.float32)
+        for i, row in enumerate(rows):
+            col = self.map_column(row.get('map'))
+            if col is not None:
+                X[i, col] = 1
+            for name in self.numeric:
+                if name not in row:
+                    raise BundleSchemaError(f"Row has no value for the numeric feature {name!r}")
+                X[i, self.index[name]] = row[name] or 0
+        player_rows, player_cols, values = self.team_ids.encode([row.get('ct_players') or [] for row in rows],
+                                                                [row.get('t_players') or [] for row in rows])
+        X[player_rows, self.player_idx[player_cols]] = values
+        return X
+
+    def encode_frame(self, df):
+        """
+        Encode a round summaries frame (map_name, team_ct_players,
+        team_t_players and the numeric columns) for training.
+
+        Returns:
+            scipy.sparse.csr_matrix: float32 matrix of shape (len(df), n_features).
+
+        Raises:
+            BundleSchemaError: The frame lacks a numeric column of the schema
+                (e.g. the player store features, see model/player_stats.py).
+        """
+        from scipy.sparse import csr_matrix
+
+        missing = [name for name in self.numeric if name not in df]
+        if missing:
+            raise BundleSchemaError(f"Frame has no column for the numeric features {missing}")
+        n_rows = len(df)
+        map_of = {m: self.map_column(m) for m in df['map_name'].unique()}
+        map_cols = np.array([-1 if map_of[m] is None else map_of[m] for m in df['map_name']], dtype=np.int64)
+        rows, cols, values = [np.flatnonzero(map_cols >= 0)], [map_cols[map_cols >= 0]], [np.ones((map_cols >= 0).sum())]
+        for name in self.numeric:
+            rows.append(np.arange(n_rows))
+            cols.append(np.full(n_rows, self.index[name]))
+            values.append(df[name].to_numpy(dtype=np.float64))
+        player_rows, player_cols, player_values = self.team_ids.encode(df['team_ct_players'].tolist(),
+                                                                       df['team_t_players'].tolist())
+        rows.append(player_rows)
+        cols.append(self.player_idx[player_cols])
+        values.append(player_values)
+        return csr_matrix((np.concatenate(values).astype(np.float32),
+                           (np.concatenate(rows), np.concatenate(cols))), shape=(n_rows, self.n_features))
+
+
+class ForestBundle():
+    """
+    A loaded bundle: the feature schema plus a tree ensemble evaluated with NumPy
+    directly on the (memory-mapped) node arrays.
+    """
+
+    def __init__(self, path: str, manifest: dict, blocks: Dict[str, np.ndarray]):
+        self.path = path
+        self.manifest = manifest
+        self.version = manifest['version']
+        self.kind = manifest.get('kind')
+        self.metadata = manifest.get('metadata', {})
+        self.schema = FeatureSchema.from_dict(manifest['schema'])
+        self.schema_hash = manifest['schema_hash']
+        self.classes_ = np.asarray(manifest['classes'])
+        self.blocks = blocks
+        self.n_trees = int(blocks['roots'].shape[0])
+
+    def predict_proba(self, X) -> np.ndarray:
+        """
+        Average the leaf class probabilities of every tree, like
+        RandomForestClassifier.predict_proba.
+
+        Args:
+            X: Array of shape (n_rows, n_features) in schema column order.
+
+        Returns:
+            np.ndarray: Probabilities of shape (n_rows, n_classes), ordered as classes_.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.schema.n_features:
+            raise BundleSchemaError(
+                f"Expected {self.schema.n_features} features, got array of shape {X.shape}")
+
+        left = self.blocks['children_left']
+        right = self.blocks['children_right']
+        feature = self.blocks['feature']
+        threshold = self.blocks['threshold']
+
+        n_rows = X.shape[0]
+        # Walk every (tree, row) pair down one level per iteration
+        nodes = np.repeat(np.asarray(self.blocks['roots'], dtype=np.int64), n_rows)
+        rows = np.tile(np.arange(n_rows), self.n_trees)
+        active = np.flatnonzero(feature[nodes] >= 0)
+        while active.size:
+            cur = nodes[active]
+            go_left = X[rows[active], feature[cur]] <= threshold[cur]
+            nodes[active] = np.where(go_left, left[cur], right[cur])
+            active = active[feature[nodes[active]] >= 0]
+
+        proba = self.blocks['proba'][nodes].reshape(self.n_trees, n_rows, -1)
+        return proba.mean(axis=0)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def _flatten_trees(estimators) -> Dict[str, np.ndarray]:
+    # Concatenate every tree's node arrays, shifting child indices to global offsets
+    roots, left, right, feature, threshold, proba = [], [], [], [], [], []
+    offset = 0
+    for est in estimators:
+        tree = est.tree_
+        n = tree.node_count
+        is_leaf = tree.children_left == -1
+        roots.append(offset)
+        left.append(np.where(is_leaf, -1, tree.children_left + offset))
+        right.append(np.where(is_leaf, -1, tree.children_right + offset))
+        feature.append(np.where(is_leaf, -1, tree.feature))
+        threshold.append(tree.threshold)
+        value = tree.value[:, 0, :].astype(np.float64)
+        normalizer = value.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0] = 1
+        proba.append(value / normalizer)
+        offset += n
+
+    return {
+        'roots': np.asarray(roots, dtype=np.int32),
+        'children_left': np.concatenate(left).astype(np.int32),
+        'children_right': np.concatenate(right).astype(np.int32),
+        'feature': np.concatenate(feature).astype(np.int32),
+        'threshold': np.concatenate(threshold).astype(np.float64),
+        'proba': np.vstack(proba).astype(np.float64),
+    }
+
+
+def _write_bundle(out_dir: str, blocks: Dict[str, np.ndarray], schema: FeatureSchema,
+                  classes, kind: str, version: str, metadata: Optional[dict]) -> str:
+    manifest = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'kind': kind,
+        'version': version,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'schema': schema.to_dict(),
+        'schema_hash': schema.hash,
+        'classes': [c.item() if hasattr(c, 'item') else c for c in classes],
+        'blocks': {name: {'file': f'{name}.npy', 'dtype': np.dtype(TREE_BLOCKS[name]).str,
+                          'shape': list(blocks[name].shape)} for name in TREE_BLOCKS},
+        'metadata': metadata or {},
+    }
+
+    # Write into a temporary sibling and rename, so a half written bundle is never visible
+    parent = os.path.dirname(os.path.abspath(out_dir))
+    os.makedirs(parent, exist_ok=True)
+    if os.path.exists(out_dir):
+        raise FileExistsError(f"Bundle already exists: {out_dir}")
+    tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=parent)
+    try:
+        os.chmod(tmp_dir, 0o755)
+        for name, dtype in TREE_BLOCKS.items():
+            np.save(os.path.join(tmp_dir, f'{name}.npy'), np.ascontiguousarray(blocks[name], dtype=dtype))
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_dir, out_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return out_dir
+
+
+def export_bundle(model, out_dir: str = None, schema: FeatureSchema = None, kind: str = 'round_winner',
+                  version: str = None, metadata: Optional[dict] = None) -> str:
+    """
+    Export a fitted sklearn tree ensemble (or single decision tree) as a bundle.
+
+    Args:
+        model: Fitted RandomForestClassifier / ExtraTreesClassifier / DecisionTreeClassifier.
+        out_dir (str): Bundle directory. Defaults to BUNDLES_DIR/<version>.
+        schema (FeatureSchema): Feature layout. Defaults to the one inferred from
+            model.feature_names_in_, which is the order the model was fitted with.
+        kind (str): Bundle kind, used to name the default version.
+        version (str): Bundle version. Defaults to new_version(kind).
+        metadata (dict): Training metadata stored in the manifest.
+
+    Returns:
+        str: Path of the written bundle.
+    """
+    if schema is None:
+        if not hasattr(model, 'feature_names_in_'):
+            raise BundleSchemaError("Model was fitted without feature names; pass a schema")
+        schema = FeatureSchema.from_feature_names(model.feature_names_in_)
+    if getattr(model, 'n_features_in_', schema.n_features) != schema.n_features:
+        raise BundleSchemaError(
+            f"Model has {model.n_features_in_} features but schema has {schema.n_features}")
+    if hasattr(model, 'feature_names_in_') and list(map(str, model.feature_names_in_)) != schema.features:
+        raise BundleSchemaError("Model feature names do not match the schema order")
+
+    estimators = getattr(model, 'estimators_', [model])
+    version = version or new_version(kind)
+    out_dir = out_dir or os.path.join(BUNDLES_DIR, version)
+
+    meta = {
+        'estimator': type(model).__name__,
+        'params': {k: v for k, v in model.get_params().items() if isinstance(v, (int, float, str, bool, type(None)))},
+        'n_trees': len(estimators),
+    }
+    try:
+        import sklearn
+        meta['sklearn_version'] = sklearn.__version__
+    except ImportError:
+        pass
+    meta.update(metadata or {})
+
+    return _write_bundle(out_dir, _flatten_trees(estimators), schema, model.classes_, kind, version, meta)
+
+
+def load_bundle(path: str, expected_schema_hash: str = None, mmap_mode: Optional[str] = 'r') -> ForestBundle:
+    """
+    Load a bundle, memory-mapping its tree blocks.
+
+    Args:
+        path (str): Bundle directory.
+        expected_schema_hash (str): Fail if the bundle's schema hash differs.
+        mmap_mode (str): Passed to np.load; None reads the blocks into memory.
+
+    Returns:
+        ForestBundle: The loaded bundle.
+
+    Raises:
+        BundleSchemaError: If the manifest, schema or blocks are inconsistent.
+    """
+    with open(os.path.join(path, MANIFEST_FILE), 'r') as f:
+        manifest = json.load(f)
+
+    if manifest.get('format_version') != BUNDLE_FORMAT_VERSION:
+        raise BundleSchemaError(f"Unsupported bundle format: {manifest.get('format_version')}")
+    features = manifest['schema']['features']
+    if schema_hash(features) != manifest.get('schema_hash'):
+        raise BundleSchemaError(f"Schema hash mismatch in {path}: manifest does not match its features")
+    if expected_schema_hash is not None and manifest['schema_hash'] != expected_schema_hash:
+        raise BundleSchemaError(
+            f"Bundle {manifest['version']} has schema {manifest['schema_hash'][:12]}, expected {expected_schema_hash[:12]}")
+
+    blocks = {}
+    for name in TREE_BLOCKS:
+        spec = manifest['blocks'][name]
+        arr = np.load(os.path.join(path, spec['file']), mmap_mode=mmap_mode, allow_pickle=False)
+        if list(arr.shape) != spec['shape'] or arr.dtype.str != spec['dtype']:
+            raise BundleSchemaError(f"Block {name} does not match the manifest in {path}")
+        blocks[name] = arr
+
+    n_nodes = blocks['feature'].shape[0]
+    if blocks['proba'].shape != (n_nodes, len(manifest['classes'])):
+        raise BundleSchemaError(f"Block proba has shape {blocks['proba'].shape}, expected ({n_nodes}, {len(manifest['classes'])})")
+    if n_nodes and int(blocks['feature'].max()) >= len(features):
+        raise BundleSchemaError("Trees reference features outside the schema")
+
+    return ForestBundle(path, manifest, blocks)
+
+
+def publish_bundle(bundle_dir: str, bundles_dir: str = BUNDLES_DIR) -> None:
+    """Point CURRENT at a bundle directory, atomically replacing the previous pointer."""
+    load_bundle(bundle_dir)  # refuse to publish a broken bundle
+    pointer = os.path.join(bundles_dir, CURRENT_POINTER)
+    tmp = f"{pointer}.tmp-{os.getpid()}"
+    with open(tmp, 'w') as f:
+        f.write(os.path.relpath(os.path.abspath(bundle_dir), bundles_dir) + "\n")
+    os.replace(tmp, pointer)
+
+
+def current_bundle_path(bundles_dir: str = BUNDLES_DIR) -> Optional[str]:
+    """Return the directory CURRENT points at, or None if nothing is published."""
+    pointer = os.path.join(bundles_dir, CURRENT_POINTER)
+    if not os.path.isfile(pointer):
+        return None
+    with open(pointer, 'r') as f:
+        name = f.read().strip()
+    return os.path.join(bundles_dir, name) if name else None
+
+
+def load_current_bundle(bundles_dir: str = BUNDLES_DIR, expected_schema_hash: str = None) -> Optional[ForestBundle]:
+    path = current_bundle_path(bundles_dir)
+    if path is None:
+        return None
+    return load_bundle(path, expected_schema_hash=expected_schema_hash)
+
+
+def _main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export, inspect and publish model bundles")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    exp = sub.add_parser('export', help="Export a joblib-pickled tree ensemble as a bundle")
+    exp.add_argument('model_path')
+    exp.add_argument('--out', default=None, help="Bundle directory (default: model/bundles/<version>)")
+    exp.add_argument('--version', default=None)
+    exp.add_argument('--kind', default='round_winner')
+    exp.add_argument('--publish', action='store_true', help="Point CURRENT at the new bundle")
+
+    ins = sub.add_parser('inspect', help="Validate a bundle and print its manifest summary")
+    ins.add_argument('bundle_dir', nargs='?', default=None)
+
+    pub = sub.add_parser('publish', help="Point CURRENT at an existing bundle")
+    pub.add_argument('bundle_dir')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        import joblib
+        model = joblib.load(args.model_path)
+        out = export_bundle(model, out_dir=args.out, kind=args.kind, version=args.version,
+                            metadata={'source': os.path.basename(args.model_path)})
+        print(f"✅ Bundle written to {out}")
+        if args.publish:
+            publish_bundle(out)
+            print(f"✅ Published {os.path.basename(out)}")
+    elif args.command == 'inspect':
+        path = args.bundle_dir or current_bundle_path()
+        if path is None:
+            parser.error("No bundle given and nothing published")
+        bundle = load_bundle(path)
+        print(json.dumps({
+            'version': bundle.version,
+            'kind': bundle.kind,
+            'schema_hash': bundle.schema_hash,
+            'n_features': bundle.schema.n_features,
+            'maps': bundle.schema.maps,
+            'n_players': len(bundle.schema.players),
+            'n_trees': bundle.n_trees,
+            'n_nodes': int(bundle.blocks['feature'].shape[0]),
+            'classes': bundle.classes_.tolist(),
+            'metadata': bundle.metadata,
+        }, indent=2))
+    elif args.command == 'publish':
+        publish_bundle(args.bundle_dir)
+        print(f"✅ Published {os.path.basename(os.path.abspath(args.bundle_dir))}")
+
+
+if __name__ == "__main__":
+    _main()
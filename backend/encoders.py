@@ -0,0 +1,187 @@
+###############################################################################
+# Feature encoders shared by training and serving
+#
+# TeamIdEncoder is the player-column encoding of the round winner model. The
+# training pipeline uses it as a scikit-learn transformer and the predictor
+# uses the same class through FeatureSchema, so both sides write the same
+# values in the same columns. It only needs NumPy (and SciPy for the sparse
+# output), which keeps scikit-learn out of the serving processes.
+###############################################################################
+
+import itertools
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+PLAYER_PREFIX = 'player_'
+
+# Values written in a player column, matching the encoding the model was trained with
+PLAYER_ABSENT, PLAYER_CT, PLAYER_T = 0, 2, 3
+
+
+def _flatten(lists) -> Tuple[np.ndarray, np.ndarray]:
+    # (row of every id, every id) for a sequence of id lists; ids stay integers when they all are
+    lists = [l if l is not None else () for l in lists]
+    lengths = np.fromiter((len(l) for l in lists), dtype=np.int64, count=len(lists))
+    ids = np.array(list(itertools.chain.from_iterable(lists)))
+    if ids.dtype.kind not in 'iuU':
+        ids = ids.astype(str)
+    return np.repeat(np.arange(len(lists), dtype=np.int64), lengths), ids
+
+
+def _concat_ids(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if a.dtype.kind in 'iu' and b.dtype.kind in 'iu':
+        return np.concatenate([a.astype(np.uint64), b.astype(np.uint64)])
+    return np.concatenate([a.astype(str), b.astype(str)])
+
+
+class TeamIdEncoder():
+    """
+    One column per known player: ct_value when the player is on the CT side
+    of the row, t_value on the T side, absent otherwise.
+
+    Works as a drop-in scikit-learn transformer on two columns of id lists
+    (['team_ct_players', 'team_t_players']): it has fit, transform,
+    get_feature_names_out, get_params and __sklearn_tags__, so Pipeline,
+    ColumnTransformer, clone and cross-validation accept it without
+    scikit-learn being imported when the module loads. transform
+    returns a scipy.sparse CSR matrix, since only ten of the columns are set
+    in a row. The ids are looked up in one vectorized searchsorted over the
+    whole input, on uint64 keys when every known id is a number (steamids)
+    and on strings otherwise. A player listed on both sides gets t_value.
+
+    Args:
+        ct_value (int): Value for CT players.
+        t_value (int): Value for T players.
+        dtype: dtype of the output.
+        sparse_output (bool): CSR output; False for a dense ndarray.
+    """
+
+    def __init__(self, ct_value=PLAYER_CT, t_value=PLAYER_T, dtype=np.float32, sparse_output=True):
+        self.ct_value = ct_value
+        self.t_value = t_value
+        self.dtype = dtype
+        self.sparse_output = sparse_output
+
+    def get_params(self, deep=True) -> dict:
+        return {'ct_value': self.ct_value, 't_value': self.t_value, 'dtype': self.dtype,
+                'sparse_output': self.sparse_output}
+
+    def set_params(self, **params) -> "TeamIdEncoder":
+        for name, value in params.items():
+            if name not in self.get_params():
+                raise ValueError(f"Invalid parameter {name!r} for TeamIdEncoder")
+            setattr(self, name, value)
+        return self
+
+    def __sklearn_tags__(self):
+        # Only scikit-learn asks for tags, so it is imported here and never by the predictor
+        from sklearn.utils import InputTags, Tags, TargetTags, TransformerTags
+        return Tags(estimator_type=None, target_tags=TargetTags(required=False),
+                    # The output dtype is the dtype parameter, whatever the input
+                    transformer_tags=TransformerTags(preserves_dtype=[]),
+                    input_tags=InputTags(two_d_array=True))
+
+    def __repr__(self):
+        changed = {k: v for k, v in self.get_params().items() if v != TeamIdEncoder().get_params()[k]}
+        return f"TeamIdEncoder({', '.join(f'{k}={v!r}' for k, v in changed.items())})"
+
+    @staticmethod
+    def _split(X) -> Tuple[list, list]:
+        # DataFrame or (n, 2) array-like of [ct ids, t ids]
+        if hasattr(X, 'iloc'):
+            return X.iloc[:, 0].tolist(), X.iloc[:, 1].tolist()
+        X = list(X)
+        return [r[0] for r in X], [r[1] for r in X]
+
+    def _set_classes(self, classes: np.ndarray):
+        # classes_ are always strings; lookups use integer keys when they round-trip exactly
+        self.classes_ = classes.astype(str)
+        keys = self.classes_
+        if len(keys) and np.char.isdigit(keys).all() and np.char.str_len(keys).max() < 20:
+            numeric = keys.astype(np.uint64)
+            if np.array_equal(numeric.astype(str), keys):
+                keys = numeric
+        self._numeric = keys.dtype.kind == 'u'
+        self._order = np.argsort(keys, kind='stable')
+        self._sorted = keys[self._order]
+        self.n_features_out_ = len(keys)
+
+    def fit(self, X, y=None) -> "TeamIdEncoder":
+        ct, t = self._split(X)
+        # np.unique sorts numerically for integer ids, like sorted() did
+        self._set_classes(np.unique(_concat_ids(_flatten(ct)[1], _flatten(t)[1])))
+        return self
+
+    @classmethod
+    def from_classes(cls, classes: Iterable, **params) -> "TeamIdEncoder":
+        """A fitted encoder with the given player columns, in that order (e.g. a bundle's players)."""
+        encoder = cls(**params)
+        encoder._set_classes(np.asarray([str(c) for c in classes], dtype=str))
+        return encoder
+
+    def _keys(self, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # ids in the dtype of the sorted classes, and which of them can match at all
+        if not self._numeric:
+            return ids.astype(str), np.ones(len(ids), dtype=bool)
+        if ids.dtype.kind in 'iu':
+            return ids.astype(np.uint64), ids >= 0
+        ids = ids.astype(str)
+        valid = np.char.isdigit(ids) & (np.char.str_len(ids) < 20)
+        keys = np.zeros(len(ids), dtype=np.uint64)
+        keys[valid] = ids[valid].astype(np.uint64)
+        # '007' is not the player '7'
+        valid[valid] = keys[valid].astype(str) == ids[valid]
+        return keys, valid
+
+    def _lookup(self, ids: np.ndarray) -> np.ndarray:
+        # Column of every id, -1 when unknown
+        if not len(self._sorted) or not len(ids):
+            return np.full(len(ids), -1, dtype=np.int64)
+        keys, valid = self._keys(ids)
+        pos = np.minimum(np.searchsorted(self._sorted, keys), len(self._sorted) - 1)
+        return np.where(valid & (self._sorted[pos] == keys), self._order[pos], -1)
+
+    def encode(self, ct_lists: List[list], t_lists: List[list]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Row, column and value of every set cell, sorted by row then column.
+
+        Args:
+            ct_lists (list): CT player ids of each row.
+            t_lists (list): T player ids of each row.
+
+        Returns:
+            tuple: (rows, columns, values) arrays; unknown players are dropped.
+        """
+        ct_rows, ct_ids = _flatten(ct_lists)
+        t_rows, t_ids = _flatten(t_lists)
+        rows = np.concatenate([ct_rows, t_rows])
+        cols = np.concatenate([self._lookup(ct_ids), self._lookup(t_ids)])
+        values = np.concatenate([np.full(len(ct_ids), self.ct_value), np.full(len(t_ids), self.t_value)])
+        known = cols >= 0
+        rows, cols, values = rows[known], cols[known], values[known]
+
+        # One value per cell, the last one written (T wins over CT)
+        keys = rows * max(self.n_features_out_, 1) + cols
+        _, last = np.unique(keys[::-1], return_index=True)
+        keep = len(keys) - 1 - last
+        return rows[keep], cols[keep], values[keep].astype(self.dtype)
+
+    def transform(self, X):
+        ct, t = self._split(X)
+        n_rows = len(ct)
+        rows, cols, values = self.encode(ct, t)
+        if not self.sparse_output:
+            out = np.full((n_rows, self.n_features_out_), PLAYER_ABSENT, dtype=self.dtype)
+            out[rows, cols] = values
+            return out
+        from scipy.sparse import csr_matrix
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+        return csr_matrix((values, cols, indptr), shape=(n_rows, self.n_features_out_))
+
+    def fit_transform(self, X, y=None):
+        return self.fit(X, y).transform(X)
+
+    def get_feature_names_out(self, input_features=None) -> np.ndarray:
+        return np.asarray([f"{PLAYER_PREFIX}{c}" for c in self.classes_], dtype=object)
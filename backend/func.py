@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from demoparser2 import DemoParser
 from backend.constants import MAPS_BACKGROUND_DIR, REASON_MAP, STATUS_MAP, DEMOS_DIR
@@ -10,6 +11,7 @@ class DemoProcessing():
         self.demo_path = demo_path
         self.header = None
         self.ticks_df = None
+        self.rounds = None
 
         if not isinstance(demo_path, str):
             raise ValueError("demo_path must be a string")
@@ -47,11 +49,14 @@ class DemoProcessing():
         self.ticks_df.drop(columns=['round_win_reason'], inplace=True)
 
     def _calculate_t_ct_alive_counts(self) -> pd.DataFrame:
-        self.ticks_df["t_alive"] = self.ticks_df.groupby(
-            "tick")["team_name"].transform(lambda x: (x == "TERRORIST").sum())
-        self.ticks_df["ct_alive"] = self.ticks_df.groupby(
-            "tick")["team_name"].transform(lambda x: (x == "CT").sum())
-        
+        # Dead players are still listed on every tick, with 0 health
+        alive = self.ticks_df["health"] > 0
+        by_tick = self.ticks_df["tick"]
+        self.ticks_df["t_alive"] = (alive & (self.ticks_df["team_name"] == "TERRORIST")).groupby(
+            by_tick).transform("sum").astype("int8")
+        self.ticks_df["ct_alive"] = (alive & (self.ticks_df["team_name"] == "CT")).groupby(
+            by_tick).transform("sum").astype("int8")
+
     def _set_target_column(self) -> pd.DataFrame:
         """
         Set target should be the end result of the round for each tick,
@@ -61,26 +66,19 @@ class DemoProcessing():
         self.ticks_df.drop(columns=['round_win_status'], inplace=True)
 
     def _get_rounds_start_end_times(self) -> List[tuple]:
-        rounds = []
-        round_start_tick = None
-        previous_tick = None
-
-        for tick in self.ticks_df['tick'].unique():
-            if round_start_tick is None:
-                round_start_tick = tick
-            elif previous_tick is not None and tick != previous_tick + 1:
-                rounds.append((round_start_tick, previous_tick))
-                round_start_tick = tick
-            previous_tick = tick
-
-        if round_start_tick is not None and previous_tick is not None:
-            rounds.append((round_start_tick, previous_tick))
-
-        return rounds
+        # A round is a run of consecutive ticks; freeze time and warmup leave gaps
+        ticks = np.unique(self.ticks_df['tick'].to_numpy())
+        if len(ticks) == 0:
+            return []
+        gaps = np.flatnonzero(np.diff(ticks) != 1)
+        starts = np.concatenate([[ticks[0]], ticks[gaps + 1]])
+        ends = np.concatenate([ticks[gaps], [ticks[-1]]])
+        return [(int(start), int(end)) for start, end in zip(starts, ends)]
 
     def preprocess_ticks(self) -> pd.DataFrame:
         self.ticks_df = self.parser.parse_ticks(wanted_props=['tick', 'X', 'Y', 'health', 'weapon_name', 'is_freeze_period', 'is_warmup_period',
-                                                'team_name', 'round_win_status', 'round_win_reason', 'bomb_planted', 'round_start_time', 'is_bomb_planted', 'game_time'])
+                                                'team_name', 'round_win_status', 'round_win_reason', 'bomb_planted', 'round_start_time', 'is_bomb_planted', 'game_time',
+                                                'total_rounds_played'])
 
         header = self.parser.parse_header()
         header['demo_path'] = self.demo_path
@@ -91,7 +89,26 @@ class DemoProcessing():
         self._calculate_t_ct_alive_counts()
         self._set_target_column()
 
-        print(self._get_rounds_start_end_times(self.ticks_df))
+        self.rounds = self._get_rounds_start_end_times()
+        return self.ticks_df
+
+    def win_probability(self, model=None, time_step: float = None) -> pd.DataFrame:
+        """
+        In-round win probability of every state change of the preprocessed
+        ticks (see backend.inround.score_ticks).
+
+        Args:
+            model (InRoundModel): Defaults to the one saved at INROUND_MODEL_PATH.
+            time_step (float): Also score every time_step seconds without a change.
+
+        Returns:
+            pd.DataFrame: round, tick, seconds, alive counts, bomb_planted, p_ct and p_t.
+        """
+        from backend.inround import DEFAULT_TIME_STEP, InRoundModel, score_ticks
+        if self.ticks_df is None:
+            self.preprocess_ticks()
+        model = model or InRoundModel.load()
+        return score_ticks(self.ticks_df, model, DEFAULT_TIME_STEP if time_step is None else time_step)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,499 @@
+###############################################################################
+# Position heatmaps
+#
+# Player positions (X, Y from parse_ticks) are converted to radar coordinates
+# with the map's overview calibration and counted on a bins x bins grid with
+# one np.bincount per chunk. Demos are parsed in tick windows (every
+# tick_stride-th tick only), so building a heatmap over many demos only holds
+# one chunk of ticks plus the count grids in memory.
+#
+# Two cache levels, both keyed by content (demo path, size and mtime, map,
+# stride, and for tiles the filters and sizes):
+#   counts/<key>.npz   every position of one demo by team, phase and weapon on a
+#                      COUNT_BINS grid, whatever the filters: any filter and any
+#                      bins that divides COUNT_BINS is computed from it, so a
+#                      demo is parsed once and a new demo only parses that demo
+#   tiles/<key>.png    the rendered tile, so a repeated view reads one file; at
+#                      most MAX_CACHED_TILES are kept, the oldest are removed
+###############################################################################
+
+import os
+import io
+import sys
+import json
+import hashlib
+from glob import glob
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+if __package__ in (None, ''):
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.constants import APP_ROOT, DEMOS_DIR, MAPS_BACKGROUND_DIR
+from backend.valuation import ALIASES, normalize_name
+
+HEATMAP_CACHE_DIR = os.path.join(APP_ROOT, "model", "cache", "heatmaps")
+# Bump when the counting or the rendering changes, to invalidate the caches
+CACHE_FORMAT = 2
+
+HEATMAP_PROPS = ['tick', 'X', 'Y', 'health', 'team_name', 'weapon_name', 'is_freeze_period', 'is_warmup_period',
+                 'is_bomb_planted']
+
+# Overview calibration from the game's resource/overviews/<map>.txt: world
+# coordinates of the radar's top-left corner and world units per radar pixel,
+# for a 1024 px radar. Multi-level maps (de_nuke) are drawn on the upper level.
+MAP_CALIBRATION = {
+    'de_ancient': {'pos_x': -2953, 'pos_y': 2164, 'scale': 5.0},
+    'de_anubis': {'pos_x': -2796, 'pos_y': 3328, 'scale': 5.22},
+    'de_canals': {'pos_x': -2496, 'pos_y': 1792, 'scale': 4.0},
+    'de_cbble': {'pos_x': -3840, 'pos_y': 3072, 'scale': 6.0},
+    'de_dust2': {'pos_x': -2476, 'pos_y': 3239, 'scale': 4.4},
+    'de_inferno': {'pos_x': -2087, 'pos_y': 3870, 'scale': 4.9},
+    'de_mirage': {'pos_x': -3230, 'pos_y': 1713, 'scale': 5.0},
+    'de_nuke': {'pos_x': -3453, 'pos_y': 2887, 'scale': 7.0},
+    'de_overpass': {'pos_x': -4831, 'pos_y': 1781, 'scale': 5.2},
+    'de_train': {'pos_x': -2308, 'pos_y': 2078, 'scale': 4.082077},
+    'de_vertigo': {'pos_x': -3168, 'pos_y': 1762, 'scale': 4.0},
+}
+RADAR_SIZE = 1024
+
+TEAMS = {'ct': 'CT', 't': 'TERRORIST'}
+PHASES = ('freeze', 'live', 'post_plant')
+
+# Weapons in hand as the parser names them (weapon_name); filters accept any
+# spelling with the same normalize_name, and the dashboard's names
+HEATMAP_WEAPONS = [
+    'AK-47', 'M4A1-S', 'M4A4', 'AUG', 'SG 553', 'FAMAS', 'Galil AR', 'AWP', 'SSG 08', 'G3SG1', 'SCAR-20',
+    'MP9', 'MAC-10', 'MP7', 'UMP-45', 'P90', 'PP-Bizon', 'MP5-SD', 'Nova', 'XM1014', 'Sawed-Off', 'MAG-7',
+    'Negev', 'M249', 'Desert Eagle', 'R8 Revolver', 'P250', 'Five-SeveN', 'CZ75-Auto', 'Tec-9', 'USP-S',
+    'P2000', 'Glock-18', 'Dual Berettas', 'Zeus x27', 'knife', 'C4 Explosive', 'High Explosive Grenade',
+    'Flashbang', 'Smoke Grenade', 'Molotov', 'Incendiary Grenade', 'Decoy Grenade',
+]
+# Code 0 is any other weapon (or none)
+WEAPON_CODES = {normalize_name(name): code for code, name in enumerate(HEATMAP_WEAPONS, start=1)}
+for _parser_name, _dashboard_name in ALIASES.items():
+    if normalize_name(_parser_name) in WEAPON_CODES:
+        WEAPON_CODES.setdefault(normalize_name(_dashboard_name), WEAPON_CODES[normalize_name(_parser_name)])
+MAX_FILTER_WEAPONS = 8
+
+# Per-demo counts are kept on this grid; tiles use a bins that divides it
+COUNT_BINS = 512
+MAX_CACHED_TILES = 512
+
+DEFAULT_BINS = 128
+DEFAULT_TICK_STRIDE = 16
+DEFAULT_CHUNK_TICKS = 50_000
+# Give up on a chunked parse that finds no players in this many leading ticks
+MAX_LEADING_EMPTY_TICKS = 100_000
+
+# Color ramp of the heat layer, from the coldest to the hottest cell
+HEAT_STOPS = [0.0, 0.25, 0.5, 0.75, 1.0]
+HEAT_COLORS = [(0, 0, 255), (0, 255, 255), (0, 255, 0), (255, 255, 0), (255, 0, 0)]
+HEAT_MAX_ALPHA = 210
+
+
+class HeatmapError(ValueError):
+    pass
+
+
+def heatmap_filters(team: Optional[str] = None, phase: Optional[str] = None, weapons: Iterable[str] = ()) -> dict:
+    """
+    Validated filters: team 'ct' or 't', phase one of PHASES, weapons from
+    HEATMAP_WEAPONS (any spelling normalize_name maps to one, at most
+    MAX_FILTER_WEAPONS). None and empty mean no filter. Weapons come back as
+    their HEATMAP_WEAPONS names, so 'ak47' and 'AK-47' are the same filter.
+    """
+    team = team.lower() if team else None
+    if team is not None and team not in TEAMS:
+        raise HeatmapError(f"Unknown team {team!r}, expected one of {sorted(TEAMS)}")
+    phase = phase.lower() if phase else None
+    if phase is not None and phase not in PHASES:
+        raise HeatmapError(f"Unknown phase {phase!r}, expected one of {list(PHASES)}")
+    codes = set()
+    for weapon in weapons:
+        if not weapon.strip():
+            continue
+        code = WEAPON_CODES.get(normalize_name(weapon.strip()))
+        if code is None:
+            raise HeatmapError(f"Unknown weapon {weapon.strip()[:40]!r}")
+        codes.add(code)
+    if len(codes) > MAX_FILTER_WEAPONS:
+        raise HeatmapError(f"At most {MAX_FILTER_WEAPONS} weapons per heatmap")
+    return {'team': team, 'phase': phase, 'weapons': sorted(HEATMAP_WEAPONS[code - 1] for code in codes)}
+
+
+def _weapon_codes(names) -> np.ndarray:
+    # Every distinct name is normalized once
+    categorical = pd.Categorical(np.asarray(names, dtype=object))
+    mapping = np.append(np.fromiter((WEAPON_CODES.get(normalize_name(c), 0) for c in categorical.categories),
+                                    dtype=np.int64, count=len(categorical.categories)), 0)
+    return mapping[np.asarray(categorical.codes)]
+
+
+def world_to_radar(x, y, map_name: str):
+    """World X/Y to radar coordinates in [0, 1) (u to the right, v down), for any image size."""
+    calibration = MAP_CALIBRATION.get(map_name)
+    if calibration is None:
+        raise HeatmapError(f"No radar calibration for {map_name!r}")
+    extent = calibration['scale'] * RADAR_SIZE
+    u = (np.asarray(x, dtype=np.float64) - calibration['pos_x']) / extent
+    v = (calibration['pos_y'] - np.asarray(y, dtype=np.float64)) / extent
+    return u, v
+
+
+def _cells(chunk: pd.DataFrame, map_name: str, bins: int, mask: np.ndarray):
+    # Grid cell of every masked position, and which of them landed on the radar
+    u, v = world_to_radar(chunk['X'].to_numpy()[mask], chunk['Y'].to_numpy()[mask], map_name)
+    col = np.floor(u * bins).astype(np.int64)
+    row = np.floor(v * bins).astype(np.int64)
+    inside = (col >= 0) & (col < bins) & (row >= 0) & (row < bins)
+    return row * bins + col, inside
+
+
+def _position_categories(chunk: pd.DataFrame):
+    # (team, phase, weapon code) of every row, and which rows are alive players of a side outside the warmup
+    team_name = chunk['team_name'].to_numpy()
+    team = np.where(team_name == TEAMS['ct'], 0, 1)
+    valid = (chunk['health'].to_numpy() > 0) & ((team_name == TEAMS['ct']) | (team_name == TEAMS['t']))
+    if 'is_warmup_period' in chunk:
+        valid &= ~chunk['is_warmup_period'].to_numpy(dtype=bool)
+    freeze = chunk['is_freeze_period'].to_numpy(dtype=bool)
+    planted = chunk['is_bomb_planted'].to_numpy(dtype=bool)
+    phase = np.where(freeze, 0, np.where(planted, 2, 1))
+    return team, phase, _weapon_codes(chunk['weapon_name'].to_numpy()), valid
+
+
+class PositionCounts():
+    """
+    Every position of one map's demo by (team, phase, weapon) category on a
+    COUNT_BINS grid, stored sparse as (category * cells + cell, count) pairs.
+    grid() turns it into the counts of any filter, at any bins dividing COUNT_BINS.
+    """
+    N_CATEGORIES = len(TEAMS) * len(PHASES) * (len(HEATMAP_WEAPONS) + 1)
+
+    def __init__(self, map_name: str, keys: np.ndarray = None, counts: np.ndarray = None):
+        if map_name not in MAP_CALIBRATION:
+            raise HeatmapError(f"No radar calibration for {map_name!r}")
+        self.map_name = map_name
+        self.keys = np.zeros(0, dtype=np.int64) if keys is None else np.asarray(keys, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+
+    def add(self, chunk: pd.DataFrame) -> int:
+        """Count the chunk's positions; returns how many landed on the radar."""
+        if chunk.empty:
+            return 0
+        team, phase, weapon, valid = _position_categories(chunk)
+        cells, inside = _cells(chunk, self.map_name, COUNT_BINS, valid)
+        category = ((team * len(PHASES) + phase) * (len(HEATMAP_WEAPONS) + 1) + weapon)[valid][inside]
+        keys = category * COUNT_BINS * COUNT_BINS + cells[inside]
+        self.keys, inverse = np.unique(np.concatenate([self.keys, keys]), return_inverse=True)
+        self.counts = np.bincount(inverse, weights=np.concatenate([self.counts, np.ones(len(keys), dtype=np.int64)]),
+                                  minlength=len(self.keys)).astype(np.int64)
+        return int(len(keys))
+
+    def grid(self, filters: dict = None, bins: int = DEFAULT_BINS) -> np.ndarray:
+        """Flat bins x bins counts of the positions that pass the filters."""
+        filters = filters or heatmap_filters()
+        if bins < 1 or COUNT_BINS % bins:
+            raise HeatmapError(f"bins must divide {COUNT_BINS}")
+        n_weapons = len(HEATMAP_WEAPONS) + 1
+        category, cell = np.divmod(self.keys, COUNT_BINS * COUNT_BINS)
+        team, rest = np.divmod(category, len(PHASES) * n_weapons)
+        phase, weapon = np.divmod(rest, n_weapons)
+        mask = np.ones(len(self.keys), dtype=bool)
+        if filters['team'] is not None:
+            mask &= team == list(TEAMS).index(filters['team'])
+        if filters['phase'] is not None:
+            mask &= phase == PHASES.index(filters['phase'])
+        if filters['weapons']:
+            mask &= np.isin(weapon, [WEAPON_CODES[normalize_name(w)] for w in filters['weapons']])
+        row, col = np.divmod(cell[mask], COUNT_BINS)
+        factor = COUNT_BINS // bins
+        return np.bincount((row // factor) * bins + col // factor, weights=self.counts[mask],
+                           minlength=bins * bins).astype(np.int64)
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, keys=self.keys, counts=self.counts)
+        return buffer.getvalue()
+
+    @classmethod
+    def load(cls, path: str, map_name: str) -> "PositionCounts":
+        with np.load(path) as data:
+            return cls(map_name, data['keys'], data['counts'])
+
+
+def _filter_mask(chunk: pd.DataFrame, filters: dict) -> np.ndarray:
+    team, phase, weapon, mask = _position_categories(chunk)
+    if filters['team'] is not None:
+        mask &= team == list(TEAMS).index(filters['team'])
+    if filters['phase'] is not None:
+        mask &= phase == PHASES.index(filters['phase'])
+    if filters['weapons']:
+        mask &= np.isin(weapon, [WEAPON_CODES[normalize_name(w)] for w in filters['weapons']])
+    return mask
+
+
+class HeatmapAccumulator():
+    """Position counts of one map on a bins x bins radar grid, filled chunk by chunk."""
+
+    def __init__(self, map_name: str, bins: int = DEFAULT_BINS, filters: dict = None):
+        if map_name not in MAP_CALIBRATION:
+            raise HeatmapError(f"No radar calibration for {map_name!r}")
+        self.map_name = map_name
+        self.bins = int(bins)
+        self.filters = filters or heatmap_filters()
+        self.counts = np.zeros(self.bins * self.bins, dtype=np.int64)
+
+    def add(self, chunk: pd.DataFrame) -> int:
+        """Count the chunk's positions that pass the filters; returns how many landed on the radar."""
+        if chunk.empty:
+            return 0
+        cells, inside = _cells(chunk, self.map_name, self.bins, _filter_mask(chunk, self.filters))
+        cells = cells[inside]
+        self.counts += np.bincount(cells, minlength=self.counts.size)
+        return int(cells.size)
+
+    def merge(self, counts: np.ndarray) -> None:
+        self.counts += np.asarray(counts, dtype=np.int64).reshape(-1)
+
+    @property
+    def grid(self) -> np.ndarray:
+        # Rows top to bottom, like the radar image
+        return self.counts.reshape(self.bins, self.bins)
+
+
+def iter_position_chunks(demo_path: str, chunk_ticks: Optional[int] = DEFAULT_CHUNK_TICKS,
+                         tick_stride: int = DEFAULT_TICK_STRIDE) -> Iterator[pd.DataFrame]:
+    """
+    Every tick_stride-th tick of a demo with HEATMAP_PROPS, chunk_ticks ticks
+    of the recording at a time (None: one parse of the whole demo).
+    """
+    from demoparser2 import DemoParser
+    parser = DemoParser(demo_path)
+    if not chunk_ticks:
+        ticks_df = parser.parse_ticks(wanted_props=HEATMAP_PROPS)
+        yield ticks_df[ticks_df['tick'].to_numpy() % tick_stride == 0]
+        return
+    # Players are listed on every tick, so the first empty window after data is the end of the demo
+    start, seen = 0, False
+    while True:
+        chunk = parser.parse_ticks(wanted_props=HEATMAP_PROPS, ticks=list(range(start, start + chunk_ticks, tick_stride)))
+        if len(chunk):
+            seen = True
+            yield chunk
+        elif seen or start >= MAX_LEADING_EMPTY_TICKS:
+            return
+        start += chunk_ticks
+
+
+def demo_map_name(demo_path: str) -> str:
+    from demoparser2 import DemoParser
+    return DemoParser(demo_path).parse_header()['map_name']
+
+
+def render_png(grid: np.ndarray, map_name: str, size: Optional[int] = None, background: bool = True) -> bytes:
+    """
+    The count grid as a heat layer (log scaled, blurred) over the map's radar image.
+
+    Args:
+        grid (np.ndarray): bins x bins counts (HeatmapAccumulator.grid).
+        map_name (str): Map, for the background image.
+        size (int): Output width and height (default: the background's, or 1024).
+        background (bool): Draw over assets/maps_background/<map>.png when it exists.
+
+    Returns:
+        bytes: PNG image.
+    """
+    from PIL import Image, ImageFilter
+
+    base = None
+    background_path = os.path.join(MAPS_BACKGROUND_DIR, f"{map_name}.png")
+    if background and os.path.isfile(background_path):
+        base = Image.open(background_path).convert('RGBA')
+    size = int(size or (base.width if base is not None else RADAR_SIZE))
+    base = base.resize((size, size), Image.BILINEAR) if base is not None else Image.new('RGBA', (size, size), (20, 20, 20, 255))
+
+    counts = np.asarray(grid, dtype=np.float64)
+    peak = counts.max()
+    density = np.log1p(counts) / np.log1p(peak) if peak > 0 else counts
+    rgba = np.zeros(counts.shape + (4,), dtype=np.uint8)
+    for channel in range(3):
+        rgba[..., channel] = np.interp(density, HEAT_STOPS, [color[channel] for color in HEAT_COLORS])
+    rgba[..., 3] = np.where(counts > 0, np.clip(0.35 + density, 0, 1) * HEAT_MAX_ALPHA, 0)
+
+    heat = Image.fromarray(rgba, 'RGBA').resize((size, size), Image.BILINEAR)
+    heat = heat.filter(ImageFilter.GaussianBlur(radius=max(size / counts.shape[0] * 0.75, 0.5)))
+    out = io.BytesIO()
+    Image.alpha_composite(base, heat).save(out, format='PNG', optimize=True)
+    return out.getvalue()
+
+
+def _demo_identity(demo_path: str) -> str:
+    stat = os.stat(demo_path)
+    return f"{os.path.abspath(demo_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+def _key(*parts) -> str:
+    return hashlib.sha256(json.dumps([CACHE_FORMAT, *parts], sort_keys=True).encode('utf-8')).hexdigest()[:24]
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class HeatmapCache():
+    """
+    Heatmap tiles over a set of demos, cached on disk. Also keeps the map of
+    every demo it has seen (demos.json), so finding a map's demos only parses
+    the headers of new files.
+    """
+
+    def __init__(self, folder: str = HEATMAP_CACHE_DIR, chunk_ticks: Optional[int] = DEFAULT_CHUNK_TICKS,
+                 tick_stride: int = DEFAULT_TICK_STRIDE):
+        self.folder = folder
+        self.chunk_ticks = chunk_ticks
+        self.tick_stride = int(tick_stride)
+        self._index_path = os.path.join(folder, "demos.json")
+        self._index = None
+
+    def _demo_index(self) -> dict:
+        if self._index is None:
+            try:
+                with open(self._index_path, 'r') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def demos_of_map(self, demo_paths: Iterable[str], map_name: str):
+        """
+        (path, identity) of the demos recorded on map_name, plus the paths whose
+        header could not be read.
+        """
+        index = self._demo_index()
+        matches, failed, changed = [], [], False
+        for path in demo_paths:
+            identity = _demo_identity(path)
+            if identity not in index:
+                try:
+                    index[identity] = demo_map_name(path)
+                except Exception:  # the parser raises its own exception types
+                    failed.append(path)
+                    continue
+                changed = True
+            if index[identity] == map_name:
+                matches.append((path, identity))
+        if changed:
+            _write_atomic(self._index_path, json.dumps(index, sort_keys=True).encode('utf-8'))
+        return matches, failed
+
+    def demo_counts(self, demo_path: str, identity: str, map_name: str) -> PositionCounts:
+        """All positions of one demo (every filter), parsed on a cache miss."""
+        path = os.path.join(self.folder, "counts", f"{_key(identity, map_name, self.tick_stride)}.npz")
+        if os.path.isfile(path):
+            return PositionCounts.load(path, map_name)
+        counts = PositionCounts(map_name)
+        for chunk in iter_position_chunks(demo_path, self.chunk_ticks, self.tick_stride):
+            counts.add(chunk)
+        _write_atomic(path, counts.to_bytes())
+        return counts
+
+    def _evict_tiles(self, keep: int = MAX_CACHED_TILES) -> None:
+        # Tiles are cheap to render from the counts, so only the newest are kept
+        folder = os.path.join(self.folder, "tiles")
+        try:
+            entries = [e for e in os.scandir(folder) if e.name.endswith('.png')]
+        except OSError:
+            return
+        if len(entries) <= keep:
+            return
+        for entry in sorted(entries, key=lambda e: e.stat().st_mtime)[:len(entries) - keep]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def tile(self, demo_paths: Iterable[str], map_name: str, filters: dict = None, bins: int = DEFAULT_BINS,
+             size: Optional[int] = None) -> dict:
+        """
+        Rendered heatmap of map_name over the given demos.
+
+        Returns:
+            dict: 'key' (content key, usable as an ETag), 'png' (bytes), 'demos'
+                (demos counted), 'failed' (paths that could not be parsed) and
+                'cached' (whether the tile was already rendered).
+        """
+        filters = filters or heatmap_filters()
+        if map_name not in MAP_CALIBRATION:
+            raise HeatmapError(f"No radar calibration for {map_name!r}")
+        if bins < 1 or COUNT_BINS % bins:
+            raise HeatmapError(f"bins must divide {COUNT_BINS}")
+        demos, failed = self.demos_of_map(demo_paths, map_name)
+        key = _key(sorted(identity for _, identity in demos), map_name, filters, bins, self.tick_stride, size)
+        path = os.path.join(self.folder, "tiles", f"{key}.png")
+        if os.path.isfile(path):
+            with open(path, 'rb') as f:
+                return {'key': key, 'png': f.read(), 'demos': len(demos), 'failed': failed, 'cached': True}
+
+        accumulator = HeatmapAccumulator(map_name, bins, filters)
+        counted = 0
+        for demo_path, identity in demos:
+            try:
+                accumulator.merge(self.demo_counts(demo_path, identity, map_name).grid(filters, bins))
+                counted += 1
+            except Exception:  # the parser raises its own exception types
+                failed.append(demo_path)
+        png = render_png(accumulator.grid, map_name, size)
+        # A tile with failed demos is not cached, so they are retried on the next view
+        if counted == len(demos):
+            _write_atomic(path, png)
+            self._evict_tiles()
+        return {'key': key, 'png': png, 'demos': counted, 'failed': failed, 'cached': False}
+
+
+def find_demos(folder: str = DEMOS_DIR) -> list:
+    return sorted(glob(os.path.join(folder, "**", "*.dem"), recursive=True))
+
+
+def _main(argv=None):
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Build a position heatmap of a map over the demos of a folder")
+    parser.add_argument('map_name')
+    parser.add_argument('--demos', default=DEMOS_DIR, help="Folder searched recursively for .dem files")
+    parser.add_argument('--team', choices=sorted(TEAMS))
+    parser.add_argument('--phase', choices=PHASES)
+    parser.add_argument('--weapon', action='append', default=[],
+                        help=f"Weapon name (repeatable, at most {MAX_FILTER_WEAPONS}): {', '.join(HEATMAP_WEAPONS)}")
+    parser.add_argument('--bins', type=int, default=DEFAULT_BINS, help=f"Grid size, a divisor of {COUNT_BINS}")
+    parser.add_argument('--tick-stride', type=int, default=DEFAULT_TICK_STRIDE)
+    parser.add_argument('--chunk-ticks', type=int, default=DEFAULT_CHUNK_TICKS)
+    parser.add_argument('--size', type=int)
+    parser.add_argument('--cache', default=HEATMAP_CACHE_DIR)
+    parser.add_argument('--output', help="Also write the PNG here")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    cache = HeatmapCache(args.cache, args.chunk_ticks, args.tick_stride)
+    tile = cache.tile(find_demos(args.demos), args.map_name, heatmap_filters(args.team, args.phase, args.weapon),
+                      args.bins, args.size)
+    if args.output:
+        with open(args.output, 'wb') as f:
+            f.write(tile['png'])
+    print(f"{'♻️  Cached' if tile['cached'] else '🔥 Built'} {args.map_name} heatmap over {tile['demos']} demos "
+          f"in {time.perf_counter() - start:.2f} s (key {tile['key']})")
+    if tile['failed']:
+        print(f"⚠️  {len(tile['failed'])} demos could not be parsed")
+    if args.output:
+        print(f"💾 Written to {args.output}")
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,291 @@
+###############################################################################
+# In-round win probability
+#
+# Scores a demo's tick stream with the mid-round model: for every tick where
+# the state of the round changes (players alive on each side, bomb planted, or
+# another time_step seconds elapsed) it gives the probability that the CT side
+# wins the round. Ticks are processed in chunks cut at tick boundaries, and
+# only the change ticks of each chunk are kept, so memory is bounded by the
+# chunk size whatever the length of the demo.
+#
+# The model is a logistic regression over the state features, stored as JSON
+# (coefficients and intercept) and evaluated with NumPy, so serving it needs
+# neither scikit-learn nor the parser. model/train_inround.py fits it.
+###############################################################################
+
+import os
+import sys
+import json
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+if __package__ in (None, ''):
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.constants import APP_ROOT
+
+INROUND_MODEL_PATH = os.path.join(APP_ROOT, "model", "inround_model.json")
+INROUND_MODEL_FORMAT = 1
+
+# Props the scorer needs from parse_ticks
+STATE_PROPS = ['tick', 'health', 'team_name', 'is_freeze_period', 'is_warmup_period', 'is_bomb_planted',
+               'round_start_time', 'game_time', 'total_rounds_played', 'round_win_status']
+STATE_COLUMNS = ['round', 'tick', 'seconds', 'ct_alive', 't_alive', 'bomb_planted']
+
+# Model inputs, computed from the state columns by state_features
+FEATURES = ['ct_alive', 't_alive', 'alive_diff', 'bomb_planted', 'time_frac', 'bomb_time_frac', 'ct_wiped', 't_wiped']
+ROUND_SECONDS = 115.0
+BOMB_SECONDS = 40.0
+
+DEFAULT_TIME_STEP = 5.0
+DEFAULT_CHUNK_ROWS = 1_000_000
+# Give up on a chunked parse that finds no players in this many leading ticks
+MAX_LEADING_EMPTY_TICKS = 100_000
+CT_WIN, T_WIN = 3, 2
+
+
+def tick_states(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per live tick of a player-tick frame (parse_ticks output with
+    STATE_PROPS, or a DemoProcessing.preprocess_ticks frame).
+
+    Freeze time, warmup and the ticks after the round is decided (a win status
+    is set) are dropped.
+
+    Returns:
+        pd.DataFrame: STATE_COLUMNS, ordered by tick; round is 1-based like
+            the round summaries.
+    """
+    keep = np.ones(len(chunk), dtype=bool)
+    for flag in ('is_freeze_period', 'is_warmup_period'):
+        if flag in chunk:
+            keep &= ~chunk[flag].to_numpy(dtype=bool)
+    status = 'round_win_status' if 'round_win_status' in chunk else 'target' if 'target' in chunk else None
+    if status is not None:
+        keep &= chunk[status].to_numpy() == 0
+    if not keep.any():
+        return pd.DataFrame({c: pd.Series(dtype='float64' if c == 'seconds' else 'int64') for c in STATE_COLUMNS})
+
+    ticks = chunk['tick'].to_numpy()[keep]
+    unique_ticks, first, inverse = np.unique(ticks, return_index=True, return_inverse=True)
+    n = len(unique_ticks)
+
+    def per_tick(values):
+        return np.asarray(values)[keep][first]
+
+    if 't_alive' in chunk and 'ct_alive' in chunk:
+        ct_alive, t_alive = per_tick(chunk['ct_alive']), per_tick(chunk['t_alive'])
+    else:
+        alive = chunk['health'].to_numpy()[keep] > 0
+        team = chunk['team_name'].to_numpy()[keep]
+        ct_alive = np.bincount(inverse, weights=alive & (team == 'CT'), minlength=n)
+        t_alive = np.bincount(inverse, weights=alive & (team == 'TERRORIST'), minlength=n)
+    bomb_column = 'is_bomb_planted' if 'is_bomb_planted' in chunk else 'bomb_planted'
+    bomb = np.bincount(inverse, weights=chunk[bomb_column].to_numpy(dtype=bool)[keep], minlength=n) > 0
+    if 'seconds_elapsed_in_round' in chunk:
+        seconds = per_tick(chunk['seconds_elapsed_in_round'])
+    else:
+        seconds = np.clip(per_tick(chunk['game_time']) - per_tick(chunk['round_start_time']), 0, None)
+
+    return pd.DataFrame({
+        'round': per_tick(chunk['total_rounds_played']).astype(np.int64) + 1,
+        'tick': unique_ticks.astype(np.int64),
+        'seconds': seconds.astype(np.float64),
+        'ct_alive': np.asarray(ct_alive, dtype=np.int64),
+        't_alive': np.asarray(t_alive, dtype=np.int64),
+        'bomb_planted': bomb.astype(np.int64),
+    })
+
+
+def state_features(states: pd.DataFrame) -> np.ndarray:
+    """FEATURES matrix (float64) for tick states."""
+    ct = states['ct_alive'].to_numpy(dtype=np.float64)
+    t = states['t_alive'].to_numpy(dtype=np.float64)
+    bomb = states['bomb_planted'].to_numpy(dtype=np.float64)
+    seconds = states['seconds'].to_numpy(dtype=np.float64)
+    return np.column_stack([
+        ct, t, ct - t, bomb,
+        np.minimum(seconds / ROUND_SECONDS, 2.0),
+        bomb * np.minimum(seconds / BOMB_SECONDS, 4.0),
+        (ct == 0).astype(np.float64), (t == 0).astype(np.float64),
+    ])
+
+
+class ChangeFilter():
+    """
+    Keeps the ticks where the round state changes, across chunks: a new round,
+    a different number of players alive, the bomb being planted, or another
+    time_step seconds of the round elapsed since the last kept tick.
+    """
+
+    def __init__(self, time_step: float = DEFAULT_TIME_STEP):
+        self.time_step = time_step
+        self._last = None  # (round, ct_alive, t_alive, bomb, time bucket) of the previous tick
+
+    def __call__(self, states: pd.DataFrame) -> pd.DataFrame:
+        if states.empty:
+            return states
+        bucket = (np.floor(states['seconds'].to_numpy() / self.time_step).astype(np.int64)
+                  if self.time_step else np.zeros(len(states), dtype=np.int64))
+        keys = np.column_stack([states['round'].to_numpy(), states['ct_alive'].to_numpy(),
+                                states['t_alive'].to_numpy(), states['bomb_planted'].to_numpy(), bucket])
+        last = np.full((1, keys.shape[1]), -1) if self._last is None else self._last[None, :]
+        previous = np.vstack([last, keys[:-1]])
+        changed = (keys != previous).any(axis=1)
+        self._last = keys[-1]
+        return states[changed]
+
+
+class InRoundModel():
+    """
+    Logistic regression P(CT wins the round | state) over FEATURES.
+
+    Args:
+        coef (list): One weight per feature.
+        intercept (float): Bias.
+        features (list): Feature names, must match FEATURES.
+        metadata (dict): Training information stored with the model.
+    """
+
+    def __init__(self, coef, intercept: float, features=FEATURES, metadata: dict = None):
+        if list(features) != FEATURES:
+            raise ValueError(f"In-round model features {list(features)} do not match {FEATURES}")
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.features = list(features)
+        self.metadata = metadata or {}
+
+    @classmethod
+    def load(cls, path: str = INROUND_MODEL_PATH) -> "InRoundModel":
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if data.get('format_version') != INROUND_MODEL_FORMAT:
+            raise ValueError(f"Unsupported in-round model format: {data.get('format_version')}")
+        return cls(data['coef'], data['intercept'], data['features'], data.get('metadata'))
+
+    def save(self, path: str = INROUND_MODEL_PATH) -> str:
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, 'w') as f:
+            json.dump({'format_version': INROUND_MODEL_FORMAT, 'features': self.features,
+                       'coef': self.coef.tolist(), 'intercept': self.intercept, 'metadata': self.metadata}, f, indent=2)
+        os.replace(tmp, path)
+        return path
+
+    def predict_ct(self, states: pd.DataFrame) -> np.ndarray:
+        """Probability that CT wins, per state row."""
+        z = state_features(states) @ self.coef + self.intercept
+        return 1.0 / (1.0 + np.exp(-z))
+
+
+def iter_frame_chunks(ticks_df: pd.DataFrame, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Split a player-tick frame into chunks of about chunk_rows rows, never inside a tick."""
+    ticks = ticks_df['tick'].to_numpy()
+    boundaries = np.flatnonzero(ticks[1:] != ticks[:-1]) + 1
+    start = 0
+    while start < len(ticks_df):
+        i = np.searchsorted(boundaries, start + chunk_rows)
+        end = int(boundaries[i]) if i < len(boundaries) else len(ticks_df)
+        yield ticks_df.iloc[start:end]
+        start = end
+
+
+def iter_demo_chunks(demo_path: str, chunk_ticks: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    Parse a demo's STATE_PROPS, whole or chunk_ticks ticks at a time.
+
+    Parsing by tick windows bounds the memory of the parse itself, at the
+    cost of one pass over the file per window.
+    """
+    from demoparser2 import DemoParser
+    parser = DemoParser(demo_path)
+    if not chunk_ticks:
+        yield parser.parse_ticks(wanted_props=STATE_PROPS).sort_values(['tick'], kind='stable')
+        return
+    # Players are listed on every tick from the start of the recording to its
+    # end, so the first empty window after some data is the end of the demo
+    start, seen = 0, False
+    while True:
+        chunk = parser.parse_ticks(wanted_props=STATE_PROPS, ticks=list(range(start, start + chunk_ticks)))
+        if len(chunk):
+            seen = True
+            yield chunk.sort_values(['tick'], kind='stable')
+        elif seen or start >= MAX_LEADING_EMPTY_TICKS:
+            return
+        start += chunk_ticks
+
+
+def score_stream(chunks: Iterable[pd.DataFrame], model: InRoundModel,
+                 time_step: float = DEFAULT_TIME_STEP) -> Iterator[pd.DataFrame]:
+    """
+    Score a stream of player-tick chunks, yielding the scored change ticks of each.
+
+    Yields:
+        pd.DataFrame: STATE_COLUMNS plus p_ct and p_t.
+    """
+    keep_changes = ChangeFilter(time_step)
+    for chunk in chunks:
+        states = keep_changes(tick_states(chunk))
+        if states.empty:
+            continue
+        p_ct = model.predict_ct(states)
+        yield states.assign(p_ct=p_ct, p_t=1.0 - p_ct)
+
+
+def score_ticks(ticks_df: pd.DataFrame, model: InRoundModel, time_step: float = DEFAULT_TIME_STEP,
+                chunk_rows: int = DEFAULT_CHUNK_ROWS) -> pd.DataFrame:
+    """Win probability time series of a whole player-tick frame (see score_stream)."""
+    parts = list(score_stream(iter_frame_chunks(ticks_df, chunk_rows), model, time_step))
+    if not parts:
+        return pd.DataFrame(columns=STATE_COLUMNS + ['p_ct', 'p_t'])
+    return pd.concat(parts, ignore_index=True)
+
+
+def series_by_round(scored: pd.DataFrame, decimals: int = 4) -> list:
+    """Scored ticks as one JSON-ready series per round."""
+    out = []
+    for round_number, group in scored.groupby('round', sort=True):
+        out.append({
+            'round': int(round_number),
+            'tick': group['tick'].astype(int).tolist(),
+            'seconds': group['seconds'].round(2).tolist(),
+            'ct_alive': group['ct_alive'].astype(int).tolist(),
+            't_alive': group['t_alive'].astype(int).tolist(),
+            'bomb_planted': group['bomb_planted'].astype(bool).tolist(),
+            'p_ct': group['p_ct'].round(decimals).tolist(),
+        })
+    return out
+
+
+def _main(argv=None):
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Score a demo's rounds with the in-round win probability model")
+    parser.add_argument('demo_path')
+    parser.add_argument('--model', default=INROUND_MODEL_PATH)
+    parser.add_argument('--time-step', type=float, default=DEFAULT_TIME_STEP)
+    parser.add_argument('--chunk-ticks', type=int, default=None,
+                        help="Parse this many ticks at a time (bounded memory, one file pass per chunk)")
+    parser.add_argument('--output', help="Write the per-round series as JSON (default: print a summary)")
+    args = parser.parse_args(argv)
+
+    model = InRoundModel.load(args.model)
+    start = time.perf_counter()
+    parts = list(score_stream(iter_demo_chunks(args.demo_path, args.chunk_ticks), model, args.time_step))
+    scored = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=STATE_COLUMNS + ['p_ct', 'p_t'])
+    elapsed = time.perf_counter() - start
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'demo': os.path.basename(args.demo_path), 'rounds': series_by_round(scored)}, f)
+        print(f"💾 {scored['round'].nunique()} rounds, {len(scored):,} scored ticks written to {args.output}")
+    else:
+        for round_number, group in scored.groupby('round'):
+            print(f"Round {round_number:2d}: {len(group):4d} ticks, P(CT) {group['p_ct'].iloc[0]:.2f} -> "
+                  f"{group['p_ct'].iloc[-1]:.2f}")
+    print(f"⏱️  {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,194 @@
+###############################################################################
+# Player feature store
+#
+# Per-player history aggregated offline from the round summaries
+# (model/player_stats.py): rounds played, rounds won per side and per map,
+# average buy. It is kept as one NumPy struct array sorted by steamid
+# (player_stats.npy) plus a small JSON file with the map order and how it was
+# built, so loading it is a single np.load and a lookup is a dict access
+# (serving) or a searchsorted over the steamids (training frames).
+#
+# Both sides turn a lineup into the same team features (PLAYER_STAT_FEATURES):
+# the mean over the team's players of the smoothed win rate on their side and
+# on the map, of log1p(rounds) and of the average buy. Players the store does
+# not know count with the prior (a 50% win rate, no experience, the average buy).
+###############################################################################
+
+import os
+import sys
+import json
+from typing import List, Optional
+
+import numpy as np
+
+if __package__ in (None, ''):
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.constants import APP_ROOT
+
+PLAYER_STORE_DIR = os.path.join(APP_ROOT, "model", "player_stats")
+STATS_FILE = "player_stats.npy"
+META_FILE = "player_stats.json"
+PLAYER_STORE_FORMAT = 1
+
+# Rounds of a 50% win rate every player starts with
+DEFAULT_PRIOR_ROUNDS = 20
+
+STATS = ['side_win_rate', 'map_win_rate', 'experience', 'avg_buy']
+PLAYER_STAT_FEATURES = [f"team_{side}_{stat}" for side in ('ct', 't') for stat in STATS]
+
+
+def stats_dtype(n_maps: int) -> np.dtype:
+    return np.dtype([
+        ('steamid', '<u8'),
+        ('rounds', '<i4'),
+        ('ct_rounds', '<i4'),
+        ('ct_wins', '<i4'),
+        ('t_rounds', '<i4'),
+        ('t_wins', '<i4'),
+        ('avg_buy', '<f4'),
+        ('map_rounds', '<i4', (n_maps,)),
+        ('map_wins', '<i4', (n_maps,)),
+    ])
+
+
+def write_player_store(stats: np.ndarray, maps: List[str], folder: str = PLAYER_STORE_DIR,
+                       metadata: Optional[dict] = None, prior_rounds: int = DEFAULT_PRIOR_ROUNDS) -> str:
+    """Write a stats struct array (stats_dtype) and its map order; the JSON file is replaced last."""
+    stats = np.sort(np.asarray(stats, dtype=stats_dtype(len(maps))), order='steamid')
+    weights = stats['rounds'].astype(np.float64)
+    meta = {
+        'format': PLAYER_STORE_FORMAT,
+        'maps': list(maps),
+        'players': int(len(stats)),
+        'prior_rounds': prior_rounds,
+        'mean_avg_buy': float((stats['avg_buy'] * weights).sum() / weights.sum()) if weights.sum() else 0.0,
+        'metadata': metadata or {},
+    }
+    os.makedirs(folder, exist_ok=True)
+    tmp = os.path.join(folder, f".{STATS_FILE}.tmp-{os.getpid()}")
+    with open(tmp, 'wb') as f:
+        np.save(f, stats, allow_pickle=False)
+    os.replace(tmp, os.path.join(folder, STATS_FILE))
+    tmp = os.path.join(folder, f".{META_FILE}.tmp-{os.getpid()}")
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, os.path.join(folder, META_FILE))
+    return folder
+
+
+class PlayerStore():
+    """The loaded store: stats struct array, steamid -> row index and map order."""
+
+    def __init__(self, stats: np.ndarray, meta: dict, folder: Optional[str] = None):
+        self.stats = stats
+        self.meta = meta
+        self.folder = folder
+        self.maps = meta['maps']
+        self.prior_rounds = meta['prior_rounds']
+        self.mean_avg_buy = meta['mean_avg_buy']
+        self.index = {str(s): i for i, s in enumerate(stats['steamid'].tolist())}
+
+        # Per-row values the features average, computed once; the last row is the unknown player
+        prior = self.prior_rounds
+        self._ct_rate = np.append((stats['ct_wins'] + prior / 2) / (stats['ct_rounds'] + prior), 0.5)
+        self._t_rate = np.append((stats['t_wins'] + prior / 2) / (stats['t_rounds'] + prior), 0.5)
+        self._map_rate = np.vstack([(stats['map_wins'] + prior / 2) / (stats['map_rounds'] + prior),
+                                    np.full((1, len(self.maps)), 0.5)])
+        self._experience = np.append(np.log1p(stats['rounds']), 0.0)
+        self._avg_buy = np.append(stats['avg_buy'].astype(np.float64), self.mean_avg_buy)
+
+    @classmethod
+    def load(cls, folder: str = PLAYER_STORE_DIR) -> "PlayerStore":
+        with open(os.path.join(folder, META_FILE), 'r') as f:
+            meta = json.load(f)
+        if meta.get('format') != PLAYER_STORE_FORMAT:
+            raise ValueError(f"Player store format {meta.get('format')}, expected {PLAYER_STORE_FORMAT}")
+        stats = np.load(os.path.join(folder, STATS_FILE), allow_pickle=False)
+        if stats.dtype != stats_dtype(len(meta['maps'])):
+            raise ValueError(f"Player store has dtype {stats.dtype}, expected {stats_dtype(len(meta['maps']))}")
+        return cls(stats, meta, folder)
+
+    def __len__(self) -> int:
+        return len(self.stats)
+
+    @property
+    def identity(self) -> dict:
+        """Folder and build of the store, recorded in the bundles trained on its features."""
+        built = self.meta.get('metadata', {})
+        return {'folder': os.path.abspath(self.folder) if self.folder else None, 'built_at': built.get('built_at'),
+                'date_from': built.get('date_from'), 'date_to': built.get('date_to'), 'players': len(self.stats)}
+
+    def player(self, steamid) -> Optional[dict]:
+        """One player's stats as a dict, or None."""
+        row = self.index.get(str(steamid))
+        if row is None:
+            return None
+        record = self.stats[row]
+        out = {name: record[name].item() for name in ('rounds', 'ct_rounds', 'ct_wins', 't_rounds', 't_wins', 'avg_buy')}
+        out['steamid'] = str(steamid)
+        out['maps'] = {m: {'rounds': int(r), 'wins': int(w)}
+                       for m, r, w in zip(self.maps, record['map_rounds'], record['map_wins']) if r}
+        return out
+
+    def _rows(self, steamids) -> np.ndarray:
+        # Store rows of a flat list of steamids; unknown ones get len(store)
+        unknown = len(self.stats)
+        try:
+            ids = np.asarray(steamids, dtype=np.uint64)
+        except (TypeError, ValueError, OverflowError):
+            # Request ids are strings and may be empty
+            return np.fromiter((self.index.get(str(s), unknown) for s in steamids), dtype=np.int64, count=len(steamids))
+        if not unknown:
+            return np.zeros(len(ids), dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.stats['steamid'], ids), unknown - 1)
+        return np.where(self.stats['steamid'][pos] == ids, pos, unknown)
+
+    def _map_index(self, map_name) -> int:
+        # Same rule as FeatureSchema.map_column: the first known map contained in the name
+        for i, m in enumerate(self.maps):
+            if m in (map_name or ''):
+                return i
+        return -1
+
+    def features(self, map_names: List[str], ct_players: List[list], t_players: List[list]) -> dict:
+        """
+        PLAYER_STAT_FEATURES for many rounds at once.
+
+        Args:
+            map_names (list): Map of each round.
+            ct_players, t_players (list): Steamids of each side, per round.
+
+        Returns:
+            dict: feature name -> float64 array with one value per round.
+        """
+        n = len(map_names)
+        map_of = {m: self._map_index(m) for m in set(map_names)}
+        map_idx = np.fromiter((map_of[m] for m in map_names), dtype=np.int64, count=n)
+        out = {}
+        for side, teams, side_rate in (('ct', ct_players, self._ct_rate), ('t', t_players, self._t_rate)):
+            lengths = np.fromiter((len(team or ()) for team in teams), dtype=np.int64, count=n)
+            flat = [p for team in teams for p in (team or ())]
+            round_of = np.repeat(np.arange(n), lengths)
+            rows = self._rows(flat) if flat else np.zeros(0, dtype=np.int64)
+            counts = np.maximum(lengths, 1)
+            player_map = map_idx[round_of]
+            map_rate = np.where(player_map >= 0, self._map_rate[rows, np.maximum(player_map, 0)], 0.5)
+            # Rounds without players get the prior
+            empty = lengths == 0
+            for stat, values, prior in (('side_win_rate', side_rate[rows], 0.5), ('map_win_rate', map_rate, 0.5),
+                                        ('experience', self._experience[rows], 0.0),
+                                        ('avg_buy', self._avg_buy[rows], self.mean_avg_buy)):
+                mean = np.bincount(round_of, weights=values, minlength=n) / counts
+                out[f"team_{side}_{stat}"] = np.where(empty, prior, mean)
+        return out
+
+    def team_features(self, map_name: str, ct_players: list, t_players: list) -> dict:
+        """PLAYER_STAT_FEATURES of one lineup, as floats (e.g. to add to an api_predict row)."""
+        return {name: float(values[0]) for name, values in self.features([map_name], [ct_players], [t_players]).items()}
+
+
+def load_player_store(folder: str = PLAYER_STORE_DIR) -> Optional[PlayerStore]:
+    """The store in folder, or None when it has not been built."""
+    if not os.path.isfile(os.path.join(folder, META_FILE)):
+        return None
+    return PlayerStore.load(folder)
@@ -0,0 +1,310 @@
+###############################################################################
+# Trajectory store
+#
+# Player movement of every round of a demo, packed in one file per demo so a
+# round can be replayed without the tick DataFrame or the parser:
+#
+#   magic | header length | JSON header (track index) | int16 rows (dx, dy)
+#
+# A track is one player's alive positions in one round. Positions are
+# quantized to 1/QUANT_STEPS world units and stored as int16 deltas from the
+# previous point (dx, dy); the first point of the track (tick, x, y) is kept
+# in the index. Ticks are implicit: every point is tick_step ticks after the
+# previous one, and the few gaps are listed in the header. Deltas that do not
+# fit in int16 are clipped and the remainder is kept in the header's fixup
+# lists, so decoding stays exact and vectorized. The rows are read through
+# np.memmap, so opening a demo only reads its header.
+###############################################################################
+
+import os
+import re
+import sys
+import json
+import struct
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+if __package__ in (None, ''):
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.constants import APP_ROOT
+
+TRAJECTORY_DIR = os.path.join(APP_ROOT, "model", "datasets", "trajectories")
+TRAJECTORY_FORMAT = 1
+MAGIC = b'CSTRAJ\x00\x01'
+SUFFIX = '.traj'
+
+# 8 steps per world unit: at most 1/16 unit of error, deltas up to 4096 units per point
+QUANT_STEPS = 8
+INT16_MAX = np.iinfo(np.int16).max
+DEMO_ID_PATTERN = re.compile(r'^[A-Za-z0-9_.-]+$')
+OPEN_CACHE_SIZE = 32
+
+
+class TrajectoryError(ValueError):
+    pass
+
+
+def _check_demo_id(demo_id: str) -> str:
+    if not DEMO_ID_PATTERN.match(demo_id or ''):
+        raise TrajectoryError(f"Invalid demo id {demo_id!r}")
+    return demo_id
+
+
+def encode_tracks(ticks_df: pd.DataFrame):
+    """
+    Delta-encode the alive positions of a player-tick frame (parse_ticks output
+    with tick, X, Y, health, team_name, total_rounds_played, steamid and name;
+    raw or after the worker's processing).
+
+    Returns:
+        tuple: (rows, index) with rows an int16 array of shape (n, 2) and
+            index the header: per-track lists ('tracks'), the tick step, the
+            tick gaps ('gaps': row, extra ticks) and the clipped deltas
+            ('fixups': row, channel, residual).
+    """
+    keep = ticks_df['health'].to_numpy() > 0
+    keep &= ticks_df['X'].notna().to_numpy() & ticks_df['Y'].notna().to_numpy()
+    if 'is_warmup_period' in ticks_df:
+        keep &= ~ticks_df['is_warmup_period'].to_numpy(dtype=bool)
+    frame = pd.DataFrame({
+        'round': ticks_df['total_rounds_played'].to_numpy()[keep].astype(np.int64) + 1,
+        'steamid': ticks_df['steamid'].to_numpy()[keep].astype(np.uint64),
+        'tick': ticks_df['tick'].to_numpy()[keep].astype(np.int64),
+        'x': np.rint(ticks_df['X'].to_numpy()[keep] * QUANT_STEPS).astype(np.int64),
+        'y': np.rint(ticks_df['Y'].to_numpy()[keep] * QUANT_STEPS).astype(np.int64),
+        'name': ticks_df['name'].to_numpy()[keep] if 'name' in ticks_df else '',
+        'side': ticks_df['team_name'].astype(str).to_numpy()[keep],
+    })
+    frame = frame.sort_values(['round', 'steamid', 'tick'], kind='stable')
+    frame = frame[~frame.duplicated(['round', 'steamid', 'tick'])].reset_index(drop=True)
+
+    n = len(frame)
+    starts = np.flatnonzero(np.r_[True, (np.diff(frame['round'].to_numpy()) != 0)
+                                  | (np.diff(frame['steamid'].to_numpy()) != 0)]) if n else np.array([], dtype=np.int64)
+    deltas = np.diff(frame[['tick', 'x', 'y']].to_numpy(), axis=0, prepend=np.zeros((1, 3), dtype=np.int64)) \
+        if n else np.zeros((0, 3), dtype=np.int64)
+    deltas[starts] = 0
+
+    # The most common tick delta is implicit, the others are gaps
+    steps = deltas[deltas[:, 0] > 0, 0]
+    tick_step = int(np.bincount(steps).argmax()) if steps.size else 1
+    extra = deltas[:, 0] - tick_step
+    extra[starts] = 0
+    gap_rows = np.flatnonzero(extra)
+
+    moves = deltas[:, 1:]
+    clipped = np.clip(moves, -INT16_MAX, INT16_MAX)
+    fix_row, fix_channel = np.nonzero(clipped != moves)
+
+    first = frame.iloc[starts]
+    index = {
+        'tick_step': tick_step,
+        'tracks': {
+            'round': first['round'].tolist(),
+            'steamid': [str(s) for s in first['steamid']],
+            'name': [str(s) for s in first['name']],
+            'side': first['side'].tolist(),
+            'offset': starts.tolist(),
+            'length': np.diff(np.r_[starts, n]).astype(np.int64).tolist(),
+            'tick0': first['tick'].tolist(),
+            'x0': first['x'].tolist(),
+            'y0': first['y'].tolist(),
+        },
+        'gaps': {'row': gap_rows.tolist(), 'extra': extra[gap_rows].tolist()},
+        'fixups': {'row': fix_row.tolist(), 'channel': fix_channel.tolist(),
+                   'residual': (moves - clipped)[fix_row, fix_channel].tolist()},
+    }
+    return clipped.astype('<i2'), index
+
+
+def write_trajectories(ticks_df: pd.DataFrame, path: str, metadata: Optional[dict] = None) -> str:
+    """Encode a demo's tracks (see encode_tracks) into one trajectory file."""
+    rows, index = encode_tracks(ticks_df)
+    header = json.dumps({'format': TRAJECTORY_FORMAT, 'quant_steps': QUANT_STEPS, 'rows': int(rows.shape[0]),
+                         **index, 'metadata': metadata or {}}, separators=(',', ':')).encode('utf-8')
+    # The int16 rows start on an 8-byte boundary
+    prefix = len(MAGIC) + 4
+    header += b' ' * (-(prefix + len(header)) % 8)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        f.write(rows.tobytes())
+    os.replace(tmp, path)
+    return path
+
+
+class DemoTrajectories():
+    """One demo's trajectory file: the header in memory, the rows memory-mapped."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise TrajectoryError(f"{path} is not a trajectory file")
+            (length,) = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(length))
+        if header.get('format') != TRAJECTORY_FORMAT:
+            raise TrajectoryError(f"{path} has format {header.get('format')}, expected {TRAJECTORY_FORMAT}")
+        self.metadata = header['metadata']
+        self.quant_steps = header['quant_steps']
+        self.tick_step = header['tick_step']
+        tracks = header['tracks']
+        self._round = np.asarray(tracks['round'], dtype=np.int64)
+        self._info = list(zip(tracks['steamid'], tracks['name'], tracks['side']))
+        self._bounds = np.column_stack([tracks['offset'], tracks['length'], tracks['tick0'], tracks['x0'],
+                                        tracks['y0']]).astype(np.int64) if tracks['round'] else np.zeros((0, 5), np.int64)
+        self._gap_row = np.asarray(header['gaps']['row'], dtype=np.int64)
+        self._gap_extra = np.asarray(header['gaps']['extra'], dtype=np.int64)
+        fixups = header['fixups']
+        order = np.argsort(fixups['row'], kind='stable')
+        self._fix_row = np.asarray(fixups['row'], dtype=np.int64)[order]
+        self._fix_channel = np.asarray(fixups['channel'], dtype=np.int64)[order]
+        self._fix_residual = np.asarray(fixups['residual'], dtype=np.int64)[order]
+        n_rows = header['rows']
+        self.rows = np.memmap(path, dtype='<i2', mode='r', offset=len(MAGIC) + 4 + length, shape=(n_rows, 2)) \
+            if n_rows else np.zeros((0, 2), dtype='<i2')
+
+    @property
+    def rounds(self) -> List[int]:
+        return np.unique(self._round).tolist()
+
+    def players(self, round_number: int) -> list:
+        return [dict(zip(('steamid', 'name', 'side'), self._info[i])) for i in np.flatnonzero(self._round == round_number)]
+
+    def _decode(self, i: int) -> np.ndarray:
+        # (ticks, x, y) of track i in stored units
+        start, length, tick0, x0, y0 = self._bounds[i]
+        stop = start + length
+        moves = np.asarray(self.rows[start:stop], dtype=np.int64)
+        lo, hi = np.searchsorted(self._fix_row, [start, stop])
+        if hi > lo:
+            np.add.at(moves, (self._fix_row[lo:hi] - start, self._fix_channel[lo:hi]), self._fix_residual[lo:hi])
+        dt = np.full(length, self.tick_step, dtype=np.int64)
+        dt[0] = 0
+        lo, hi = np.searchsorted(self._gap_row, [start, stop])
+        dt[self._gap_row[lo:hi] - start] += self._gap_extra[lo:hi]
+        ticks = tick0 + np.cumsum(dt)
+        return ticks, x0 + np.cumsum(moves[:, 0]), y0 + np.cumsum(moves[:, 1])
+
+    def round_points(self, round_number: int, tick_step: Optional[int] = None, max_points: Optional[int] = None):
+        """
+        (steamid, name, side, ticks, x, y) per player of a round, with x and y
+        in world units as float arrays; see round_paths for the downsampling.
+        """
+        out = []
+        for i in np.flatnonzero(self._round == round_number):
+            ticks, x, y = self._decode(i)
+            keep = None
+            if tick_step and tick_step > 1:
+                _, keep = np.unique((ticks - ticks[0]) // tick_step, return_index=True)
+                if keep[-1] != len(ticks) - 1:
+                    keep = np.r_[keep, len(ticks) - 1]
+            if max_points and len(ticks if keep is None else keep) > max_points:
+                # linspace ends on the last point, so it stays within max_points
+                base = np.arange(len(ticks)) if keep is None else keep
+                keep = base[np.unique(np.linspace(len(base) - 1 if max_points == 1 else 0, len(base) - 1,
+                                                  max_points).round().astype(np.int64))]
+            if keep is not None:
+                ticks, x, y = ticks[keep], x[keep], y[keep]
+            out.append((*self._info[i], ticks, x / self.quant_steps, y / self.quant_steps))
+        return out
+
+    def round_paths(self, round_number: int, tick_step: Optional[int] = None, max_points: Optional[int] = None) -> list:
+        """
+        Every player's path in a round.
+
+        Args:
+            round_number (int): 1-based round, as in the round summaries.
+            tick_step (int): Keep at most one point per tick_step ticks.
+            max_points (int): Keep at most this many evenly spaced points per player.
+
+        Returns:
+            list: One dict per player (steamid, name, side, tick, x, y); the
+                last point (where the player died or the round ended) is always kept.
+        """
+        return [{'steamid': steamid, 'name': name, 'side': side, 'tick': ticks.tolist(), 'x': x.tolist(),
+                 'y': y.tolist()}
+                for steamid, name, side, ticks, x, y in self.round_points(round_number, tick_step, max_points)]
+
+
+class TrajectoryStore():
+    """Trajectory files by demo id (<folder>/<demo_id>.traj), with the recently opened ones kept open."""
+
+    def __init__(self, folder: str = TRAJECTORY_DIR):
+        self.folder = folder
+        self._open = OrderedDict()
+
+    def path(self, demo_id: str) -> str:
+        return os.path.join(self.folder, f"{_check_demo_id(demo_id)}{SUFFIX}")
+
+    def write(self, ticks_df: pd.DataFrame, demo_id: str, metadata: Optional[dict] = None) -> str:
+        return write_trajectories(ticks_df, self.path(demo_id), {'demo_id': demo_id, **(metadata or {})})
+
+    def demo_ids(self) -> List[str]:
+        if not os.path.isdir(self.folder):
+            return []
+        return sorted(name[:-len(SUFFIX)] for name in os.listdir(self.folder) if name.endswith(SUFFIX))
+
+    def open(self, demo_id: str) -> Optional[DemoTrajectories]:
+        """The demo's trajectories, or None when it has no file."""
+        path = self.path(demo_id)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        cached = self._open.get(demo_id)
+        if cached is not None and cached[0] == mtime:
+            self._open.move_to_end(demo_id)
+            return cached[1]
+        demo = DemoTrajectories(path)
+        self._open[demo_id] = (mtime, demo)
+        if len(self._open) > OPEN_CACHE_SIZE:
+            self._open.popitem(last=False)
+        return demo
+
+
+def _main(argv=None):
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Build trajectory files from demos, or print a stored round")
+    sub = parser.add_subparsers(dest='command', required=True)
+    # Files built here are named after the demo file; the batch builder
+    # (trajectory_folder) names them by the round summaries demo id
+    build = sub.add_parser('build', help="Parse demos and write their trajectory files")
+    build.add_argument('demo_paths', nargs='+')
+    build.add_argument('--folder', default=TRAJECTORY_DIR)
+    show = sub.add_parser('show', help="Summarize a stored round")
+    show.add_argument('demo_id')
+    show.add_argument('round', type=int)
+    show.add_argument('--folder', default=TRAJECTORY_DIR)
+    show.add_argument('--max-points', type=int)
+    args = parser.parse_args(argv)
+
+    store = TrajectoryStore(args.folder)
+    if args.command == 'build':
+        from demoparser2 import DemoParser
+        props = ['tick', 'X', 'Y', 'health', 'team_name', 'is_warmup_period', 'total_rounds_played']
+        for demo_path in args.demo_paths:
+            start = time.perf_counter()
+            demo_id = os.path.splitext(os.path.basename(demo_path))[0]
+            path = store.write(DemoParser(demo_path).parse_ticks(wanted_props=props), demo_id)
+            print(f"💾 {demo_id}: {os.path.getsize(path) / 2**20:.2f} MB in {time.perf_counter() - start:.1f} s")
+        return
+    demo = store.open(args.demo_id)
+    if demo is None:
+        sys.exit(f"❌ No trajectories for {args.demo_id} in {args.folder}")
+    for player in demo.round_paths(args.round, max_points=args.max_points):
+        print(f"{player['side']:>9} {player['name']:<20} {len(player['tick']):5d} points, "
+              f"ticks {player['tick'][0]}-{player['tick'][-1]}")
+
+
+if __name__ == "__main__":
+    _main()
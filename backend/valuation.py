@@ -0,0 +1,232 @@
+###############################################################################
+# Loadout valuation
+#
+# Prices what players carry with the WEAPON_VALUES table, the one the
+# dashboard uses for its lineups. Parser weapon names ('AK-47', 'High
+# Explosive Grenade', 'USP-S') and dashboard names ('AK47', 'HE Grenade',
+# 'USP-S/P2000/Glock-18') are normalized to the same item codes; each
+# distinct name is looked up once, and a column of millions of names is
+# priced with one take on the code -> price array.
+#
+# With VALUATION_PROPS parsed (inventory, armor, helmet, defuser) the value
+# of a player is their whole loadout, the same thing current_equip_value
+# counts, so the two can be cross-checked. With only weapon_name (the
+# worker's TICK_PROPS) it is the value of the weapon in hand.
+#
+# pandas is only imported by the frame methods, so pricing a dashboard
+# lineup in the predictor does not load it.
+###############################################################################
+
+import os
+import re
+import sys
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+if __package__ in (None, ''):
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.constants import WEAPON_VALUES
+
+# Parser props for whole loadouts
+VALUATION_PROPS = ['tick', 'team_name', 'inventory', 'armor_value', 'has_helmet', 'has_defuser', 'is_freeze_period',
+                   'total_rounds_played', 'current_equip_value']
+
+# Slots of a dashboard lineup (lineup_value); each holds a name, comma separated names or a list of names
+LOADOUT_SLOTS = ('primary', 'secondary', 'grenades', 'equipment')
+
+# Items the parser reports that the dashboard table does not list
+EXTRA_PRICES = {
+    'Dual Berettas': 300,
+    'R8 Revolver': 600,
+    'Negev': 1700,
+    'M249': 5200,
+    'G3SG1': 5000,
+    'SCAR-20': 5000,
+    'Zeus x27': 200,
+    # Free items
+    'knife': 0,
+    'knife_t': 0,
+    'C4 Explosive': 0,
+}
+
+# Parser spellings whose normalized form differs from the table's
+ALIASES = {
+    'High Explosive Grenade': 'HE Grenade',
+    'Incendiary Grenade': 'Incendiary',
+    'Decoy Grenade': 'Decoy',
+    'Kevlar Vest': 'Kevlar',
+    'Defuse Kit': 'Defuse-kit',
+}
+
+KEVLAR, HELMET, DEFUSER = 'Kevlar', 'Helmet', 'Defuse-kit'
+
+
+def normalize_name(name: str) -> str:
+    """'AK-47', 'ak47' and 'AK 47' all become 'ak47'; knife skins ('weapon_knife_karambit') become 'knife'."""
+    key = re.sub(r'[^a-z0-9]', '', str(name).lower().removeprefix('weapon_'))
+    return 'knife' if key.startswith(('knife', 'bayonet')) else key
+
+
+class LoadoutValuer():
+    """
+    Item codes and prices from a WEAPON_VALUES-shaped table. Code 0 is an
+    item without a price (unknown names are worth 0 and listed by unknown()).
+    """
+
+    def __init__(self, weapon_values: dict = WEAPON_VALUES, extra_prices: Optional[dict] = EXTRA_PRICES):
+        self.names = ['']
+        prices = [0]
+        self._codes = {}
+        for group in weapon_values.values():
+            for name, price in group.items():
+                # Dashboard entries like 'USP-S/P2000/Glock-18' price each pistol
+                self._add(name, price, names=[name] + name.split('/'), prices=prices)
+        for name, price in (extra_prices or {}).items():
+            self._add(name, price, names=[name], prices=prices)
+        for alias, name in ALIASES.items():
+            code = self._codes.get(normalize_name(name))
+            if code is not None:
+                self._codes.setdefault(normalize_name(alias), code)
+        self.prices = np.asarray(prices, dtype=np.int64)
+
+    def _add(self, name: str, price: int, names: List[str], prices: list) -> None:
+        self.names.append(name)
+        prices.append(int(price))
+        for alias in names:
+            self._codes.setdefault(normalize_name(alias), len(self.names) - 1)
+
+    def code(self, name) -> int:
+        if name is None or (isinstance(name, float) and np.isnan(name)):
+            return 0
+        return self._codes.get(normalize_name(name), 0)
+
+    def price(self, name) -> int:
+        return int(self.prices[self.code(name)])
+
+    def codes(self, names) -> np.ndarray:
+        """Item codes of a column of names (list, array, Series or Categorical); every distinct name is normalized once."""
+        import pandas as pd
+        categorical = names.cat if isinstance(names, pd.Series) and names.dtype == 'category' else \
+            pd.Categorical(np.asarray(names, dtype=object))
+        categories = categorical.categories
+        codes = np.asarray(categorical.codes)
+        # -1 (missing) picks the appended 0
+        mapping = np.append(np.fromiter((self.code(c) for c in categories), dtype=np.int64, count=len(categories)), 0)
+        return mapping[codes]
+
+    def values(self, names) -> np.ndarray:
+        return self.prices.take(self.codes(names))
+
+    def unknown(self, names) -> List[str]:
+        """Distinct non-empty names that have no price, for checking the table against new parser output."""
+        import pandas as pd
+        distinct = pd.unique(pd.Series(np.asarray(names, dtype=object)).dropna())
+        return sorted(str(n) for n in distinct if str(n) and self.code(n) == 0)
+
+    def player_values(self, ticks_df) -> np.ndarray:
+        """
+        Loadout value of every row of a player-tick frame: the items of
+        'inventory' (else the 'weapon_name' in hand), plus kevlar, helmet and
+        defuser when armor_value, has_helmet and has_defuser are present.
+        """
+        n = len(ticks_df)
+        if 'inventory' in ticks_df:
+            items = ticks_df['inventory'].reset_index(drop=True).explode()
+            items = items[items.notna()]
+            value = np.bincount(items.index.to_numpy(), weights=self.values(items.to_numpy()), minlength=n)
+        elif 'weapon_name' in ticks_df:
+            value = self.values(ticks_df['weapon_name']).astype(np.float64)
+        else:
+            value = np.zeros(n)
+        if 'armor_value' in ticks_df:
+            value += np.where(ticks_df['armor_value'].fillna(0).to_numpy() > 0, self.price(KEVLAR), 0)
+        if 'has_helmet' in ticks_df:
+            value += np.where(ticks_df['has_helmet'].fillna(False).to_numpy(dtype=bool), self.price(HELMET), 0)
+        if 'has_defuser' in ticks_df:
+            value += np.where(ticks_df['has_defuser'].fillna(False).to_numpy(dtype=bool), self.price(DEFUSER), 0)
+        return value.astype(np.int64)
+
+    def team_values(self, ticks_df, by: Iterable[str] = ('tick', 'team_name')):
+        """Sum of player_values per group (default: per tick and side) as a Series."""
+        import pandas as pd
+        keys = [ticks_df[column].reset_index(drop=True) for column in by]
+        return pd.Series(self.player_values(ticks_df)).groupby(keys, sort=True, observed=True).sum().rename('loadout_value')
+
+    def round_team_values(self, ticks_df):
+        """
+        Team loadout values at the first live tick of every round, next to the
+        parser's summed current_equip_value when the frame has it.
+
+        Returns:
+            pd.DataFrame: round (1-based, as in the round summaries), team_name,
+                loadout_value and current_equip_value.
+        """
+        import pandas as pd
+        frame = ticks_df
+        if 'is_freeze_period' in frame:
+            frame = frame[~frame['is_freeze_period'].to_numpy(dtype=bool)]
+        first = frame.groupby('total_rounds_played', observed=True)['tick'].transform('min')
+        frame = frame[frame['tick'].to_numpy() == first.to_numpy()]
+        out = pd.DataFrame({'round': frame['total_rounds_played'].to_numpy().astype(np.int64) + 1,
+                            'team_name': frame['team_name'].astype(str).to_numpy(),
+                            'loadout_value': self.player_values(frame)})
+        if 'current_equip_value' in frame:
+            out['current_equip_value'] = frame['current_equip_value'].fillna(0).to_numpy().astype(np.int64)
+        return out.groupby(['round', 'team_name'], sort=True).sum().reset_index()
+
+    def lineup_value(self, loadouts: list) -> int:
+        """
+        Value of a dashboard lineup: one dict per player with 'primary',
+        'secondary', 'grenades' and 'equipment' (lists or comma separated names).
+        """
+        total = 0
+        for loadout in loadouts:
+            for slot in LOADOUT_SLOTS:
+                items = loadout.get(slot) or []
+                if isinstance(items, str):
+                    items = items.split(',')
+                total += sum(self.price(item) for item in items if item)
+        return total
+
+
+_DEFAULT_VALUER = None
+
+
+def default_valuer() -> LoadoutValuer:
+    """The LoadoutValuer over constants.WEAPON_VALUES, built once."""
+    global _DEFAULT_VALUER
+    if _DEFAULT_VALUER is None:
+        _DEFAULT_VALUER = LoadoutValuer()
+    return _DEFAULT_VALUER
+
+
+def _main(argv=None):
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Price a demo's loadouts and compare them with current_equip_value")
+    parser.add_argument('demo_path')
+    args = parser.parse_args(argv)
+
+    from demoparser2 import DemoParser
+    start = time.perf_counter()
+    ticks_df = DemoParser(args.demo_path).parse_ticks(wanted_props=VALUATION_PROPS)
+    parsed = time.perf_counter()
+    valuer = default_valuer()
+    rounds = valuer.round_team_values(ticks_df)
+    values = valuer.player_values(ticks_df)
+    priced = time.perf_counter()
+
+    print(rounds.to_string(index=False))
+    diff = (rounds['loadout_value'] - rounds['current_equip_value']).abs()
+    print(f"📊 {len(ticks_df):,} player ticks priced in {priced - parsed:.2f} s (parse {parsed - start:.1f} s); "
+          f"team values within $100 of current_equip_value in {(diff <= 100).mean():.0%} of rounds, "
+          f"mean player value ${values.mean():,.0f}")
+    unknown = valuer.unknown(ticks_df['inventory'].explode())
+    if unknown:
+        print(f"⚠️  Items without a price: {', '.join(unknown)}")
+
+
+if __name__ == "__main__":
+    _main()
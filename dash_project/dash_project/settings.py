@@ -21,7 +21,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'predictor.middleware.LatencyMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'django.middleware.gzip.GZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -49,12 +51,55 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'dash_project.wsgi.application'
+ASGI_APPLICATION = 'dash_project.asgi.application'
+
+# Micro-batching for /api/predict/batched/ (ASGI only): requests arriving within
+# WINDOW_MS of each other, up to MAX_BATCH, share one model call
+PREDICTOR_BATCHING = {
+    'WINDOW_MS': 2,
+    'MAX_BATCH': 64,
+}
+
+# In-round win probability over uploaded demos (/api/inround/demo/): score every
+# TIME_STEP seconds besides the state changes, parsing CHUNK_TICKS ticks at a
+# time so the memory of a request does not grow with the length of the demo.
+# Uploads over MAX_UPLOAD_BYTES are refused with a 413 before they are written
+PREDICTOR_INROUND = {
+    'TIME_STEP': 5.0,
+    'CHUNK_TICKS': 50_000,
+    'MAX_UPLOAD_BYTES': 512 * 1024 * 1024,
+}
+
+# Position heatmaps (/api/heatmap/<map>.png) over the demos of DEMOS_DIR
+# (default: the repo's demos/), counting every TICK_STRIDE-th tick on a BINS
+# grid. Tiles are cached under model/cache/heatmaps.
+PREDICTOR_HEATMAP = {
+    'DEMOS_DIR': None,
+    'BINS': 128,
+    'TICK_STRIDE': 16,
+    'CHUNK_TICKS': 50_000,
+}
+
+# Trajectory files served by /api/replay/ (default: model/datasets/trajectories,
+# where batch_builder writes them with trajectory_folder=TRAJECTORY_DIR)
+PREDICTOR_TRAJECTORY_DIR = None
+
+# Per-player features added to /api/predict/ rows (default: model/player_stats,
+# written by model/player_stats.py)
+PREDICTOR_PLAYER_STORE_DIR = None
 
 # Database - default sqlite
+# WAL lets history pages be read while api_predict appends predictions, and
+# IMMEDIATE transactions make concurrent writers queue instead of failing.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'OPTIONS': {
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -72,3 +117,17 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'predictor', 'static')]
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Fraction of predictions logged as JSON lines on the 'predictor' logger
+PREDICTOR_LOG_SAMPLE_RATE = float(os.environ.get('PREDICTOR_LOG_SAMPLE_RATE', '0.01'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'predictor': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
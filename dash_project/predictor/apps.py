@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class PredictorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'predictor'
+
+    def ready(self):
+        # Serialize and compress the dashboard data once at startup
+        from .assets import get_dashboard_asset
+        get_dashboard_asset()
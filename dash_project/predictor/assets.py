@@ -0,0 +1,124 @@
+import os
+import gzip
+import json
+import hashlib
+from pathlib import Path
+from threading import Lock
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+import backend.constants as constants
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is always available
+    brotli = None
+
+BASE_REPO = Path(__file__).resolve().parents[2]
+PLAYERS_PATH = BASE_REPO / 'dash_project' / 'predictor' / 'data' / 'players.json'
+# What the dashboard page is made of besides the data asset
+PAGE_FILES = [
+    BASE_REPO / 'dash_project' / 'predictor' / 'templates' / 'predictor' / 'dashboard.html',
+    BASE_REPO / 'dash_project' / 'predictor' / 'static' / 'predictor' / 'dashboard.js',
+    BASE_REPO / 'dash_project' / 'predictor' / 'static' / 'predictor' / 'styles.css',
+]
+
+
+class CompressedJsonAsset():
+    """
+    A JSON document serialized and compressed once, served with a content
+    hash version, ETag and Last-Modified.
+    """
+
+    def __init__(self, data, last_modified: float):
+        self.body = json.dumps(data, separators=(',', ':'), sort_keys=True).encode('utf-8')
+        self.version = hashlib.sha256(self.body).hexdigest()[:16]
+        self.etag = f'W/"{self.version}"'
+        self.last_modified = int(last_modified)
+        self.encoded = {'gzip': gzip.compress(self.body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.encoded['br'] = brotli.compress(self.body, quality=11)
+
+    def _pick_encoding(self, accept_encoding: str):
+        accepted = set()
+        for token in accept_encoding.split(','):
+            name, _, params = token.strip().partition(';')
+            if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                accepted.add(name.strip().lower())
+        for encoding in ('br', 'gzip'):
+            if encoding in self.encoded and encoding in accepted:
+                return encoding
+        return None
+
+    def response(self, request, immutable: bool = False) -> HttpResponse:
+        not_modified = get_conditional_response(request, etag=self.etag, last_modified=self.last_modified)
+        if not_modified is not None:
+            response = not_modified
+        else:
+            encoding = self._pick_encoding(request.headers.get('Accept-Encoding', ''))
+            response = HttpResponse(self.encoded[encoding] if encoding else self.body, content_type='application/json')
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = self.etag
+        response['Last-Modified'] = http_date(self.last_modified)
+        response['Cache-Control'] = 'public, max-age=31536000, immutable' if immutable else 'no-cache'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+_DASHBOARD_ASSET = None
+_DASHBOARD_ASSET_KEY = None
+_PAGE_VERSION = None
+_PAGE_VERSION_KEY = None
+_LOCK = Lock()
+
+
+def _load_players() -> dict:
+    if not PLAYERS_PATH.exists():
+        return {}
+    with open(PLAYERS_PATH, 'r') as f:
+        return json.load(f)
+
+
+def get_dashboard_asset() -> CompressedJsonAsset:
+    """
+    Static data the dashboard needs: the weapon price table and the preset
+    team names. Rosters and players are looked up through /api/players/.
+
+    Built once and rebuilt only when players.json changes on disk.
+    """
+    global _DASHBOARD_ASSET, _DASHBOARD_ASSET_KEY
+    mtime = PLAYERS_PATH.stat().st_mtime if PLAYERS_PATH.exists() else 0.0
+    constants_mtime = os.path.getmtime(constants.__file__)
+    key = (mtime, constants_mtime)
+    if _DASHBOARD_ASSET is None or _DASHBOARD_ASSET_KEY != key:
+        with _LOCK:
+            if _DASHBOARD_ASSET is None or _DASHBOARD_ASSET_KEY != key:
+                data = {
+                    'weapons': constants.WEAPON_VALUES,
+                    'teams': sorted(_load_players().keys()),
+                }
+                _DASHBOARD_ASSET = CompressedJsonAsset(data, last_modified=max(key))
+                _DASHBOARD_ASSET_KEY = key
+    return _DASHBOARD_ASSET
+
+
+def get_page_version() -> str:
+    """
+    Content hash of the dashboard template and its static files, so a deploy
+    that changes them changes the page's ETag. Re-hashed only when one of
+    them changes on disk.
+    """
+    global _PAGE_VERSION, _PAGE_VERSION_KEY
+    key = tuple(path.stat().st_mtime if path.exists() else 0.0 for path in PAGE_FILES)
+    if _PAGE_VERSION is None or _PAGE_VERSION_KEY != key:
+        with _LOCK:
+            if _PAGE_VERSION is None or _PAGE_VERSION_KEY != key:
+                digest = hashlib.sha256()
+                for path in PAGE_FILES:
+                    digest.update(path.read_bytes() if path.exists() else b'')
+                _PAGE_VERSION = digest.hexdigest()[:16]
+                _PAGE_VERSION_KEY = key
+    return _PAGE_VERSION
@@ -0,0 +1,86 @@
+import asyncio
+import weakref
+from typing import Callable, List
+
+from django.conf import settings
+
+DEFAULT_WINDOW_MS = 2.0
+DEFAULT_MAX_BATCH = 64
+
+
+class PredictionBatcher():
+    """
+    Coalesce concurrent single-row predictions into batched model calls.
+
+    The first row to arrive opens a window of window_ms; every row submitted
+    before it closes (or until max_batch rows are queued) is scored by one
+    predict_fn(rows) call in a worker thread, and each caller gets its own
+    result back.
+    """
+
+    def __init__(self, predict_fn: Callable[[List[dict]], list], window_ms: float = DEFAULT_WINDOW_MS,
+                 max_batch: int = DEFAULT_MAX_BATCH):
+        self.predict_fn = predict_fn
+        self.window = max(window_ms, 0) / 1000.0
+        self.max_batch = max(int(max_batch), 1)
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+        self.batches = 0
+        self.rows = 0
+
+    async def submit(self, row: dict):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((row, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        # Keep a reference so the task is not garbage collected mid-flight
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        rows = [row for row, _ in batch]
+        self.batches += 1
+        self.rows += len(rows)
+        try:
+            # The model call releases the loop while NumPy works in a thread
+            results = await asyncio.to_thread(self.predict_fn, rows)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+# One batcher per event loop: futures can only be resolved on their own loop
+_BATCHERS = weakref.WeakKeyDictionary()
+
+
+def get_batcher(predict_fn: Callable[[List[dict]], list]) -> PredictionBatcher:
+    loop = asyncio.get_running_loop()
+    batcher = _BATCHERS.get(loop)
+    if batcher is None:
+        config = getattr(settings, 'PREDICTOR_BATCHING', {})
+        batcher = PredictionBatcher(
+            predict_fn,
+            window_ms=config.get('WINDOW_MS', DEFAULT_WINDOW_MS),
+            max_batch=config.get('MAX_BATCH', DEFAULT_MAX_BATCH),
+        )
+        _BATCHERS[loop] = batcher
+    return batcher
@@ -0,0 +1,347 @@
+import os
+import json
+import time
+import random
+import shutil
+import asyncio
+import platform
+import tempfile
+import subprocess
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import joblib
+import numpy as np
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import resolve
+from asgiref.sync import iscoroutinefunction
+
+from backend.bundle import load_current_bundle
+
+BASE_REPO = Path(__file__).resolve().parents[4]
+PLAYERS_PATH = BASE_REPO / 'dash_project' / 'predictor' / 'data' / 'players.json'
+ALL_PLAYERS_PATH = BASE_REPO / 'model' / 'all_players.pkl'
+MAPS_PATH = BASE_REPO / 'model' / 'maps_names.pkl'
+
+DEFAULT_ENDPOINTS = ['/api/predict/', '/api/predict/batched/']
+MAX_EQUIP_VALUE = 32000
+
+
+def _load_pickle(path: Path) -> list:
+    try:
+        return list(joblib.load(path))
+    except (OSError, ValueError, EOFError):
+        return []
+
+
+def build_payloads(n: int, seed: int = 0) -> list:
+    """
+    Synthetic but valid /api/predict/ bodies.
+
+    Maps and players come from maps_names.pkl, all_players.pkl, players.json
+    and the current bundle; half of the lineups are preset rosters, the rest
+    are random draws from every known steamid.
+    """
+    rng = random.Random(seed)
+    teams = {}
+    if PLAYERS_PATH.exists():
+        with open(PLAYERS_PATH, 'r') as f:
+            teams = json.load(f)
+    rosters = [[str(s) for s in roster.values()] for roster in teams.values() if len(roster) >= 5]
+
+    maps = set(_load_pickle(MAPS_PATH))
+    pool = {str(p) for p in _load_pickle(ALL_PLAYERS_PATH)}
+    pool.update(s for roster in rosters for s in roster)
+    try:
+        schema = load_current_bundle().schema
+        maps.update(schema.maps)
+        pool.update(schema.players)
+    except (FileNotFoundError, ValueError):
+        pass
+    if not maps or len(pool) < 10:
+        raise CommandError('Not enough maps or players on disk to build payloads')
+    maps, pool = sorted(maps), sorted(pool)
+
+    payloads = []
+    for _ in range(n):
+        if len(rosters) >= 2 and rng.random() < 0.5:
+            ct, t = rng.sample(rosters, 2)
+            ct, t = ct[:5], t[:5]
+        else:
+            lineup = rng.sample(pool, 10)
+            ct, t = lineup[:5], lineup[5:]
+        payloads.append({
+            'map': rng.choice(maps),
+            'ct_team_players': ct,
+            't_team_players': t,
+            'team_ct_current_equip_value': str(rng.randrange(0, MAX_EQUIP_VALUE, 50)),
+            'team_t_current_equip_value': str(rng.randrange(0, MAX_EQUIP_VALUE, 50)),
+        })
+    return payloads
+
+
+def summarize(endpoint: str, latencies: list, statuses: dict, elapsed: float, concurrency: int) -> dict:
+    lat = np.asarray(latencies, dtype=np.float64) * 1000.0
+    ok = statuses.get(200, 0)
+    return {
+        'endpoint': endpoint,
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'errors': len(latencies) - ok,
+        'statuses': {str(k): v for k, v in sorted(statuses.items())},
+        'duration_s': round(elapsed, 4),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+        'latency_ms': {
+            'mean': round(float(lat.mean()), 3),
+            'p50': round(float(np.percentile(lat, 50)), 3),
+            'p95': round(float(np.percentile(lat, 95)), 3),
+            'p99': round(float(np.percentile(lat, 99)), 3),
+            'max': round(float(lat.max()), 3),
+        },
+    }
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class _HttpWorker():
+    # One keep-alive connection per worker thread
+    def __init__(self, base_url: str):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.conn = None
+
+    def post(self, path: str, body: bytes) -> int:
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.conn.request('POST', self.prefix + path, body, {'Content-Type': 'application/json'})
+                response = self.conn.getresponse()
+                response.read()
+                if response.will_close:
+                    self.conn.close()
+                    self.conn = None
+                return response.status
+            except (http.client.HTTPException, OSError):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the prediction API: throughput and p50/p95/p99 latency, written as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['client', 'server'], default='client',
+                            help="'client': Django test client in-process; 'server': HTTP against a local server")
+        parser.add_argument('--url', help='Base URL of an already running server (implies --mode server)')
+        parser.add_argument('--endpoint', action='append', dest='endpoints',
+                            help=f'Endpoint to drive, repeatable (default: {" ".join(DEFAULT_ENDPOINTS)})')
+        parser.add_argument('-n', '--requests', type=int, default=500)
+        parser.add_argument('-c', '--concurrency', type=int, default=8)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--payloads', type=int, default=256, help='Distinct synthetic payloads to cycle through')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the results as JSON to this path')
+        parser.add_argument('--baseline', help='Previous JSON result to compare against')
+        parser.add_argument('--max-regression', type=float, default=0.25,
+                            help='Fail when p95 latency grows by more than this fraction over --baseline')
+        parser.add_argument('--keep-history', action='store_true',
+                            help='Write the predictions to the real history table instead of a throwaway database')
+
+    def handle(self, *args, **options):
+        mode = 'server' if options['url'] else options['mode']
+        endpoints = options['endpoints'] or DEFAULT_ENDPOINTS
+        n, concurrency = max(options['requests'], 1), max(options['concurrency'], 1)
+        payloads = [json.dumps(p).encode('utf-8') for p in build_payloads(options['payloads'], options['seed'])]
+
+        # In-process runs record into a throwaway database, so the real history
+        # (and rows a running server writes meanwhile) is never touched
+        throwaway = None
+        if not options['keep_history'] and not options['url']:
+            throwaway = self._create_throwaway_db()
+
+        server = None
+        base_url = options['url']
+        if mode == 'server' and base_url is None:
+            server, base_url = self._start_server()
+
+        results = []
+        try:
+            for endpoint in endpoints:
+                if mode == 'client':
+                    run = self._run_client
+                else:
+                    run = lambda *a: self._run_http(base_url, *a)
+                if options['warmup'] > 0:
+                    run(endpoint, payloads, options['warmup'], concurrency)
+                results.append(run(endpoint, payloads, n, concurrency))
+                self._print_result(results[-1])
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+            if throwaway is not None:
+                self._destroy_throwaway_db(*throwaway)
+                self.stdout.write('🧹 Removed the throwaway history database')
+
+        report = {'meta': self._meta(mode, base_url, n, concurrency, options), 'results': results}
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2) + '\n')
+            self.stdout.write(f"💾 Results written to {options['output']}")
+        if options['baseline']:
+            self._compare(report, options['baseline'], options['max_regression'])
+
+    def _run_client(self, endpoint: str, payloads: list, n: int, concurrency: int) -> dict:
+        # The test clients always send Host: testserver
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            # Async views go through AsyncClient so concurrent requests share one
+            # event loop (and one batcher), exactly as under an ASGI server
+            if iscoroutinefunction(resolve(endpoint).func):
+                return asyncio.run(self._run_async_client(endpoint, payloads, n, concurrency))
+            return self._run_sync_client(endpoint, payloads, n, concurrency)
+
+    def _run_sync_client(self, endpoint: str, payloads: list, n: int, concurrency: int) -> dict:
+
+        local = threading.local()
+
+        def one(i):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = Client()
+            start = time.perf_counter()
+            response = client.post(endpoint, payloads[i % len(payloads)], content_type='application/json')
+            return time.perf_counter() - start, response.status_code
+
+        return self._run_threads(endpoint, one, n, concurrency)
+
+    async def _run_async_client(self, endpoint: str, payloads: list, n: int, concurrency: int) -> dict:
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies, statuses = [], {}
+
+        async def one(i):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(endpoint, payloads[i % len(payloads)], content_type='application/json')
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(n)))
+        return summarize(endpoint, latencies, statuses, time.perf_counter() - start, concurrency)
+
+    def _run_http(self, base_url: str, endpoint: str, payloads: list, n: int, concurrency: int) -> dict:
+        local = threading.local()
+
+        def one(i):
+            worker = getattr(local, 'worker', None)
+            if worker is None:
+                worker = local.worker = _HttpWorker(base_url)
+            start = time.perf_counter()
+            status = worker.post(endpoint, payloads[i % len(payloads)])
+            return time.perf_counter() - start, status
+
+        return self._run_threads(endpoint, one, n, concurrency)
+
+    def _run_threads(self, endpoint: str, one, n: int, concurrency: int) -> dict:
+        latencies, statuses = [], {}
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for elapsed, status in pool.map(one, range(n)):
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+        elapsed = time.perf_counter() - start
+        connections.close_all()
+        return summarize(endpoint, latencies, statuses, elapsed, concurrency)
+
+    def _create_throwaway_db(self):
+        # Same machinery as the test runner; SQLite gets a file rather than the
+        # in-memory default so the record stage still pays for a real write
+        connection = connections[DEFAULT_DB_ALIAS]
+        folder = None
+        if connection.vendor == 'sqlite':
+            folder = tempfile.mkdtemp(prefix='bench_predict-')
+            connection.settings_dict['TEST']['NAME'] = os.path.join(folder, 'history.sqlite3')
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        return old_name, folder
+
+    def _destroy_throwaway_db(self, old_name: str, folder: str):
+        connections.close_all()
+        connections[DEFAULT_DB_ALIAS].creation.destroy_test_db(old_name, verbosity=0)
+        if folder is not None:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    def _start_server(self):
+        # Same threaded WSGI server runserver uses, on a free local port
+        server = ThreadedWSGIServer(('127.0.0.1', 0), _QuietHandler, allow_reuse_address=False)
+        server.set_app(get_wsgi_application())
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address[:2]
+        return server, f'http://{host}:{port}'
+
+    def _meta(self, mode: str, base_url: str, n: int, concurrency: int, options: dict) -> dict:
+        try:
+            commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_REPO,
+                                    capture_output=True, text=True, timeout=5).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            commit = None
+        try:
+            model_version = load_current_bundle().version
+        except (FileNotFoundError, ValueError):
+            model_version = None
+        return {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'commit': commit,
+            'model_version': model_version,
+            'mode': mode,
+            'url': base_url,
+            'requests': n,
+            'concurrency': concurrency,
+            'warmup': options['warmup'],
+            'payloads': options['payloads'],
+            'seed': options['seed'],
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'cpu_count': len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count(),
+        }
+
+    def _print_result(self, result: dict):
+        lat = result['latency_ms']
+        self.stdout.write(
+            f"{result['endpoint']:24s} {result['throughput_rps']:8.1f} req/s  "
+            f"p50={lat['p50']:.2f}ms p95={lat['p95']:.2f}ms p99={lat['p99']:.2f}ms  "
+            f"errors={result['errors']}/{result['requests']}")
+
+    def _compare(self, report: dict, baseline_path: str, max_regression: float):
+        with open(baseline_path, 'r') as f:
+            baseline = {r['endpoint']: r for r in json.load(f)['results']}
+        regressions = []
+        for result in report['results']:
+            before = baseline.get(result['endpoint'])
+            if before is None:
+                continue
+            old, new = before['latency_ms']['p95'], result['latency_ms']['p95']
+            change = (new - old) / old if old else 0.0
+            self.stdout.write(f"{result['endpoint']:24s} p95 {old:.2f}ms -> {new:.2f}ms ({change:+.1%})")
+            if change > max_regression:
+                regressions.append(result['endpoint'])
+        if regressions:
+            raise CommandError(f"p95 regressed by more than {max_regression:.0%} on: {', '.join(regressions)}")
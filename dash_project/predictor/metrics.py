@@ -0,0 +1,59 @@
+import os
+import json
+import time
+import random
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Histogram, generate_latest
+
+logger = logging.getLogger('predictor')
+
+# Request latency spans ~1 ms (cached pages) to seconds (cold model load)
+REQUEST_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+# Stages are sub-millisecond when warm
+STAGE_BUCKETS = (.00005, .0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1, .25, 1)
+
+REQUEST_LATENCY = Histogram(
+    'predictor_request_duration_seconds', 'Time spent handling a request',
+    ['endpoint', 'method', 'status'], buckets=REQUEST_BUCKETS)
+STAGE_LATENCY = Histogram(
+    'predictor_stage_duration_seconds', 'Time spent in each stage of the prediction path',
+    ['endpoint', 'stage'], buckets=STAGE_BUCKETS)
+BATCH_ROWS = Histogram(
+    'predictor_batch_rows', 'Rows scored per model call',
+    ['endpoint'], buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+
+
+@contextmanager
+def stage_timer(endpoint: str, stage: str):
+    """Observe the wall time of a block in predictor_stage_duration_seconds."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(endpoint, stage).observe(time.perf_counter() - start)
+
+
+def log_sampled(event: str, **fields):
+    """
+    Emit a JSON log line for a fraction PREDICTOR_LOG_SAMPLE_RATE of calls,
+    so per-request logging stays cheap under load.
+    """
+    rate = getattr(settings, 'PREDICTOR_LOG_SAMPLE_RATE', 0.01)
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({'event': event, 'ts': time.time(), 'sample_rate': rate, **fields}, default=str))
+
+
+def render_metrics():
+    """Prometheus text exposition of every predictor metric."""
+    registry = REGISTRY
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        # Several server processes: aggregate the per-process files
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-19 17:25
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Prediction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('map_name', models.CharField(max_length=32)),
+                ('model_version', models.CharField(blank=True, default='', max_length=64)),
+                ('ct_players', models.JSONField(default=list)),
+                ('t_players', models.JSONField(default=list)),
+                ('team_ct_current_equip_value', models.IntegerField(default=0)),
+                ('team_t_current_equip_value', models.IntegerField(default=0)),
+                ('prediction', models.SmallIntegerField()),
+                ('prob_t', models.FloatField()),
+                ('prob_ct', models.FloatField()),
+            ],
+            options={
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['map_name', 'id'], name='prediction_map_id_idx')],
+            },
+        ),
+    ]
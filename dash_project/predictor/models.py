@@ -0,0 +1,32 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Prediction(models.Model):
+    """
+    One prediction served by api_predict. Rows are only ever appended, and
+    history pages are read newest first by primary key.
+    """
+    # Set when the object is built, not when it is inserted, so ids follow it only
+    # approximately; history_view turns date bounds into id bounds and keeps the date filter
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    map_name = models.CharField(max_length=32)
+    model_version = models.CharField(max_length=64, blank=True, default='')
+
+    ct_players = models.JSONField(default=list)
+    t_players = models.JSONField(default=list)
+    team_ct_current_equip_value = models.IntegerField(default=0)
+    team_t_current_equip_value = models.IntegerField(default=0)
+
+    prediction = models.SmallIntegerField()  # 2 T; 3 CT
+    prob_t = models.FloatField()
+    prob_ct = models.FloatField()
+
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['map_name', 'id'], name='prediction_map_id_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.created_at:%Y-%m-%d %H:%M:%S} {self.map_name} -> {self.prediction}'
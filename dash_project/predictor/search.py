@@ -0,0 +1,148 @@
+import json
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+from threading import Lock
+from typing import Iterable, List, Optional
+
+BASE_REPO = Path(__file__).resolve().parents[2]
+PLAYERS_PATH = BASE_REPO / 'dash_project' / 'predictor' / 'data' / 'players.json'
+
+DEFAULT_TOP_K = 10
+MAX_TOP_K = 50
+# Upper bound on keys visited for a very short prefix such as "a"
+MAX_PREFIX_SCAN = 2000
+
+
+def normalize(text: str) -> str:
+    # Case and accent insensitive key: "KSCERATO" / "kscerato", "Fälle" / "falle"
+    text = unicodedata.normalize('NFKD', str(text))
+    return ''.join(ch for ch in text if not unicodedata.combining(ch)).lower().strip()
+
+
+def trigrams(key: str) -> set:
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PlayerIndex():
+    """
+    In-memory search index over the known players.
+
+    Prefix lookups use a sorted key list and bisect, and typo-tolerant lookups
+    use a trigram inverted index, so a query touches only the matching entries.
+    """
+
+    def __init__(self, teams: dict, model_players: Iterable = ()):
+        self.entries = []
+        self.rosters = {}
+        model_players = {str(p) for p in model_players}
+        by_steamid = {}
+
+        for team, players in (teams or {}).items():
+            roster = []
+            for name, steamid in players.items():
+                steamid = str(steamid)
+                entry = by_steamid.get(steamid)
+                if entry is None:
+                    entry = {'name': name, 'steamid': steamid, 'teams': [],
+                             'known_to_model': steamid in model_players}
+                    by_steamid[steamid] = entry
+                    self.entries.append(entry)
+                entry['teams'].append(team)
+                roster.append(entry)
+            self.rosters[team] = roster
+
+        # Players the model knows but no preset names: searchable by steamid
+        for steamid in sorted(model_players - set(by_steamid)):
+            entry = {'name': steamid, 'steamid': steamid, 'teams': [], 'known_to_model': True}
+            self.entries.append(entry)
+
+        keys = []
+        self.grams = defaultdict(set)
+        self.name_grams = [trigrams(normalize(entry['name'])) for entry in self.entries]
+        for i, entry in enumerate(self.entries):
+            # steamids are matched by prefix only, names by prefix and trigrams
+            for key in {normalize(entry['name']), entry['steamid']}:
+                keys.append((key, i))
+            for g in self.name_grams[i]:
+                self.grams[g].add(i)
+        keys.sort()
+        self.keys = [k for k, _ in keys]
+        self.key_ids = [i for _, i in keys]
+
+    def _prefix_ids(self, prefix: str) -> dict:
+        # Entry id -> whether the match is exact, for every key starting with prefix
+        found = {}
+        pos = bisect_left(self.keys, prefix)
+        end = min(len(self.keys), pos + MAX_PREFIX_SCAN)
+        while pos < end and self.keys[pos].startswith(prefix):
+            i = self.key_ids[pos]
+            found[i] = found.get(i, False) or self.keys[pos] == prefix
+            pos += 1
+        return found
+
+    def search(self, query: str, k: int = DEFAULT_TOP_K) -> List[dict]:
+        """
+        Rank players for a query: exact matches, then prefix matches, then
+        trigram similarity. Ties prefer players known to the model.
+
+        Args:
+            query (str): Player name or steamid fragment.
+            k (int): Number of results to return.
+
+        Returns:
+            List[dict]: Up to k entries with 'name', 'steamid', 'teams',
+                'known_to_model' and a 'score' in [0, 1].
+        """
+        key = normalize(query)
+        if not key:
+            return []
+
+        scores = {}
+        for i, exact in self._prefix_ids(key).items():
+            scores[i] = 1.0 if exact else 0.8
+
+        # Typo tolerance is only needed when prefixes do not fill the page
+        query_grams = trigrams(key)
+        if len(key) >= 3 and len(scores) < k:
+            counts = defaultdict(int)
+            for g in query_grams:
+                for i in self.grams.get(g, ()):
+                    counts[i] += 1
+            for i, shared in counts.items():
+                if i in scores:
+                    continue
+                similarity = shared / len(query_grams | self.name_grams[i])
+                if similarity >= 0.2:
+                    scores[i] = round(0.7 * similarity, 4)
+
+        ranked = sorted(scores.items(), key=lambda kv: (
+            -kv[1], not self.entries[kv[0]]['known_to_model'], len(self.entries[kv[0]]['name']), self.entries[kv[0]]['name']))
+        return [dict(self.entries[i], score=score) for i, score in ranked[:max(k, 0)]]
+
+    def roster(self, team: str) -> Optional[List[dict]]:
+        return self.rosters.get(team)
+
+
+_INDEX = None
+_INDEX_KEY = None
+_LOCK = Lock()
+
+
+def get_player_index(model_players: Iterable = (), model_version: str = None) -> PlayerIndex:
+    """Build the index once, and again only when players.json or the model changes."""
+    global _INDEX, _INDEX_KEY
+    mtime = PLAYERS_PATH.stat().st_mtime if PLAYERS_PATH.exists() else 0.0
+    key = (mtime, model_version)
+    if _INDEX is None or _INDEX_KEY != key:
+        with _LOCK:
+            if _INDEX is None or _INDEX_KEY != key:
+                teams = {}
+                if PLAYERS_PATH.exists():
+                    with open(PLAYERS_PATH, 'r') as f:
+                        teams = json.load(f)
+                _INDEX = PlayerIndex(teams, model_players)
+                _INDEX_KEY = key
+    return _INDEX
@@ -1,11 +1,16 @@
 // dashboard.js
 
+// Preenchidos a partir de DASHBOARD_DATA_URL (JSON versionado e comprimido pelo servidor)
+let WEAPON_MAP = null;
+let TEAM_PRESETS = {};
+
 document.addEventListener("DOMContentLoaded", () => {
     
     // --- Funções de Custo (Inalteradas) ---
 
     // Recalcular custo sempre que algo for selecionado
     function recalcTeam(team) {
+        if (!WEAPON_MAP) return;
         let total = 0;
         
         // Para cada jogador
@@ -37,44 +42,76 @@ document.addEventListener("DOMContentLoaded", () => {
 
     // --- NOVO: Lógica de Seleção de Equipa ---
 
-    function setPlayers(teamSide, teamKey) {
-        console.log(TEAM_PRESETS);
-        
-        // Verifica se TEAM_PRESETS existe e se a chave da equipa é válida
-        const presets = TEAM_PRESETS && TEAM_PRESETS[teamKey];
-        
+    function fillPlayerInputs(teamSide, players) {
         // Seleciona todos os inputs de jogador para o lado da equipa (ex: ct_player_0, ct_player_1, ...)
         const playerInputs = document.querySelectorAll(`input[name^="${teamSide}_player_"]`);
 
-        // JSON values to array
-        const players_steamids = Object.values(presets);
-        const players_names = Object.keys(presets);
-        console.log(players_steamids);
-
-        if (!players_steamids || players_steamids.length !== 5) {
-            console.log("Limpando. Presets:", presets, "| Presets.length:", presets.length);
+        if (!players || players.length !== 5) {
             // Limpar campos se a seleção for nula ou o preset for inválido
             playerInputs.forEach(input => {
                 input.value = "";
+                input.dataset.steamid = "";
             });
             return;
         }
 
-        // Preenche os campos de input do jogador (steamid)
+        // Preenche os campos de input do jogador (nome visível, steamid em data-steamid)
         playerInputs.forEach((input, i) => {
-            console.log(input);
-            if (i < players_steamids.length) {
-                input.value = players_names[i];
-                input.dataset.steamid = players_steamids[i];
-            } else {
-                input.value = "";
-                input.dataset.steamid = "";
-            }
+            input.value = players[i].name;
+            input.dataset.steamid = players[i].steamid;
         });
-        
-        // Não limpamos o equipamento automaticamente, mas seria uma boa prática.
     }
 
+    function setPlayers(teamSide, teamKey) {
+        if (!teamKey) {
+            fillPlayerInputs(teamSide, null);
+            return;
+        }
+        // O roster vem do servidor, o dashboard não carrega a lista completa de jogadores
+        fetch(`/api/players/?team=${encodeURIComponent(teamKey)}`)
+            .then(response => response.ok ? response.json() : { players: null })
+            .then(data => fillPlayerInputs(teamSide, data.players))
+            .catch(error => console.error("Erro ao carregar equipa:", error));
+    }
+
+    // --- Pesquisa de jogadores (/api/players/?q=) ---
+
+    const suggestions = document.createElement('datalist');
+    suggestions.id = 'player-suggestions';
+    document.body.appendChild(suggestions);
+    let lastResults = {};
+    let searchTimer = null;
+
+    function searchPlayers(query) {
+        fetch(`/api/players/?q=${encodeURIComponent(query)}&k=10`)
+            .then(response => response.json())
+            .then(data => {
+                lastResults = {};
+                suggestions.innerHTML = "";
+                data.players.forEach(player => {
+                    lastResults[player.name] = player;
+                    const option = document.createElement('option');
+                    option.value = player.name;
+                    option.label = player.known_to_model ? player.teams.join(", ") : "desconhecido pelo modelo";
+                    suggestions.appendChild(option);
+                });
+            })
+            .catch(error => console.error("Erro na pesquisa de jogadores:", error));
+    }
+
+    document.querySelectorAll('.player-input').forEach(input => {
+        input.setAttribute('list', suggestions.id);
+        input.setAttribute('autocomplete', 'off');
+        input.addEventListener('input', () => {
+            const match = lastResults[input.value];
+            input.dataset.steamid = match ? match.steamid : "";
+            clearTimeout(searchTimer);
+            if (input.value.length >= 2 && !match) {
+                searchTimer = setTimeout(() => searchPlayers(input.value), 150);
+            }
+        });
+    });
+
     function handleSubmit(event) {
         event.preventDefault();
 
@@ -108,6 +145,16 @@ document.addEventListener("DOMContentLoaded", () => {
         });
         data["t_team_players"] = t_team_players_steamid;
 
+        // Loadouts selecionados: o servidor calcula o valor das equipas com a mesma tabela de preços
+        ['ct', 't'].forEach(team => {
+            data[`${team}_loadouts`] = [...document.querySelectorAll(`input[name^="${team}_player_"]`)].map((_, i) => ({
+                primary: document.querySelector(`input[name="${team}_primary_${i}"]`)?.value || "",
+                secondary: document.querySelector(`input[name="${team}_secondary_${i}"]`)?.value || "",
+                grenades: document.querySelector(`input[name="${team}_grenades_${i}"]`)?.value || "",
+                equipment: document.querySelector(`input[name="${team}_equipment_${i}"]`)?.value || ""
+            }));
+        });
+
         // Send POST request to the API endpoint
         fetch('http://127.0.0.1:8000/api/predict/', {
             method: 'POST',
@@ -213,7 +260,30 @@ form.addEventListener('submit', handleSubmit);
 
     document.querySelector('#predict-form').addEventListener('submit', handleSubmit);
 
-    // Recalcular já no início (todas as pistolas default)
-    recalcTeam("ct");
-    recalcTeam("t");
+    // ------------------------------------------------------------
+    //  Dados estáticos: tabela de preços e presets de equipas
+    // ------------------------------------------------------------
+    function fillTeamOptions(select) {
+        if (!select) return;
+        Object.keys(TEAM_PRESETS).forEach(teamKey => {
+            const option = document.createElement('option');
+            option.value = teamKey;
+            option.textContent = teamKey;
+            select.appendChild(option);
+        });
+    }
+
+    fetch(DASHBOARD_DATA_URL, { credentials: 'same-origin' })
+        .then(response => response.json())
+        .then(data => {
+            WEAPON_MAP = data.weapons;
+            TEAM_PRESETS = data.teams || {};
+            fillTeamOptions(ctSelect);
+            fillTeamOptions(tSelect);
+
+            // Recalcular já no início (todas as pistolas default)
+            recalcTeam("ct");
+            recalcTeam("t");
+        })
+        .catch(error => console.error("Erro ao carregar dados do dashboard:", error));
 });
\ No newline at end of file
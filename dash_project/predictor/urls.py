@@ -3,6 +3,14 @@ from . import views
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
+    path('api/dashboard-data/<str:version>.json', views.dashboard_data, name='dashboard_data'),
     path('api/predict/', views.api_predict, name='api_predict'),
+    path('api/predict/batched/', views.api_predict_batched, name='api_predict_batched'),
+    path('api/players/', views.api_players, name='api_players'),
+    path('api/inround/', views.api_inround, name='api_inround'),
+    path('api/inround/demo/', views.api_inround_demo, name='api_inround_demo'),
+    path('api/heatmap/<str:map_name>.png', views.api_heatmap, name='api_heatmap'),
+    path('api/replay/<str:demo_id>/<int:round_number>/', views.api_replay, name='api_replay'),
     path('history/', views.history_view, name='history'),
+    path('metrics', views.metrics, name='metrics'),
 ]
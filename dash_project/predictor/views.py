@@ -1,183 +1,620 @@
 import os
 import json
+import math
 import time
-from pathlib import Path
-from django.shortcuts import render
-from django.http import JsonResponse, HttpResponseBadRequest
+from datetime import datetime, time as dt_time
+from django.shortcuts import render, redirect
+from django.http import HttpResponse, JsonResponse, HttpResponseBadRequest
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
 from django.views.decorators.csrf import csrf_exempt
-
-import joblib
-import numpy as np
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils import timezone
+from django.db import DatabaseError, close_old_connections
+from django.conf import settings
 
 import backend.constants as constants
-import pandas as pd
-
-# Locate model and players file relative to repo root
-BASE_REPO = Path(__file__).resolve().parents[2]
-MODEL_PATH = BASE_REPO / 'model' / 'round_winner_model.pkl'
-MODEL_PLAYERS_PATH = BASE_REPO / 'model' / 'all_players.pkl'
-PLAYERS_PATH = BASE_REPO / 'dash_project' / 'predictor' / 'data' / 'players.json'
-MAPS_NAMES_PATH = BASE_REPO / 'model' / 'maps_names.pkl'
-HISTORY_FILE = BASE_REPO / 'data' / 'predictions_history.json'
-
-# Load model and players lazily
-_MODEL = None
-_MODEL_PLAYERS = None
-_ALL_PLAYERS = None
-_MAPS_NAMES = None
-
-
-def _load_model():
-    global _MODEL
-    if not _MODEL:
-        if MODEL_PATH.exists():
-            _MODEL = joblib.load(MODEL_PATH)
-        else:
-            _MODEL = None
-
-def _load_model_players():
-    global _MODEL_PLAYERS
-    if not _MODEL_PLAYERS and MODEL_PLAYERS_PATH.exists():
-        with open(MODEL_PLAYERS_PATH, 'r') as f:
-            _MODEL_PLAYERS = joblib.load(MODEL_PLAYERS_PATH)
-
-def _load_players():
-    global _ALL_PLAYERS
-    if not _ALL_PLAYERS and PLAYERS_PATH.exists():
-        with open(PLAYERS_PATH, 'r') as f:
-            _ALL_PLAYERS = json.load(f)
-
-def _load_maps_names():
-    global _MAPS_NAMES
-    if not _MAPS_NAMES and MAPS_NAMES_PATH.exists():
-        with open(MAPS_NAMES_PATH, 'r') as f:
-            _MAPS_NAMES = joblib.load(MAPS_NAMES_PATH)
-            
+from .assets import get_dashboard_asset, get_page_version
+from .batching import get_batcher
+from .metrics import BATCH_ROWS, log_sampled, logger, render_metrics, stage_timer
+from .models import Prediction
+from .search import DEFAULT_TOP_K, MAX_TOP_K, get_player_index
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 500
+# Highest team equip value a request may send: five players at MAX_PLAYER_EQUIP_VALUE
+MAX_PLAYER_EQUIP_VALUE = 10_000
+MAX_TEAM_EQUIP_VALUE = 5 * MAX_PLAYER_EQUIP_VALUE
+
+# Load model bundle lazily
+_BUNDLE = None
+# Seconds between checks of the CURRENT pointer, so a newly published bundle
+# (e.g. by model/retrain.py) is picked up without a restart
+BUNDLE_RELOAD_SECONDS = 5.0
+_BUNDLE_CHECKED_AT = 0.0
+
+# In-round win probability model (backend.inround), loaded on first use
+_INROUND_MODEL = None
+DEMO_MAGIC = b'PBDEMS2\x00'
+MAX_INROUND_STATES = 10_000
+MAX_DEMO_UPLOAD_BYTES = 512 * 1024 * 1024
+
+# Heatmap tile cache, created on the first /api/heatmap/ request
+_HEATMAP_CACHE = None
+MAX_HEATMAP_BINS = 512
+MAX_HEATMAP_SIZE = 2048
+
+# Round replays from the trajectory store, opened on the first /api/replay/ request
+_TRAJECTORY_STORE = None
+
+# Per-player features (backend.player_store), loaded on the first prediction and
+# re-read when model/player_stats.py rewrites it
+_PLAYER_STORE = None
+_PLAYER_STORE_MTIME = None
+_PLAYER_STORE_CHECKED_AT = 0.0
+
+# Rendered dashboard HTML, keyed by (data asset version, page version)
+_DASHBOARD_HTML = {}
+
+
+def _load_bundle():
+    # The bundle carries the model and its feature schema, so the column order
+    # used here can never drift from the one the model was trained with
+    global _BUNDLE, _BUNDLE_CHECKED_AT
+    now = time.monotonic()
+    if _BUNDLE is not None and now - _BUNDLE_CHECKED_AT < BUNDLE_RELOAD_SECONDS:
+        return
+    _BUNDLE_CHECKED_AT = now
+    # Imported here so NumPy is only loaded once a view needs the model
+    from backend.bundle import current_bundle_path, load_bundle
+    path = current_bundle_path()
+    if path is None or (_BUNDLE is not None and os.path.abspath(path) == os.path.abspath(_BUNDLE.path)):
+        return
+    try:
+        with stage_timer('model', 'model_load'):
+            bundle = load_bundle(path)
+    except (OSError, ValueError) as e:
+        if _BUNDLE is None:
+            raise
+        # Keep serving the bundle already loaded
+        logger.warning("Could not load published bundle %s: %s", path, e)
+        return
+    # Requests already scoring keep their reference to the previous bundle
+    _BUNDLE = bundle
+
+
+def _load_player_store():
+    """The player store, or None when it has not been built."""
+    global _PLAYER_STORE, _PLAYER_STORE_MTIME, _PLAYER_STORE_CHECKED_AT
+    now = time.monotonic()
+    if now - _PLAYER_STORE_CHECKED_AT < BUNDLE_RELOAD_SECONDS:
+        return _PLAYER_STORE
+    _PLAYER_STORE_CHECKED_AT = now
+    from backend.player_store import META_FILE, PLAYER_STORE_DIR, PlayerStore
+    folder = getattr(settings, 'PREDICTOR_PLAYER_STORE_DIR', None) or PLAYER_STORE_DIR
+    try:
+        mtime = os.path.getmtime(os.path.join(folder, META_FILE))
+    except OSError:
+        _PLAYER_STORE, _PLAYER_STORE_MTIME = None, None
+        return None
+    if mtime != _PLAYER_STORE_MTIME:
+        try:
+            with stage_timer('model', 'player_store_load'):
+                _PLAYER_STORE = PlayerStore.load(folder)
+            _PLAYER_STORE_MTIME = mtime
+        except (OSError, ValueError, KeyError) as e:
+            # Keep the store already loaded, if any
+            logger.warning("Could not load player store %s: %s", folder, e)
+    return _PLAYER_STORE
+
 
 def dashboard(request):
-    # Provide weapon list and players list for initial rendering
-    _load_model()
-    _load_players()
-    weapons = sorted(list(constants.WEAPON_VALUES.keys()))
-    import json as _json
-    weapon_map_json = _json.dumps(constants.WEAPON_VALUES)
-    all_players_json = _json.dumps(_ALL_PLAYERS)
-    # provide categorized options per player: primaries, secondaries, grenades
-    primary_options = constants.WEAPON_VALUES['primary_weapons'].keys()
-    secondary_options = constants.WEAPON_VALUES['secondary_weapons'].keys()
-    grenade_options = constants.WEAPON_VALUES['grenades'].keys()
-    equipment_options = constants.WEAPON_VALUES['equipment'].keys()
-    return render(request, 'predictor/dashboard.html', context={
-        'weapons': weapons,
-        'all_players_json': _ALL_PLAYERS,
-        'weapon_map_json': weapon_map_json,
-        'player_slots': range(5),
-        'primary_options': primary_options,
-        'secondary_options': secondary_options,
-        'grenade_options': grenade_options,
-        'equipment_options': equipment_options,
-    })
+    # The page only depends on the weapon table and its own template and
+    # static files, so it is rendered once per data asset and page version;
+    # players and prices are fetched from dashboard_data
+    asset = get_dashboard_asset()
+    version = (asset.version, get_page_version())
+    etag = f'W/"dashboard-{version[0]}-{version[1]}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        return not_modified
+
+    html = _DASHBOARD_HTML.get(version)
+    if html is None:
+        # provide categorized options per player: primaries, secondaries, grenades
+        html = render_to_string('predictor/dashboard.html', context={
+            'dashboard_data_url': reverse('dashboard_data', args=[asset.version]),
+            'player_slots': range(5),
+            'primary_options': constants.WEAPON_VALUES['primary_weapons'].keys(),
+            'secondary_options': constants.WEAPON_VALUES['secondary_weapons'].keys(),
+            'grenade_options': constants.WEAPON_VALUES['grenades'].keys(),
+            'equipment_options': constants.WEAPON_VALUES['equipment'].keys(),
+        })
+        _DASHBOARD_HTML.clear()
+        _DASHBOARD_HTML[version] = html
+
+    response = HttpResponse(html)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
 
 
-def _ensure_history_dir():
-    HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
-    if not HISTORY_FILE.exists():
-        with open(HISTORY_FILE, 'w') as f:
-            json.dump([], f)
+def dashboard_data(request, version):
+    # Versioned URL: the current version is cacheable forever, stale ones redirect
+    asset = get_dashboard_asset()
+    if version != asset.version:
+        return redirect('dashboard_data', asset.version)
+    return asset.response(request, immutable=True)
+
+
+def api_players(request):
+    """
+    Player search for the dashboard.
+
+    ?q=<text>&k=<n> returns the top-k ranked matches; ?team=<name> returns
+    that team's preset roster. Every player carries known_to_model.
+    """
+    try:
+        _load_bundle()
+    except (OSError, ValueError):  # BundleSchemaError is a ValueError
+        pass
+    model_players = _BUNDLE.schema.players if _BUNDLE is not None else ()
+    index = get_player_index(model_players, _BUNDLE.version if _BUNDLE is not None else None)
+
+    team = request.GET.get('team')
+    if team is not None:
+        roster = index.roster(team)
+        if roster is None:
+            return JsonResponse({'error': f'Unknown team: {team}'}, status=404)
+        return JsonResponse({'team': team, 'players': roster})
+
+    try:
+        k = min(int(request.GET.get('k', DEFAULT_TOP_K)), MAX_TOP_K)
+    except ValueError:
+        return HttpResponseBadRequest('k must be an integer')
+    query = request.GET.get('q', '')
+    return JsonResponse({'query': query, 'players': index.search(query, k)})
+
+
+def _parse_history_bound(value, end_of_day=False):
+    # Accept either a date (YYYY-MM-DD) or a full ISO datetime
+    if not value:
+        return None
+    dt = parse_datetime(value)
+    if dt is None:
+        d = parse_date(value)
+        if d is None:
+            raise ValueError(f'Invalid date: {value}')
+        dt = datetime.combine(d, dt_time.max if end_of_day else dt_time.min)
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
 
 
 def history_view(request):
-    _ensure_history_dir()
-    with open(HISTORY_FILE, 'r') as f:
-        data = json.load(f)
-    return render(request, 'predictor/history.html', context={'history': data})
-
-def _calculate_players_columns(ct_players, t_players):
-    # Create player columns from all_players list
-    all_players = list(_MODEL_PLAYERS) if _MODEL_PLAYERS is not None else []
-    player_cols = [f'player_{p}' for p in all_players]
-
-    # Initialize row with zeros
-    row = {c: 0 for c in player_cols}
-
-    # Mark CT players as 1, T players as 2
-    for p in ct_players:
-        col = f'player_{p}'
-        if col in row:
-            row[col] = 2
-    for p in t_players:
-        col = f'player_{p}'
-        if col in row:
-            row[col] = 3
-    return row, player_cols
-
-def _calculate_maps_columns(default_maps_names: list, map: str):
-    # Create one hot encoded map columns
-    maps_cols = [m for m in default_maps_names]
-    row = {c: False for c in maps_cols}
-    for m in default_maps_names:
-        if m in map:
-            row[m] = True
-            break
-    return row, maps_cols
+    """
+    Paginated prediction history, newest first.
 
-@csrf_exempt
-def api_predict(request):
+    Pages are keyed by the last seen id (?before=<id>) instead of an offset, so
+    every page is an indexed range scan whatever the size of the table.
+    Optional filters: ?map=<map_name>&from=<date>&to=<date>&per_page=<n>.
+    """
+    try:
+        date_from = _parse_history_bound(request.GET.get('from'))
+        date_to = _parse_history_bound(request.GET.get('to'), end_of_day=True)
+        before = int(request.GET['before']) if request.GET.get('before') else None
+        per_page = max(1, min(int(request.GET.get('per_page', HISTORY_PAGE_SIZE)), HISTORY_MAX_PAGE_SIZE))
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    map_name = request.GET.get('map') or None
+
+    # created_at is set when a Prediction is built, not when it is inserted, so
+    # ids only grow with it approximately (concurrent requests can interleave
+    # by a few milliseconds). Date bounds become id bounds with one indexed
+    # lookup each, keeping every page a range scan on (map_name, id) or the pk,
+    # and the created_at filter is kept so no row outside the dates is shown;
+    # a row inserted just before the boundary row with a later timestamp can
+    # be missed at the edge of the range.
+    qs = Prediction.objects.order_by('-id')
+    if map_name:
+        qs = qs.filter(map_name=map_name)
+    if date_from:
+        first = Prediction.objects.filter(created_at__gte=date_from).order_by('created_at').values_list('id', flat=True).first()
+        qs = qs.filter(id__gte=first, created_at__gte=date_from) if first is not None else qs.none()
+    if date_to:
+        last = Prediction.objects.filter(created_at__lte=date_to).order_by('-created_at').values_list('id', flat=True).first()
+        qs = qs.filter(id__lte=last, created_at__lte=date_to) if last is not None else qs.none()
+    if before is not None:
+        qs = qs.filter(id__lt=before)
+
+    # Fetch one extra row to know whether an older page exists, without a COUNT(*)
+    rows = list(qs[:per_page + 1])
+    has_older = len(rows) > per_page
+    rows = rows[:per_page]
+
+    filters = request.GET.copy()
+    filters.pop('before', None)
+    older_query = None
+    if has_older and rows:
+        filters['before'] = rows[-1].id
+        older_query = filters.urlencode()
+
+    return render(request, 'predictor/history.html', context={
+        'history': rows,
+        'map': map_name or '',
+        'date_from': request.GET.get('from', ''),
+        'date_to': request.GET.get('to', ''),
+        'older_query': older_query,
+    })
+
+
+def _prediction_record(row: dict, probs, pred, model_version: str, classes: list) -> Prediction:
+    # classes are those of the bundle that scored the row, which a hot reload may have replaced since
+    return Prediction(
+        map_name=str(row['map'])[:32],
+        model_version=model_version,
+        ct_players=[str(p) for p in row['ct_players']],
+        t_players=[str(p) for p in row['t_players']],
+        team_ct_current_equip_value=row['team_ct_current_equip_value'],
+        team_t_current_equip_value=row['team_t_current_equip_value'],
+        prediction=int(pred),
+        prob_t=float(probs[classes.index(2)]) if 2 in classes else 0.0,
+        prob_ct=float(probs[classes.index(3)]) if 3 in classes else 0.0,
+    )
+
+def _record_prediction(row: dict, probs, pred, model_version: str, classes: list):
+    # History is best effort: a locked or missing table must not fail the prediction
+    try:
+        _prediction_record(row, probs, pred, model_version, classes).save()
+    except DatabaseError as e:
+        logger.warning("Could not record prediction: %s", e)
+
+def _predict_and_record_rows(rows: list) -> list:
+    # Batched path: one model call and one bulk INSERT for the whole batch
+    endpoint = 'api_predict_batched'
+    results = _predict_rows(rows, endpoint)
+    try:
+        with stage_timer(endpoint, 'record'):
+            Prediction.objects.bulk_create([
+                _prediction_record(row, probs, pred, model_version, classes)
+                for row, (pred, probs, model_version, classes) in zip(rows, results)
+            ])
+    except DatabaseError as e:
+        logger.warning("Could not record predictions: %s", e)
+    finally:
+        # Runs in a batcher worker thread, outside Django's request cycle
+        close_old_connections()
+    return results
+
+def _parse_equip_value(value) -> int:
+    # The dashboard sends the locale formatted preview (e.g. "4,200" or "4\xa0200")
+    if isinstance(value, (int, float)):
+        if not math.isfinite(value):
+            raise ValueError('Equip values must be finite')
+        parsed = int(value)
+    else:
+        digits = ''.join(ch for ch in str(value or '') if ch.isdigit())
+        parsed = int(digits[:12]) if digits else 0
+    if not 0 <= parsed <= MAX_TEAM_EQUIP_VALUE:
+        raise ValueError(f'Equip values must be 0 to {MAX_TEAM_EQUIP_VALUE}')
+    return parsed
+
+def _parse_predict_request(request):
+    """
+    Validate a prediction request and build its feature row.
+
+    Returns:
+        tuple: (row, None) on success, (None, error response) otherwise.
+    """
     if request.method != 'POST':
-        return HttpResponseBadRequest('Only POST supported')
+        return None, HttpResponseBadRequest('Only POST supported')
     try:
         payload = json.loads(request.body.decode('utf-8'))
     except Exception:
-        return HttpResponseBadRequest('Invalid JSON')
+        return None, HttpResponseBadRequest('Invalid JSON')
+    if not isinstance(payload, dict):
+        return None, HttpResponseBadRequest('Expected a JSON object')
 
-    # Get current equip value for both teams
-    team_ct_current_equip_value = payload.get('team_ct_current_equip_value', 0)
-    team_t_current_equip_value = payload.get('team_t_current_equip_value', 0)
+    # Team equip values: priced here from the lineups when the dashboard sends
+    # them, otherwise the client's preview
+    ct_loadouts, t_loadouts = payload.get('ct_loadouts'), payload.get('t_loadouts')
+    if ct_loadouts is not None or t_loadouts is not None:
+        if not all(isinstance(l, list) and len(l) <= 5 and all(isinstance(p, dict) for p in l)
+                   for l in (ct_loadouts or [], t_loadouts or [])):
+            return None, HttpResponseBadRequest('Loadouts must be lists of up to 5 objects')
+        from backend.valuation import LOADOUT_SLOTS, default_valuer
+        # Each slot is a name, a comma separated string or a list of names (see LoadoutValuer.lineup_value)
+        for loadout in (ct_loadouts or []) + (t_loadouts or []):
+            for slot in LOADOUT_SLOTS:
+                items = loadout.get(slot)
+                if not (items is None or isinstance(items, str)
+                        or (isinstance(items, list) and all(isinstance(item, str) for item in items))):
+                    return None, HttpResponseBadRequest(f'Loadout {slot} must be a string or a list of strings')
+        valuer = default_valuer()
+        team_ct_current_equip_value = valuer.lineup_value(ct_loadouts or [])
+        team_t_current_equip_value = valuer.lineup_value(t_loadouts or [])
+    else:
+        try:
+            team_ct_current_equip_value = _parse_equip_value(payload.get('team_ct_current_equip_value', 0))
+            team_t_current_equip_value = _parse_equip_value(payload.get('team_t_current_equip_value', 0))
+        except ValueError as e:
+            return None, HttpResponseBadRequest(str(e))
     map = payload.get('map', 'de_nuke')
-
-    if '\xa0' in team_ct_current_equip_value or '\xa0' in team_t_current_equip_value:
-        team_ct_current_equip_value = team_ct_current_equip_value.replace('\xa0', '')
-        team_t_current_equip_value = team_t_current_equip_value.replace('\xa0', '')
+    if not isinstance(map, str):
+        return None, HttpResponseBadRequest('map must be a string')
 
     # Get team players for both teams
     team_ct_players = payload.get('ct_team_players', [])
     team_t_players = payload.get('t_team_players', [])
 
     # Basic validation
-    if len(team_ct_players) != 5 or len(team_t_players) != 5:
-        return HttpResponseBadRequest('Expected 5 players per team')
-
-    _load_model()
-    _load_model_players()
-    _load_maps_names()
-    if _MODEL is None:
-        return JsonResponse({'error': 'Model not found on server'}, status=500)
-
-    # Build feature vector compatible with training encoding
-    # Create player columns from all_players list
-    players_row, player_cols = _calculate_players_columns(team_ct_players, team_t_players)
-    maps_row, maps_cols = _calculate_maps_columns(_MAPS_NAMES, map)
-    row = maps_row | players_row
-
-    # Prepare X in proper column order expected by model
-    # Many models expect the same columns as training; we'll order player cols then the two equip cols
-    X_cols = maps_cols + ['team_ct_current_equip_value', 'team_t_current_equip_value', 'round'] + player_cols
-    X = np.array([[row.get(c, 0) for c in X_cols]])
-
-   # Create pandas dataframe from X
-    df = pd.DataFrame(X, columns=X_cols)
-    df['team_ct_current_equip_value'] = team_ct_current_equip_value
-    df['team_t_current_equip_value'] = team_t_current_equip_value
-    df['round'] = 1
-    
-    # Get predictions
-    preds = _MODEL.predict(df)
-    probs = _MODEL.predict_proba(df)
-    print(f"Predictions: {preds}")
-    print(f"Probabilities: {probs}")
+    if not isinstance(team_ct_players, list) or not isinstance(team_t_players, list) \
+            or len(team_ct_players) != 5 or len(team_t_players) != 5:
+        return None, HttpResponseBadRequest('Expected 5 players per team')
+
+    try:
+        _load_bundle()
+    except (OSError, ValueError) as e:  # BundleSchemaError is a ValueError
+        return None, JsonResponse({'error': f'Model bundle is invalid: {e}'}, status=500)
+    if _BUNDLE is None:
+        return None, JsonResponse({'error': 'Model not found on server'}, status=500)
+
+    row = {
+        'map': map,
+        'ct_players': team_ct_players,
+        't_players': team_t_players,
+        'team_ct_current_equip_value': team_ct_current_equip_value,
+        'team_t_current_equip_value': team_t_current_equip_value,
+        'round': 1,
+    }
+    # Player history features; bundles trained without them ignore the extra keys
+    store = _load_player_store()
+    if store is not None:
+        with stage_timer('api_predict', 'player_features'):
+            row.update(store.team_features(map, team_ct_players, team_t_players))
+    elif _BUNDLE.schema.player_stat_features:
+        return None, JsonResponse({'error': 'Model needs the player store, which is not built '
+                                            '(see model/player_stats.py)'}, status=503)
+    return row, None
+
+def _predict_rows(rows: list, endpoint: str = 'api_predict') -> list:
+    """
+    Score rows with one vectorized model call.
 
+    Returns:
+        list: (prediction, probabilities, model_version, classes) per row, all
+            from the one bundle that scored them.
+    """
+    bundle = _BUNDLE
+    # Build feature vectors in the bundle's schema order
+    with stage_timer(endpoint, 'encode'):
+        X = bundle.schema.encode_rows(rows)
+    with stage_timer(endpoint, 'model'):
+        probs = bundle.predict_proba(X)
+    BATCH_ROWS.labels(endpoint).observe(len(rows))
+    preds = bundle.classes_[probs.argmax(axis=1)]
+    classes = bundle.classes_.tolist()
+    return [(int(pred), prob.tolist(), bundle.version, classes) for pred, prob in zip(preds, probs)]
+
+def _predict_response(pred, probs, model_version, endpoint: str) -> JsonResponse:
     # Serialize to JSON for frontend
-    return JsonResponse({
-        'prediction': preds.tolist(),
-        'probabilities': probs.tolist(), # 2 T; 3 CT
-    })
\ No newline at end of file
+    with stage_timer(endpoint, 'serialize'):
+        return JsonResponse({
+            'prediction': [pred],
+            'probabilities': [probs], # 2 T; 3 CT
+            'model_version': model_version,
+        })
+
+@csrf_exempt
+def api_predict(request):
+    row, error = _parse_predict_request(request)
+    if error is not None:
+        return error
+
+    # Get predictions
+    pred, probs, model_version, classes = _predict_rows([row])[0]
+    log_sampled('prediction', endpoint='api_predict', map=row['map'], prediction=pred,
+                probabilities=probs, model_version=model_version)
+    with stage_timer('api_predict', 'record'):
+        _record_prediction(row, probs, pred, model_version, classes)
+    return _predict_response(pred, probs, model_version, 'api_predict')
+
+@csrf_exempt
+async def api_predict_batched(request):
+    """
+    Async variant of api_predict for ASGI servers.
+
+    Concurrent requests arriving within PREDICTOR_BATCHING['WINDOW_MS'] (or up
+    to MAX_BATCH of them) are scored together with one model call.
+    """
+    row, error = _parse_predict_request(request)
+    if error is not None:
+        return error
+
+    pred, probs, model_version, _ = await get_batcher(_predict_and_record_rows).submit(row)
+    log_sampled('prediction', endpoint='api_predict_batched', map=row['map'], prediction=pred,
+                probabilities=probs, model_version=model_version)
+    return _predict_response(pred, probs, model_version, 'api_predict_batched')
+
+
+def _load_inround_model():
+    """The in-round model, or (None, error response) when it is not available."""
+    global _INROUND_MODEL
+    if _INROUND_MODEL is None:
+        from backend.inround import INROUND_MODEL_PATH, InRoundModel
+        if not os.path.isfile(INROUND_MODEL_PATH):
+            return None, JsonResponse({'error': 'In-round model not trained (see model/train_inround.py)'}, status=503)
+        try:
+            with stage_timer('inround', 'model_load'):
+                _INROUND_MODEL = InRoundModel.load(INROUND_MODEL_PATH)
+        except (OSError, ValueError, KeyError) as e:
+            return None, JsonResponse({'error': f'In-round model is invalid: {e}'}, status=500)
+    return _INROUND_MODEL, None
+
+def _inround_settings() -> dict:
+    from backend.inround import DEFAULT_TIME_STEP
+    config = getattr(settings, 'PREDICTOR_INROUND', {})
+    return {'time_step': float(config.get('TIME_STEP', DEFAULT_TIME_STEP)), 'chunk_ticks': config.get('CHUNK_TICKS'),
+            'max_upload_bytes': int(config.get('MAX_UPLOAD_BYTES', MAX_DEMO_UPLOAD_BYTES))}
+
+@csrf_exempt
+def api_inround(request):
+    """
+    Score round states: POST {"states": [{"ct_alive", "t_alive", "bomb_planted",
+    "seconds"}, ...]} returns the probability that CT wins from each state.
+    """
+    if request.method != 'POST':
+        return HttpResponseBadRequest('Only POST supported')
+    try:
+        states = json.loads(request.body.decode('utf-8'))['states']
+    except Exception:
+        return HttpResponseBadRequest('Expected JSON with a "states" list')
+    if not isinstance(states, list) or not 0 < len(states) <= MAX_INROUND_STATES:
+        return HttpResponseBadRequest(f'Expected 1 to {MAX_INROUND_STATES} states')
+    model, error = _load_inround_model()
+    if error is not None:
+        return error
+
+    import pandas as pd
+    try:
+        with stage_timer('api_inround', 'encode'):
+            frame = pd.DataFrame({
+                'ct_alive': [int(s.get('ct_alive', 5)) for s in states],
+                't_alive': [int(s.get('t_alive', 5)) for s in states],
+                'bomb_planted': [int(bool(s.get('bomb_planted', False))) for s in states],
+                'seconds': [float(s.get('seconds', 0)) for s in states],
+            })
+    except (AttributeError, TypeError, ValueError):
+        return HttpResponseBadRequest('States need numeric ct_alive, t_alive, bomb_planted and seconds')
+    with stage_timer('api_inround', 'model'):
+        p_ct = model.predict_ct(frame)
+    return JsonResponse({'p_ct': [round(float(p), 4) for p in p_ct]})
+
+@csrf_exempt
+def api_inround_demo(request):
+    """
+    Win probability time series of every round of an uploaded demo
+    (multipart field "file"), scored on the state-change ticks. Uploads
+    over PREDICTOR_INROUND['MAX_UPLOAD_BYTES'] get a 413.
+    """
+    if request.method != 'POST':
+        return HttpResponseBadRequest('Only POST supported')
+    upload = request.FILES.get('file')
+    if upload is None:
+        return HttpResponseBadRequest('Expected a .dem file in the "file" field')
+    config = _inround_settings()
+    if upload.size > config['max_upload_bytes']:
+        return JsonResponse({'error': f"Demos over {config['max_upload_bytes']:,} bytes are not accepted"}, status=413)
+    chunks = upload.chunks()
+    first = next(chunks, b'')
+    if first[:len(DEMO_MAGIC)] != DEMO_MAGIC:
+        return HttpResponseBadRequest('Not a CS2 demo')
+    model, error = _load_inround_model()
+    if error is not None:
+        return error
+
+    import tempfile
+    from backend.inround import iter_demo_chunks, score_stream, series_by_round
+    with tempfile.NamedTemporaryFile(suffix='.dem', delete=False) as tmp:
+        tmp.write(first)
+        for chunk in chunks:
+            tmp.write(chunk)
+    try:
+        try:
+            with stage_timer('api_inround_demo', 'score'):
+                parts = list(score_stream(iter_demo_chunks(tmp.name, config['chunk_ticks']), model, config['time_step']))
+        except Exception as e:  # the parser raises its own exception types
+            logger.warning("Could not score demo %s: %s", upload.name, e)
+            return JsonResponse({'error': 'Could not parse the demo'}, status=422)
+    finally:
+        os.remove(tmp.name)
+
+    import pandas as pd
+    rounds = series_by_round(pd.concat(parts, ignore_index=True)) if parts else []
+    return JsonResponse({'demo': upload.name, 'time_step': config['time_step'], 'rounds': rounds})
+
+
+def _heatmap_cache():
+    global _HEATMAP_CACHE
+    if _HEATMAP_CACHE is None:
+        from backend.heatmap import DEFAULT_CHUNK_TICKS, DEFAULT_TICK_STRIDE, HeatmapCache
+        config = getattr(settings, 'PREDICTOR_HEATMAP', {})
+        _HEATMAP_CACHE = HeatmapCache(chunk_ticks=config.get('CHUNK_TICKS', DEFAULT_CHUNK_TICKS),
+                                      tick_stride=config.get('TICK_STRIDE', DEFAULT_TICK_STRIDE))
+    return _HEATMAP_CACHE
+
+def api_heatmap(request, map_name):
+    """
+    Position heatmap of a map over the demos folder as a PNG. Query parameters:
+    team (ct/t), phase (freeze/live/post_plant), weapon (parser weapon names,
+    repeatable or comma separated), bins (a power of two) and size.
+    """
+    from backend.heatmap import COUNT_BINS, DEFAULT_BINS, MAP_CALIBRATION, HeatmapError, find_demos, heatmap_filters
+    if map_name not in MAP_CALIBRATION:
+        return JsonResponse({'error': f'No heatmap calibration for {map_name}'}, status=404)
+    config = getattr(settings, 'PREDICTOR_HEATMAP', {})
+    try:
+        bins = int(request.GET.get('bins', config.get('BINS', DEFAULT_BINS)))
+        size = int(request.GET['size']) if request.GET.get('size') else None
+        weapons = [w for value in request.GET.getlist('weapon') for w in value.split(',')]
+        filters = heatmap_filters(request.GET.get('team'), request.GET.get('phase'), weapons)
+    except (ValueError, HeatmapError) as e:
+        return HttpResponseBadRequest(str(e))
+    if not 8 <= bins <= MAX_HEATMAP_BINS or COUNT_BINS % bins or (size is not None and not 64 <= size <= MAX_HEATMAP_SIZE):
+        return HttpResponseBadRequest(f'bins must be a power of two from 8 to {MAX_HEATMAP_BINS} '
+                                      f'and size 64 to {MAX_HEATMAP_SIZE}')
+
+    with stage_timer('api_heatmap', 'tile'):
+        tile = _heatmap_cache().tile(find_demos(config.get('DEMOS_DIR') or constants.DEMOS_DIR), map_name,
+                                     filters, bins, size)
+    if tile['failed']:
+        logger.warning("Heatmap %s: %d demos could not be parsed", map_name, len(tile['failed']))
+    if not tile['demos']:
+        return JsonResponse({'error': f'No demos of {map_name}'}, status=404)
+    # The key changes with the demos and the filters, so clients revalidate with it
+    etag = f'"{tile["key"]}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(tile['png'], content_type='image/png')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    response['X-Heatmap-Demos'] = str(tile['demos'])
+    response['X-Heatmap-Cache'] = 'hit' if tile['cached'] else 'miss'
+    return response
+
+
+def api_replay(request, demo_id, round_number):
+    """
+    Every player's path in a round of a processed demo (trajectory store).
+    Query parameters: tick_step (at most one point per that many ticks) and
+    max_points (per player).
+    """
+    global _TRAJECTORY_STORE
+    from backend.trajectory import TrajectoryError, TrajectoryStore
+    if _TRAJECTORY_STORE is None:
+        _TRAJECTORY_STORE = TrajectoryStore(getattr(settings, 'PREDICTOR_TRAJECTORY_DIR', None)
+                                            or TrajectoryStore().folder)
+    try:
+        tick_step = int(request.GET.get('tick_step', 0)) or None
+        max_points = int(request.GET.get('max_points', 0)) or None
+        with stage_timer('api_replay', 'open'):
+            demo = _TRAJECTORY_STORE.open(demo_id)
+    except (ValueError, TrajectoryError) as e:
+        return HttpResponseBadRequest(str(e))
+    if demo is None:
+        return JsonResponse({'error': f'No trajectories for demo {demo_id}'}, status=404)
+    if round_number not in demo.rounds:
+        return JsonResponse({'error': f'Round {round_number} not in demo {demo_id}', 'rounds': demo.rounds},
+                            status=404)
+    with stage_timer('api_replay', 'decode'):
+        players = demo.round_paths(round_number, tick_step, max_points)
+    return JsonResponse({'demo_id': demo_id, 'round': round_number, 'map_name': demo.metadata.get('map_name'),
+                         'players': players})
+
+
+def metrics(request):
+    # Prometheus scrape endpoint
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
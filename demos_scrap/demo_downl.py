@@ -8,8 +8,13 @@ import pycurl
 from fake_useragent import UserAgent
 from io import BytesIO
 import os
+import sys
 import time
 
+# Validador de demos partilhado com o pipeline do modelo
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "model"))
+from demo_validator import quarantine, sniff_payload
+
 class DemoDownloader:
     DOWNLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "demos")
 
@@ -106,6 +111,11 @@ if __name__ == "__main__":
                 filename = os.path.join(DemoDownloader.DOWNLOAD_FOLDER, f"{demo_link.split('/')[-1]}.rar")
                 with open(filename, "wb") as demo_file:
                     demo_file.write(demo_data)
+                # Páginas de erro (HTML) também vêm com 200: não são arquivos nem demos
+                if sniff_payload(demo_data[:16]) is None:
+                    moved = quarantine(filename, 'not_an_archive')
+                    print(f"🚫 Download is not an archive or a demo, moved to {moved}")
+                    continue
                 print(f"✅ Demo saved as {filename}.")
             except Exception as e:
                 print(f"❌ Error downloading {demo_link}: {str(e)}")
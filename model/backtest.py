@@ -0,0 +1,306 @@
+"""
+Offline backtest of the served round winner model over the whole round summaries dataset.
+
+The predictor serves the published bundle (round_winner_model.pkl exported by
+backend/bundle.py, or the latest retrain.py version), so that is what gets
+scored: rows are encoded with the bundle's own schema (the serving encoder)
+and evaluated with the bundle's tree arrays, memory-mapped by every worker.
+
+The dataset is streamed: the demo files are split into groups, and each
+worker process reads its group, encodes and scores it in large batches and
+returns only the per-round predictions. Nothing but the predictions is ever
+held in the parent.
+
+Only held-out rounds are scored by default: demos listed in the bundle's
+training_demo_ids metadata (written by retrain.py) are left out, since a
+forest's metrics on its own training rounds say nothing about new matches.
+--split in-sample scores only those demos, --split all everything. A bundle
+without that metadata (e.g. exported from the notebook's pickle) cannot be
+split, so all of its rounds are scored and the report says so.
+
+A bundle trained with player store features (retrain.py --player-stats) is
+scored with the same features, from the store recorded in its metadata (or
+--player-stats); held-out rounds then also start after the store's date_to,
+since the store's win rates include the rounds before it.
+
+Written to the output folder (default backtests/<bundle version>/):
+    predictions.parquet   one row per round: demo, map, economy, p_ct, winner
+    metrics.csv           n, accuracy, Brier, log-loss, ECE per map and per economy bucket
+    calibration.csv       reliability bins (mean p_ct vs CT win rate), overall and per map
+    summary.json          overall metrics and run details
+
+Usage:
+    python model/backtest.py                               # published bundle, whole dataset
+    python model/backtest.py --maps de_nuke --date-from 2025-06-01
+    python model/backtest.py --bundle model/bundles/round_winner-20251225 --workers 4
+    python model/backtest.py --split in-sample            # the training demos only, to compare
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+MODEL_FOLDER = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(MODEL_FOLDER))
+from backend.bundle import BUNDLES_DIR, current_bundle_path, load_bundle
+from backend.player_store import load_player_store
+from player_stats import add_player_features, training_date_from
+from round_dataset import DATASET_FOLDER, list_demos, read_files
+
+BACKTEST_FOLDER = os.path.join(MODEL_FOLDER, "backtests")
+CT_WIN = 3
+
+DEFAULT_FILES_PER_TASK = 64
+DEFAULT_BATCH_ROWS = 8192
+# Dense float32 rows handed to the bundle at once are capped at this size
+MAX_BATCH_BYTES = 64 * 1024 * 1024
+CALIBRATION_BINS = 10
+EPS = 1e-15
+SPLITS = ['held-out', 'in-sample', 'all']
+
+# Team equipment value buckets (freeze time end), first round of each half is the pistol round
+PISTOL_ROUNDS = (1, 13)
+ECONOMY_BINS = [0, 10_000, 20_000, np.inf]
+ECONOMY_LABELS = ['eco', 'force', 'full']
+
+PREDICTION_COLUMNS = ['demo_id', 'match_date', 'map_name', 'round', 'team_ct_current_equip_value',
+                      'team_t_current_equip_value', 'round_winner']
+
+_WORKER = {}
+
+
+def economy_bucket(df: pd.DataFrame) -> pd.Series:
+    """'pistol' or '<ct bucket>-vs-<t bucket>' (e.g. 'full-vs-eco') from the team equipment values."""
+    ct = pd.cut(df['team_ct_current_equip_value'], ECONOMY_BINS, labels=ECONOMY_LABELS, right=False)
+    t = pd.cut(df['team_t_current_equip_value'], ECONOMY_BINS, labels=ECONOMY_LABELS, right=False)
+    bucket = ct.astype(str) + '-vs-' + t.astype(str)
+    return bucket.where(~df['round'].isin(PISTOL_ROUNDS), 'pistol')
+
+
+def _init_worker(bundle_path: str, root: str, batch_rows: int, min_round, max_round, player_store=None):
+    # Every worker memory-maps the same bundle files instead of receiving a pickled model
+    bundle = load_bundle(bundle_path)
+    batch_rows = max(1, min(batch_rows, MAX_BATCH_BYTES // (4 * max(bundle.schema.n_features, 1))))
+    store = load_player_store(player_store) if player_store else None
+    if store is None and bundle.schema.player_stat_features:
+        raise FileNotFoundError(f"{bundle_path} uses the player store features but there is no store in {player_store}")
+    _WORKER.update(bundle=bundle, root=root, batch_rows=batch_rows, min_round=min_round, max_round=max_round,
+                   store=store)
+
+
+def _score_files(files) -> pd.DataFrame:
+    bundle = _WORKER['bundle']
+    df = read_files(files, _WORKER['root'], _WORKER['min_round'], _WORKER['max_round'], with_source=True)
+    # Rounds without a winner the model can predict (e.g. 0) are not scored
+    df = df[df['round_winner'].isin(bundle.classes_)].reset_index(drop=True)
+    out = df[PREDICTION_COLUMNS].copy()
+    if df.empty:
+        out['p_ct'] = pd.Series(dtype=np.float64)
+        return out
+
+    ct_column = list(bundle.classes_).index(CT_WIN)
+    if _WORKER['store'] is not None:
+        df = add_player_features(df, _WORKER['store'])
+    X = bundle.schema.encode_frame(df)
+    step = _WORKER['batch_rows']
+    out['p_ct'] = np.concatenate([bundle.predict_proba(X[i:i + step].toarray())[:, ct_column]
+                                  for i in range(0, X.shape[0], step)])
+    return out
+
+
+def score_dataset(bundle_path: str, root: str = DATASET_FOLDER, maps=None, date_from=None, date_to=None,
+                  min_round: int = None, max_round: int = None, workers: int = None,
+                  files_per_task: int = DEFAULT_FILES_PER_TASK, batch_rows: int = DEFAULT_BATCH_ROWS,
+                  exclude_demos=None, only_demos=None, player_store: str = None) -> pd.DataFrame:
+    """
+    Per-round predictions of a bundle over the round summaries dataset.
+
+    Args:
+        bundle_path (str): Bundle folder to score.
+        root (str): Round summaries dataset (round_dataset).
+        maps (list): Map names to keep.
+        date_from, date_to (str): Inclusive match date range (YYYY-MM-DD).
+        min_round, max_round (int): Inclusive round range.
+        workers (int): Worker processes (default: all cores; 1 scores in this process).
+        files_per_task (int): Demo files read and scored per task.
+        batch_rows (int): Rows per predict_proba call.
+        exclude_demos (Iterable[str]): Demo ids to leave out (e.g. the bundle's training demos).
+        only_demos (Iterable[str]): Score only these demo ids.
+        player_store (str): Player store folder the bundle's player features
+            are added from; required when its schema has them.
+
+    Returns:
+        pd.DataFrame: PREDICTION_COLUMNS plus p_ct, ct_win and economy.
+    """
+    demos = list_demos(root)
+    # Map and date filters only need the folder layout
+    if maps is not None:
+        demos = demos[demos['map_name'].isin(list(maps))]
+    if date_from is not None:
+        demos = demos[demos['match_date'] >= str(date_from)]
+    if date_to is not None:
+        demos = demos[demos['match_date'] <= str(date_to)]
+    if exclude_demos is not None:
+        demos = demos[~demos['demo_id'].isin(set(exclude_demos))]
+    if only_demos is not None:
+        demos = demos[demos['demo_id'].isin(set(only_demos))]
+    files = demos['path'].tolist()
+    tasks = [files[i:i + files_per_task] for i in range(0, len(files), files_per_task)]
+
+    init_args = (bundle_path, root, batch_rows, min_round, max_round, player_store)
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    if workers == 1:
+        _init_worker(*init_args)
+        parts = [_score_files(task) for task in tqdm(tasks, desc="Scoring", unit="task")]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as executor:
+            parts = list(tqdm(executor.map(_score_files, tasks), total=len(tasks), desc="Scoring", unit="task"))
+
+    parts = [part for part in parts if not part.empty]
+    if not parts:
+        return pd.DataFrame(columns=PREDICTION_COLUMNS + ['p_ct', 'ct_win', 'economy'])
+    predictions = pd.concat(parts, ignore_index=True)
+    predictions['ct_win'] = (predictions['round_winner'] == CT_WIN).astype(np.int8)
+    predictions['economy'] = economy_bucket(predictions)
+    return predictions
+
+
+def _with_losses(predictions: pd.DataFrame) -> pd.DataFrame:
+    p = predictions['p_ct'].to_numpy()
+    y = predictions['ct_win'].to_numpy()
+    clipped = np.clip(p, EPS, 1 - EPS)
+    bins = np.minimum((p * CALIBRATION_BINS).astype(np.int64), CALIBRATION_BINS - 1)
+    return predictions.assign(correct=((p >= 0.5) == (y == 1)).astype(np.float64),
+                              brier=(p - y) ** 2,
+                              log_loss=-(y * np.log(clipped) + (1 - y) * np.log(1 - clipped)),
+                              bin=bins)
+
+
+def _ece(frame: pd.DataFrame) -> float:
+    # Expected calibration error: |mean p_ct - CT win rate| per bin, weighted by the bin's rows
+    per_bin = frame.groupby('bin').agg(n=('p_ct', 'size'), p=('p_ct', 'mean'), y=('ct_win', 'mean'))
+    return float((per_bin['n'] * (per_bin['p'] - per_bin['y']).abs()).sum() / per_bin['n'].sum())
+
+
+def metrics_table(predictions: pd.DataFrame) -> pd.DataFrame:
+    """n, accuracy, Brier, log-loss, ECE, mean p_ct and CT win rate: overall, per map and per economy bucket."""
+    scored = _with_losses(predictions)
+    groups = [('all', 'all', scored)]
+    for by in ('map_name', 'economy'):
+        groups += [(by, value, frame) for value, frame in scored.groupby(by, sort=True)]
+    rows = [{'group': by, 'value': value, 'n': len(frame), 'accuracy': frame['correct'].mean(),
+             'brier': frame['brier'].mean(), 'log_loss': frame['log_loss'].mean(), 'ece': _ece(frame),
+             'mean_p_ct': frame['p_ct'].mean(), 'ct_win_rate': frame['ct_win'].mean()}
+            for by, value, frame in groups if len(frame)]
+    return pd.DataFrame(rows).round(4)
+
+
+def calibration_table(predictions: pd.DataFrame) -> pd.DataFrame:
+    """Reliability bins of p_ct, overall (map_name 'all') and per map."""
+    scored = _with_losses(predictions)
+    scored = pd.concat([scored.assign(map_name='all'), scored], ignore_index=True)
+    table = scored.groupby(['map_name', 'bin']).agg(n=('p_ct', 'size'), mean_p_ct=('p_ct', 'mean'),
+                                                    ct_win_rate=('ct_win', 'mean')).reset_index()
+    table.insert(2, 'lower', table['bin'] / CALIBRATION_BINS)
+    table.insert(3, 'upper', (table['bin'] + 1) / CALIBRATION_BINS)
+    return table.round(4)
+
+
+def write_report(predictions: pd.DataFrame, out_dir: str, details: dict) -> dict:
+    os.makedirs(out_dir, exist_ok=True)
+    predictions.to_parquet(os.path.join(out_dir, "predictions.parquet"), index=False)
+    metrics = metrics_table(predictions)
+    metrics.to_csv(os.path.join(out_dir, "metrics.csv"), index=False)
+    calibration_table(predictions).to_csv(os.path.join(out_dir, "calibration.csv"), index=False)
+    overall = metrics[metrics['group'] == 'all'].drop(columns=['group', 'value']).iloc[0].to_dict()
+    summary = {**details, 'overall': {k: (int(v) if k == 'n' else float(v)) for k, v in overall.items()}}
+    with open(os.path.join(out_dir, "summary.json"), 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bundle', help='Bundle folder (default: the published one)')
+    parser.add_argument('--bundles-dir', default=BUNDLES_DIR)
+    parser.add_argument('--dataset', default=DATASET_FOLDER)
+    parser.add_argument('--maps', nargs='+')
+    parser.add_argument('--date-from')
+    parser.add_argument('--date-to')
+    parser.add_argument('--min-round', type=int)
+    parser.add_argument('--max-round', type=int)
+    parser.add_argument('--split', choices=SPLITS, default='held-out',
+                        help="Rounds to score relative to the bundle's training demos (default: held-out)")
+    parser.add_argument('--player-stats', help="Player store folder (default: the one recorded in the bundle)")
+    parser.add_argument('--workers', type=int, help='Worker processes (default: all cores)')
+    parser.add_argument('--files-per-task', type=int, default=DEFAULT_FILES_PER_TASK)
+    parser.add_argument('--batch-rows', type=int, default=DEFAULT_BATCH_ROWS)
+    parser.add_argument('--output', help='Report folder (default: backtests/<bundle version>)')
+    args = parser.parse_args()
+
+    bundle_path = args.bundle or current_bundle_path(args.bundles_dir)
+    if bundle_path is None:
+        sys.exit(f"❌ No published bundle in {args.bundles_dir}")
+    bundle = load_bundle(bundle_path)
+    version = bundle.version
+    training_demo_ids = bundle.metadata.get('training_demo_ids')
+    split = args.split
+    if training_demo_ids is None and split != 'all':
+        print(f"⚠️  {version} does not list its training demos: scoring every round, metrics may be in-sample")
+        split = 'all (training demos unknown)'
+    exclude = training_demo_ids if split == 'held-out' else None
+    only = training_demo_ids if split == 'in-sample' else None
+
+    store, date_from = None, args.date_from
+    if bundle.schema.player_stat_features:
+        recorded = bundle.metadata.get('player_store') or {}
+        store_folder = args.player_stats or recorded.get('folder')
+        if not store_folder:
+            sys.exit(f"❌ {version} uses the player store features but does not record its store; pass --player-stats")
+        store = load_player_store(store_folder)
+        if store is None:
+            sys.exit(f"❌ No player store in {store_folder}; {version} needs its features (see model/player_stats.py)")
+        if recorded and store.identity['built_at'] != recorded.get('built_at'):
+            print(f"⚠️  The player store in {store_folder} is not the build {version} was trained with: "
+                  f"{store.identity['built_at']} vs {recorded.get('built_at')}")
+        if split == 'held-out':
+            # The store's win rates include every round up to its date_to
+            try:
+                date_from = training_date_from(store, args.date_from)
+            except ValueError:
+                print("⚠️  The player store has no date_to: its features include the scored rounds' outcomes")
+
+    start = time.perf_counter()
+    predictions = score_dataset(bundle_path, args.dataset, args.maps, date_from, args.date_to,
+                                args.min_round, args.max_round, args.workers, args.files_per_task, args.batch_rows,
+                                exclude_demos=exclude, only_demos=only,
+                                player_store=store.folder if store is not None else None)
+    if predictions.empty:
+        sys.exit(f"❌ No {split} rounds to score in {args.dataset}")
+    seconds = time.perf_counter() - start
+
+    out_dir = args.output or os.path.join(BACKTEST_FOLDER, version)
+    summary = write_report(predictions, out_dir, {
+        'bundle': version, 'dataset': args.dataset, 'demos': int(predictions['demo_id'].nunique()), 'split': split,
+        'training_demos': None if training_demo_ids is None else len(training_demo_ids),
+        'player_store': store.identity if store is not None else None,
+        'filters': {**{k: getattr(args, k) for k in ('maps', 'date_to', 'min_round', 'max_round')},
+                    'date_from': str(date_from) if date_from else None},
+        'seconds': round(seconds, 2), 'at': time.strftime('%Y-%m-%dT%H:%M:%S%z')})
+
+    overall = summary['overall']
+    print(f"✅ {overall['n']:,} {split} rounds from {summary['demos']:,} demos scored in {seconds:.1f} s "
+          f"({overall['n'] / max(seconds, 1e-9):,.0f} rounds/s)")
+    print(f"📊 accuracy {overall['accuracy']:.3f}, Brier {overall['brier']:.4f}, "
+          f"log-loss {overall['log_loss']:.4f}, ECE {overall['ece']:.4f}")
+    print(f"💾 Report written to {out_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,352 @@
+import os
+import bisect
+import logging
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+from tqdm import tqdm
+
+try:
+    import psutil
+except ImportError:  # optional, only used for the default memory budget
+    psutil = None
+
+from dedup import find_duplicates
+from demo_catalog import DemoCatalog
+from demo_validator import validate_demos
+from round_dataset import write_demo_rounds
+from telemetry import DEFAULT_INTERVAL, BatchTelemetry, format_telemetry
+from worker_utils import STAGES, _worker_report
+
+
+# Peak memory model defaults: a 64-tick demo takes ~600 bytes on disk per tick
+# and the pipeline peaks at ~10 KB per tick (ten player rows per tick)
+DEFAULT_DEMO_BYTES_PER_TICK = 600
+DEFAULT_PEAK_BYTES_PER_TICK = 10_000
+WORKER_BASE_MB = 250
+
+# Fraction of the available memory the pool may plan for when no budget is given
+DEFAULT_BUDGET_FRACTION = 0.7
+DEFAULT_MAX_TASKS_PER_CHILD = 8
+
+
+class MemoryModel():
+    """
+    Estimate a worker's peak RSS for a demo from its size on disk:
+    base + (demo_bytes / demo_bytes_per_tick) * peak_bytes_per_tick.
+    """
+
+    def __init__(self, demo_bytes_per_tick=DEFAULT_DEMO_BYTES_PER_TICK,
+                 peak_bytes_per_tick=DEFAULT_PEAK_BYTES_PER_TICK, base_mb=WORKER_BASE_MB):
+        self.demo_bytes_per_tick = demo_bytes_per_tick
+        self.peak_bytes_per_tick = peak_bytes_per_tick
+        self.base_mb = base_mb
+
+    def estimate_mb(self, demo_bytes) -> float:
+        ticks = (demo_bytes or 0) / self.demo_bytes_per_tick
+        return self.base_mb + ticks * self.peak_bytes_per_tick / 2**20
+
+    @classmethod
+    def from_reports(cls, reports, base_mb=None):
+        """
+        Calibrate from a previous run's worker reports (medians over the demos
+        that parsed), falling back to the defaults when there is nothing to fit.
+
+        The per-tick peak is each demo's own growth (peak_rss_mb over the
+        start_rss_mb of its task), so a small demo is not charged for a large
+        one that ran earlier in the same worker. base_mb defaults to the
+        median RSS workers had when a demo started.
+        """
+        parsed = [r for r in reports if r.get('ticks') and r.get('demo_bytes')]
+        measured = [r for r in parsed if r.get('peak_rss_mb') is not None and r.get('start_rss_mb') is not None]
+        bytes_per_tick = [r['demo_bytes'] / r['ticks'] for r in parsed]
+        peak_per_tick = [(r['peak_rss_mb'] - r['start_rss_mb']) * 2**20 / r['ticks']
+                         for r in measured if r['peak_rss_mb'] > r['start_rss_mb']]
+        if base_mb is None:
+            base_mb = float(pd.Series([r['start_rss_mb'] for r in measured]).median()) if measured else WORKER_BASE_MB
+        return cls(
+            demo_bytes_per_tick=float(pd.Series(bytes_per_tick).median()) if bytes_per_tick else DEFAULT_DEMO_BYTES_PER_TICK,
+            peak_bytes_per_tick=float(pd.Series(peak_per_tick).median()) if peak_per_tick else DEFAULT_PEAK_BYTES_PER_TICK,
+            base_mb=base_mb,
+        )
+
+
+def _default_memory_budget_mb():
+    if psutil is None:
+        return None
+    return psutil.virtual_memory().available / 2**20 * DEFAULT_BUDGET_FRACTION
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _crash_report(path, e):
+    # The worker process died (e.g. killed for memory) and took the pool with it
+    return {'demo_path': path, 'demo_bytes': _file_size(path), 'status': 'failed', 'reason': 'worker_crashed',
+            'exception': type(e).__name__, 'error': str(e)[:500], 'stages': {}}
+
+
+def _invalid_report(path, reason, size):
+    # Rejected by demo_validator before reaching a worker (and maybe moved since)
+    return {'demo_path': path, 'demo_bytes': size, 'status': 'failed', 'reason': reason,
+            'failed_stage': 'validate_file', 'stages': {}}
+
+
+def _duplicate_report(path, keep):
+    # Byte-identical to a demo that is processed (or was) instead
+    return {'demo_path': path, 'demo_bytes': _file_size(path), 'status': 'duplicate', 'reason': 'duplicate',
+            'duplicate_of': keep, 'stages': {}}
+
+
+def clean_demos_safe(demos_paths, max_workers=5, verbose=False, memory_budget_mb=None,
+                     memory_model=None, max_tasks_per_child=DEFAULT_MAX_TASKS_PER_CHILD,
+                     telemetry_path=None, telemetry_interval=DEFAULT_INTERVAL, catalog_path=None,
+                     dedup=True, validate=True, quarantine_folder=None, dataset_folder=None,
+                     trajectory_folder=None):
+    """
+    Process demos in a process pool, largest first, under a memory budget.
+
+    - Always returns (DataFrame, list, list)
+    - Does not remove files automatically
+    - Keeps one structured report per demo (see worker_utils._worker_report)
+    - Rejects truncated or corrupt files up front (see demo_validator)
+    - Skips byte-identical copies of a demo (see dedup.find_duplicates)
+
+    The biggest demos start first so the long overtime demos do not form the
+    tail of the batch. A demo is only admitted while the estimated peak memory
+    of everything in flight stays under memory_budget_mb; a demo larger than
+    the whole budget runs alone. Workers are replaced every
+    max_tasks_per_child demos so fragmented heaps are given back.
+
+    Args:
+        demos_paths (list): Paths of the .dem files.
+        max_workers (int): Worker processes.
+        verbose (bool): Log failures as they happen.
+        memory_budget_mb (float): Memory the pool may plan for; defaults to 70%
+            of the available memory (no limit without psutil).
+        memory_model (MemoryModel): Peak memory estimator, e.g.
+            MemoryModel.from_reports(previous_reports).
+        max_tasks_per_child (int): Demos per worker process before it is
+            replaced; None to keep workers for the whole run.
+        telemetry_path (str): Append a telemetry snapshot (see
+            telemetry.BatchTelemetry) as a JSON line every telemetry_interval
+            seconds.
+        telemetry_interval (float): Seconds between snapshots.
+        catalog_path (str): Demo catalog (see demo_catalog.DemoCatalog) where
+            each demo's status is recorded as it finishes.
+        dedup (bool): Parse only one copy of identical demo files; the others
+            get a 'duplicate' report naming the kept copy.
+        validate (bool): Check every file's magic, header and file info before
+            scheduling; bad files fail with the validator's reason.
+        quarantine_folder (str): Move the files the validator rejects here
+            (e.g. demo_validator.QUARANTINE_FOLDER); None leaves them in place.
+        dataset_folder (str): Also write each demo's round summaries to this
+            partitioned Parquet dataset (e.g. round_dataset.DATASET_FOLDER) as
+            it finishes; read it back with round_dataset.load_rounds.
+        trajectory_folder (str): Also write each demo's player trajectories
+            (backend.trajectory, e.g. TRAJECTORY_DIR) from the worker, so
+            rounds can be replayed without parsing the demo again.
+
+    Returns:
+        tuple: (final_df, wrong, reports) with the round summaries of every
+            usable demo, the paths that failed and the per-demo reports.
+    """
+    if verbose:
+        logging.basicConfig(level=logging.INFO)
+
+    catalog = DemoCatalog(catalog_path) if catalog_path else None
+    dfs, wrong, reports = [], [], []
+    if validate:
+        sizes = {path: _file_size(path) for path in demos_paths}
+        demos_paths, bad = validate_demos(demos_paths, quarantine_folder=quarantine_folder)
+        invalid = [_invalid_report(path, reason, sizes[path]) for path, reason in bad.items()]
+        reports.extend(invalid)
+        wrong.extend(bad)
+        if catalog is not None:
+            catalog.record_reports(invalid)
+        if invalid:
+            print(f"🚫 {len(invalid)} invalid demos rejected before parsing"
+                  + (f", moved to {quarantine_folder}" if quarantine_folder else ""))
+    if dedup:
+        found = find_duplicates(demos_paths, catalog=catalog)
+        demos_paths = found['unique']
+        duplicates = [_duplicate_report(path, keep) for path, keep in found['duplicates'].items()]
+        reports.extend(duplicates)
+        if catalog is not None:
+            catalog.record_reports(duplicates)
+        if duplicates:
+            print(f"♻️  {len(duplicates)} duplicate demos skipped ({found['hashed_mb']} MB hashed to find them)")
+
+    memory_model = memory_model or MemoryModel()
+    if memory_budget_mb is None:
+        memory_budget_mb = _default_memory_budget_mb()
+
+    # Largest first: file size is the cost estimate; pop() from the end takes the largest
+    pending = sorted((_file_size(p), p) for p in dict.fromkeys(demos_paths))
+    estimates = {path: memory_model.estimate_mb(size) for size, path in pending}
+    telemetry = BatchTelemetry(len(pending), sum(size for size, _ in pending), path=telemetry_path,
+                               interval=telemetry_interval)
+    sizes = {path: size for size, path in pending}
+    pending = [path for _, path in pending]
+    attempts = defaultdict(int)
+
+    def collect(path, df_part, report):
+        reports.append(report)
+        telemetry.finished(report)
+        if catalog is not None:
+            catalog.record_reports([report])
+        if report['status'] == 'ok' and not df_part.empty:
+            dfs.append(df_part)
+            if dataset_folder:
+                try:
+                    write_demo_rounds(df_part, path, dataset_folder)
+                except Exception as e:
+                    logging.warning(f"Could not write {path} to {dataset_folder}: {e}")
+        else:
+            wrong.append(path)
+            if verbose:
+                logging.info(f"Demo rejeitada ({report['reason']}): {path}")
+
+    def new_pool():
+        return ProcessPoolExecutor(max_workers=max_workers, max_tasks_per_child=max_tasks_per_child)
+
+    with tqdm(total=len(pending), desc="Cleaning Demos") as progress_bar:
+        ex = new_pool()
+        in_flight = {}  # future -> path
+        try:
+            while pending or in_flight:
+                # Admit the next largest demo while it fits in the budget
+                while pending and len(in_flight) < max_workers:
+                    path = pending[-1]
+                    planned = sum(estimates[p] for p in in_flight.values())
+                    if in_flight and memory_budget_mb is not None and planned + estimates[path] > memory_budget_mb:
+                        break
+                    pending.pop()
+                    attempts[path] += 1
+                    in_flight[ex.submit(_worker_report, path, trajectory_folder)] = path
+                    telemetry.submitted(path, _file_size(path), estimates[path])
+
+                # Wake up at least every interval so snapshots keep coming during long demos
+                done, _ = wait(in_flight, timeout=telemetry_interval, return_when=FIRST_COMPLETED)
+                lost = []
+                for fut in done:
+                    path = in_flight.pop(fut)
+                    try:
+                        df_part, report = fut.result()
+                    except BrokenProcessPool as e:
+                        lost.append((path, e))
+                        continue
+                    except Exception as e:
+                        df_part, report = pd.DataFrame(), _crash_report(path, e)
+                    collect(path, df_part, report)
+                    progress_bar.update(1)
+
+                if lost:
+                    # A worker died and every task in the pool went with it. The
+                    # culprit is unknown, so each lost demo gets one more try
+                    lost += [(path, BrokenProcessPool('process pool broken')) for path in in_flight.values()]
+                    in_flight.clear()
+                    ex.shutdown(wait=False, cancel_futures=True)
+                    ex = new_pool()
+                    for path, e in lost:
+                        if attempts[path] < 2:
+                            # Back in its place by size, so the largest-first order holds
+                            bisect.insort(pending, path, key=lambda p: (sizes[p], p))
+                        else:
+                            collect(path, pd.DataFrame(), _crash_report(path, e))
+                            progress_bar.update(1)
+
+                if telemetry.snapshot() is not None:
+                    progress_bar.set_postfix_str(telemetry.summary_line(), refresh=True)
+        finally:
+            ex.shutdown(wait=True, cancel_futures=True)
+            final = telemetry.close()
+            if catalog is not None:
+                catalog.close()
+            progress_bar.set_postfix_str(telemetry.summary_line(final), refresh=True)
+
+    print(format_telemetry(final))
+
+    wrong = list(dict.fromkeys(wrong))  # deduplicate
+    final_df = pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+    return final_df, wrong, reports
+
+
+def summarize_reports(reports, top=10) -> dict:
+    """
+    Aggregate worker reports into a run summary.
+
+    Args:
+        reports (list): Reports from _worker_report.
+        top (int): How many of the slowest demos to list.
+
+    Returns:
+        dict: Demo counts, failure reasons, time spent per stage (total, share,
+            mean and max), the slowest demos and the highest per-demo peak RSS.
+    """
+    reasons = Counter(r['reason'] for r in reports if r['status'] == 'failed')
+    exceptions = Counter(r['exception'] for r in reports if r.get('exception'))
+
+    per_stage = defaultdict(list)
+    for r in reports:
+        for name, s in r.get('stages', {}).items():
+            per_stage[name].append(s['seconds'])
+    busy = sum(sum(v) for v in per_stage.values()) or 1.0
+    order = {name: i for i, name in enumerate(STAGES)}
+    stages = {
+        name: {
+            'total_s': round(sum(v), 3),
+            'share': round(sum(v) / busy, 4),
+            'mean_s': round(sum(v) / len(v), 4),
+            'max_s': round(max(v), 4),
+            'demos': len(v),
+        }
+        for name, v in sorted(per_stage.items(), key=lambda kv: order.get(kv[0], len(order)))
+    }
+
+    timed = [r for r in reports if r.get('seconds') is not None]
+    slowest = sorted(timed, key=lambda r: r['seconds'], reverse=True)[:top]
+    total_bytes = sum(r.get('demo_bytes') or 0 for r in reports)
+    peak_rss = [r['peak_rss_mb'] for r in reports if r.get('peak_rss_mb') is not None]
+
+    return {
+        'demos': len(reports),
+        'ok': sum(r['status'] == 'ok' for r in reports),
+        'failed': sum(r['status'] == 'failed' for r in reports),
+        'duplicates': sum(r['status'] == 'duplicate' for r in reports),
+        'reasons': dict(reasons.most_common()),
+        'exceptions': dict(exceptions.most_common()),
+        'worker_seconds': round(sum(r['seconds'] for r in timed), 3),
+        'demo_gb': round(total_bytes / 2**30, 3),
+        'stages': stages,
+        'slowest': [
+            {'demo_path': r['demo_path'], 'seconds': r['seconds'], 'demo_bytes': r.get('demo_bytes'),
+             'ticks': r.get('ticks'), 'status': r['status'], 'reason': r.get('reason'),
+             'slowest_stage': max(r['stages'], key=lambda n: r['stages'][n]['seconds']) if r.get('stages') else None}
+            for r in slowest
+        ],
+        'peak_rss_mb': max(peak_rss) if peak_rss else None,
+    }
+
+
+def format_run_summary(summary: dict) -> str:
+    lines = [
+        f"📊 {summary['demos']} demos: {summary['ok']} ok, {summary['failed']} failed, "
+        f"{summary.get('duplicates', 0)} duplicates "
+        f"({summary['demo_gb']} GB, {summary['worker_seconds']:.1f} worker-seconds, peak demo RSS {summary['peak_rss_mb']} MB)",
+    ]
+    if summary['reasons']:
+        lines.append("❌ Failure reasons: " + ", ".join(f"{k}={v}" for k, v in summary['reasons'].items()))
+    lines.append("⏱️  Time per stage:")
+    for name, s in summary['stages'].items():
+        lines.append(f"   {name:28s} {s['total_s']:9.1f} s  {s['share']:6.1%}  mean {s['mean_s']:.3f} s  max {s['max_s']:.3f} s")
+    lines.append("🐢 Slowest demos:")
+    for r in summary['slowest']:
+        lines.append(f"   {r['seconds']:7.2f} s  {r['slowest_stage'] or '-':28s} {r['status']:6s} {r['demo_path']}")
+    return "\n".join(lines)
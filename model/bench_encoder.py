@@ -0,0 +1,129 @@
+"""
+Benchmark the player-id encoding: backend.encoders.TeamIdEncoder (vectorized,
+sparse CSR output) against the dense, row-by-row encoder the training
+notebook used before.
+
+For every (rows, players) size it reports fit + transform time, the peak
+memory allocated during the transform (tracemalloc) and the size of the
+output, and checks both encoders write the same cells.
+
+Usage:
+    python model/bench_encoder.py
+    python model/bench_encoder.py --rows 1000 10000 --players 500 5000 --repeat 3 --output bench_encoder.json
+"""
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+from itertools import product
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.encoders import TeamIdEncoder
+
+
+class LegacyTeamIdEncoder(BaseEstimator, TransformerMixin):
+    # The notebook's encoder before backend.encoders, kept as the baseline
+    def __init__(self):
+        self.classes_ = None
+
+    def fit(self, X, y=None):
+        all_ids = set()
+        for col in X.columns:
+            for lista in X[col]:
+                all_ids.update(lista)
+        self.classes_ = sorted(list(all_ids))
+        return self
+
+    def transform(self, X):
+        res = np.zeros((X.shape[0], len(self.classes_)), dtype=int)
+        id_map = {id_: i for i, id_ in enumerate(self.classes_)}
+        for row_idx in range(X.shape[0]):
+            for user_id in X.iloc[row_idx, 0]:
+                if user_id in id_map:
+                    res[row_idx, id_map[user_id]] = 1
+            for user_id in X.iloc[row_idx, 1]:
+                if user_id in id_map:
+                    res[row_idx, id_map[user_id]] = 2
+        return res
+
+
+def make_rounds(n_rows: int, n_players: int, seed: int = 0) -> pd.DataFrame:
+    """Rounds with five distinct steamids per side drawn from n_players."""
+    rng = np.random.default_rng(seed)
+    steamids = 76561197960265728 + rng.choice(10 ** 9, size=n_players, replace=False)
+    picks = np.array([rng.choice(n_players, size=10, replace=False) for _ in range(n_rows)])
+    ids = steamids[picks]
+    return pd.DataFrame({'team_ct_players': [list(r[:5]) for r in ids.tolist()],
+                         'team_t_players': [list(r[5:]) for r in ids.tolist()]})
+
+
+def _nbytes(out) -> int:
+    if hasattr(out, 'indptr'):
+        return out.data.nbytes + out.indices.nbytes + out.indptr.nbytes
+    return out.nbytes
+
+
+def bench(make_encoder, X: pd.DataFrame, repeat: int) -> dict:
+    seconds = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        make_encoder().fit(X).transform(X)
+        seconds.append(time.perf_counter() - start)
+    encoder = make_encoder().fit(X)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        out = encoder.transform(X)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'best_s': round(min(seconds), 5), 'peak_mb': round(peak / 2 ** 20, 2),
+            'output_mb': round(_nbytes(out) / 2 ** 20, 3), 'output': out}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--players', type=int, nargs='+', default=[500, 5000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the results as JSON to this path')
+    args = parser.parse_args()
+
+    results = []
+    for n_rows, n_players in product(args.rows, args.players):
+        X = make_rounds(n_rows, n_players, args.seed)
+        legacy = bench(LegacyTeamIdEncoder, X, args.repeat)
+        sparse = bench(TeamIdEncoder, X, args.repeat)
+        # Same cells once the legacy 1/2 values are used
+        same = np.array_equal(legacy['output'], TeamIdEncoder(ct_value=1, t_value=2, dtype=int,
+                                                               sparse_output=False).fit_transform(X))
+        print(f"\n🧪 {n_rows:,} rows x {n_players:,} players ({'same cells' if same else '❌ different cells'})")
+        for name, r in (('legacy dense', legacy), ('TeamIdEncoder CSR', sparse)):
+            print(f"   {name:20s} {r['best_s'] * 1000:10.1f} ms  {r['peak_mb']:9.2f} MB peak  {r['output_mb']:9.3f} MB out")
+        print(f"   speedup x{legacy['best_s'] / max(sparse['best_s'], 1e-9):.1f}, "
+              f"output x{legacy['output_mb'] / max(sparse['output_mb'], 1e-9):.0f} smaller")
+        results.append({'rows': n_rows, 'players': n_players, 'same_cells': bool(same),
+                        'legacy': {k: v for k, v in legacy.items() if k != 'output'},
+                        'sparse': {k: v for k, v in sparse.items() if k != 'output'}})
+
+    if args.output:
+        report = {'meta': {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'python': platform.python_version(),
+                           'numpy': np.__version__, 'repeat': args.repeat, 'seed': args.seed},
+                  'results': results}
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""
+Benchmark the demo parsing pipeline on synthetic ticks.
+
+Times every stage of worker_utils (process_round_results through
+build_round_summary) and of backend.func.DemoProcessing, and reports the
+peak memory each stage allocates, across several demo sizes. No .dem files
+are needed.
+
+Usage:
+    python model/bench_pipeline.py
+    python model/bench_pipeline.py --rounds 24 --overtimes 0 1 --tick-step 8 1 --repeat 3 --output bench.json
+"""
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import warnings
+import platform
+import tracemalloc
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, MODEL_DIR)
+sys.path.append(os.path.dirname(MODEL_DIR))
+
+import worker_utils
+from synthetic_ticks import generate_demo
+
+
+def _worker_stages(w):
+    # Same order as worker_utils._worker_standalone
+    def process(state):
+        state['round_results'] = w.process_round_results(state['ticks_df'])
+
+    def integrate(state):
+        state['ticks_df'] = w.integrate_round_results(state['ticks_df'], state['round_results'])
+
+    def finalize(state):
+        state['ticks_df'] = w.finalize_ticks_dataframe(state['ticks_df'])
+
+    def filter_initial(state):
+        state['ticks_df'] = w.filter_initial_round_ticks(state['ticks_df'])
+
+    def categorical(state):
+        state['ticks_df'] = w.set_categorical_data_types(state['ticks_df'])
+
+    def summary(state):
+        state['summary'] = w.build_round_summary(state['ticks_df'], state['round_results'])
+
+    return [('process_round_results', process), ('integrate_round_results', integrate),
+            ('finalize_ticks_dataframe', finalize), ('filter_initial_round_ticks', filter_initial),
+            ('set_categorical_data_types', categorical), ('build_round_summary', summary)]
+
+
+def _demo_processing_stages():
+    from backend.func import DemoProcessing
+
+    def make(state):
+        # Skip __init__: it needs a .dem file for the parser
+        processor = DemoProcessing.__new__(DemoProcessing)
+        processor.demo_path, processor.header, processor.parser = None, None, None
+        processor.ticks_df = state['ticks_df']
+        state['processor'] = processor
+
+    def step(name):
+        def run(state):
+            getattr(state['processor'], name)()
+        return run
+
+    return [('DemoProcessing.__init__', make)] + [
+        (f'DemoProcessing.{name}', step(name)) for name in (
+            '_remove_freeze_warmup_periods', '_derive_seconds_elapsed_in_round', '_map_round_outcomes',
+            '_calculate_t_ct_alive_counts', '_set_target_column', '_get_rounds_start_end_times')]
+
+
+def _run(stages, ticks_df, trace_memory: bool) -> dict:
+    state = {'ticks_df': ticks_df.copy()}
+    timings = {}
+    for name, stage in stages:
+        gc.collect()
+        if trace_memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        stage(state)
+        elapsed = time.perf_counter() - start
+        timings[name] = {'seconds': elapsed}
+        if trace_memory:
+            timings[name]['peak_mb'] = (tracemalloc.get_traced_memory()[1] - before) / 2 ** 20
+    return timings
+
+
+def bench_size(stages, ticks_df, repeat: int) -> dict:
+    """
+    Time each stage over repeat runs (without tracing), then measure each
+    stage's peak allocation in one traced run.
+
+    Returns:
+        dict: stage name -> best/median seconds, rows/s and peak MB.
+    """
+    runs = [_run(stages, ticks_df, trace_memory=False) for _ in range(repeat)]
+    tracemalloc.start()
+    try:
+        traced = _run(stages, ticks_df, trace_memory=True)
+    finally:
+        tracemalloc.stop()
+
+    result = {}
+    for name, _ in stages:
+        seconds = np.array([run[name]['seconds'] for run in runs])
+        result[name] = {
+            'best_s': round(float(seconds.min()), 5),
+            'median_s': round(float(np.median(seconds)), 5),
+            'rows_per_s': round(len(ticks_df) / float(seconds.min()), 1) if seconds.min() > 0 else None,
+            'peak_mb': round(traced[name]['peak_mb'], 2),
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, nargs='+', default=[24])
+    parser.add_argument('--overtimes', type=int, nargs='+', default=[0])
+    parser.add_argument('--tick-step', type=int, nargs='+', default=[16, 4, 1],
+                        help='Keep every n-th tick; 1 is a full 64-tick demo')
+    parser.add_argument('--tick-rate', type=int, default=64)
+    parser.add_argument('--missing-final-win', action='store_true')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--skip-demo-processing', action='store_true', help='Only benchmark worker_utils')
+    parser.add_argument('--output', help='Write the results as JSON to this path')
+    args = parser.parse_args()
+
+    # The DemoProcessing steps assign into filtered frames; the warning is noise here
+    warnings.simplefilter('ignore', pd.errors.SettingWithCopyWarning)
+
+    suites = {'worker_utils': _worker_stages(worker_utils)}
+    if not args.skip_demo_processing:
+        suites['DemoProcessing'] = _demo_processing_stages()
+
+    results = []
+    for rounds, overtimes, tick_step in product(args.rounds, args.overtimes, args.tick_step):
+        if overtimes and rounds != 24:
+            continue
+        ticks_df, _ = generate_demo(rounds=rounds, overtimes=overtimes, tick_step=tick_step,
+                                    tick_rate=args.tick_rate, missing_final_win=args.missing_final_win,
+                                    seed=args.seed)
+        size = {'rounds': rounds, 'overtimes': overtimes, 'tick_step': tick_step, 'rows': len(ticks_df),
+                'input_mb': round(ticks_df.memory_usage(deep=True).sum() / 2 ** 20, 1)}
+        print(f"\n🧪 {rounds} rounds + {overtimes} OT, tick_step={tick_step}: "
+              f"{size['rows']:,} rows, {size['input_mb']} MB")
+        for suite, stages in suites.items():
+            stage_results = bench_size(stages, ticks_df, args.repeat)
+            total = sum(s['best_s'] for s in stage_results.values())
+            for name, s in stage_results.items():
+                print(f"   {name:48s} {s['best_s'] * 1000:9.1f} ms  {s['peak_mb']:8.1f} MB peak")
+            print(f"   {suite + ' total':48s} {total * 1000:9.1f} ms")
+            results.append({**size, 'suite': suite, 'total_s': round(total, 5), 'stages': stage_results})
+        del ticks_df
+        gc.collect()
+
+    if args.output:
+        report = {
+            'meta': {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'python': platform.python_version(),
+                     'pandas': pd.__version__, 'numpy': np.__version__, 'repeat': args.repeat, 'seed': args.seed},
+            'results': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
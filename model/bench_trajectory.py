@@ -0,0 +1,120 @@
+"""
+Benchmark the trajectory store (backend.trajectory) against keeping the tick
+DataFrame as Parquet for round replays.
+
+For synthetic demos it writes both the tick frame (every column, as the
+worker has it) and the trajectory file, then reports the bytes on disk and
+the time to load one round's player paths from each: the Parquet read is
+filtered to the round, the trajectory read opens the file and decodes the
+round. Both paths are checked to agree within the quantization step.
+
+Usage:
+    python model/bench_trajectory.py
+    python model/bench_trajectory.py --demos 5 --tick-step 1 --repeat 20 --output bench_trajectory.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.trajectory import QUANT_STEPS, TrajectoryStore
+from synthetic_ticks import generate_demo
+
+
+def _best(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def _parquet_round(path: str, round_number: int) -> pd.DataFrame:
+    # What a replay needs from the tick file: one round's alive positions
+    df = pq.read_table(path, columns=['tick', 'steamid', 'X', 'Y', 'health'],
+                       filters=[('total_rounds_played', '=', round_number - 1)]).to_pandas()
+    return df[df['health'] > 0]
+
+
+def bench_demo(ticks_df: pd.DataFrame, folder: str, demo_id: str, repeat: int) -> dict:
+    parquet_path = os.path.join(folder, f"{demo_id}.parquet")
+    ticks_df.to_parquet(parquet_path, index=False)
+    store = TrajectoryStore(folder)
+    start = time.perf_counter()
+    traj_path = store.write(ticks_df, demo_id)
+    write_s = time.perf_counter() - start
+
+    rounds = store.open(demo_id).rounds
+    round_number = rounds[len(rounds) // 2]
+
+    def load_trajectory():
+        # A fresh store each time, so the header is read again like on a cold request
+        return TrajectoryStore(folder).open(demo_id).round_points(round_number)
+
+    parquet_s = _best(lambda: _parquet_round(parquet_path, round_number), repeat)
+    trajectory_s = _best(load_trajectory, repeat)
+
+    # Same points, within half a quantization step
+    expected = _parquet_round(parquet_path, round_number).sort_values(['steamid', 'tick'])
+    got = pd.concat([pd.DataFrame({'steamid': np.uint64(steamid), 'tick': ticks, 'X': x, 'Y': y})
+                     for steamid, _, _, ticks, x, y in load_trajectory()]).sort_values(['steamid', 'tick'])
+    assert np.array_equal(expected['tick'].to_numpy(), got['tick'].to_numpy())
+    error = float(np.abs(expected[['X', 'Y']].to_numpy() - got[['X', 'Y']].to_numpy()).max())
+    assert len(expected) == len(got) and error <= 0.5 / QUANT_STEPS + 1e-3, (len(expected), len(got), error)
+
+    return {
+        'rows': int(len(ticks_df)),
+        'rounds': len(rounds),
+        'parquet_mb': round(os.path.getsize(parquet_path) / 2**20, 3),
+        'trajectory_mb': round(os.path.getsize(traj_path) / 2**20, 3),
+        'write_trajectory_ms': round(write_s * 1000, 2),
+        'round_load_parquet_ms': round(parquet_s * 1000, 3),
+        'round_load_trajectory_ms': round(trajectory_s * 1000, 3),
+        'max_error_units': round(error, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--demos', type=int, default=3)
+    parser.add_argument('--tick-step', type=int, default=1, help="Keep every n-th tick of the synthetic demos")
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--output', help="Write the results as JSON")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix='bench_trajectory-')
+    results = []
+    try:
+        for seed in range(args.demos):
+            ticks_df, _ = generate_demo(tick_step=args.tick_step, seed=seed)
+            ticks_df['name'] = ticks_df['name'].astype(str)
+            result = bench_demo(ticks_df, folder, f"demo-{seed}", args.repeat)
+            results.append(result)
+            print(f"demo-{seed}: {result['rows']:,} rows | size {result['parquet_mb']:.2f} MB -> "
+                  f"{result['trajectory_mb']:.2f} MB | round load {result['round_load_parquet_ms']:.2f} ms -> "
+                  f"{result['round_load_trajectory_ms']:.2f} ms")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    size = sum(r['trajectory_mb'] for r in results) / sum(r['parquet_mb'] for r in results)
+    load = sum(r['round_load_trajectory_ms'] for r in results) / sum(r['round_load_parquet_ms'] for r in results)
+    print(f"✅ Trajectories take {size:.1%} of the tick Parquet on disk and {load:.1%} of its round load time")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': platform.python_version(), 'results': results,
+                       'size_ratio': round(size, 4), 'load_ratio': round(load, 4)}, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
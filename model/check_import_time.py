@@ -0,0 +1,144 @@
+"""
+Import-time budget check for the modules every process pays for.
+
+Imports each target in a fresh interpreter under `python -X importtime`
+(best of --repeat runs) and fails when:
+- its cumulative import time exceeds the budget, or
+- it pulls in a module that must stay lazy (NumPy in the views, demoparser2
+  in worker_utils, ...), or
+- importing it touches the filesystem to list demos or map backgrounds.
+
+Usage:
+    python model/check_import_time.py
+    python model/check_import_time.py --repeat 5 --scale 1.5 --output import_time.json
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(MODEL_DIR)
+DJANGO_DIR = os.path.join(REPO_ROOT, 'dash_project')
+
+_GUARD_LISTING = """
+import glob, os
+def _forbidden(*args, **kwargs):
+    raise RuntimeError('filesystem listing at import time')
+glob.glob = glob.iglob = os.listdir = os.scandir = _forbidden
+"""
+
+_DJANGO_SETUP = """
+import os, django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dash_project.settings')
+django.setup()
+"""
+
+# name -> how to import it; budgets are the cumulative ms of the module itself
+TARGETS = {
+    'predictor.views': {
+        'cwd': DJANGO_DIR,
+        'setup': _DJANGO_SETUP,
+        'module': 'predictor.views',
+        'budget_ms': 150,
+        # The model stack loads on the first prediction, not on import
+        'forbidden': ['numpy', 'pandas', 'joblib', 'sklearn', 'demoparser2'],
+    },
+    'worker_utils': {
+        'cwd': MODEL_DIR,
+        'setup': _GUARD_LISTING,
+        'module': 'worker_utils',
+        # pandas alone is most of it: every stage works on DataFrames
+        'budget_ms': 900,
+        'forbidden': ['demoparser2', 'psutil'],
+    },
+}
+
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def measure(target: dict) -> dict:
+    """
+    Import target once in a fresh interpreter.
+
+    Returns:
+        dict: cumulative ms of the target module, self ms of every module
+            imported with it, and the error if the import failed.
+    """
+    code = target['setup'] + f"\nimport {target['module']}\n"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get('PYTHONPATH')])))
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=target['cwd'], env=env,
+                          capture_output=True, text=True)
+    modules, cumulative = {}, None
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, _, name = match.groups()
+        modules[name] = int(self_us) / 1000
+        if name == target['module']:
+            cumulative = int(cumulative_us) / 1000
+    error = None
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f'exit code {proc.returncode}'
+    return {'cumulative_ms': cumulative, 'modules': modules, 'error': error}
+
+
+def check(name: str, target: dict, repeat: int, scale: float) -> dict:
+    runs = [measure(target) for _ in range(repeat)]
+    errors = [r['error'] for r in runs if r['error']]
+    timed = [r for r in runs if r['cumulative_ms'] is not None]
+    best = min(timed, key=lambda r: r['cumulative_ms']) if timed else None
+    budget = target['budget_ms'] * scale
+
+    problems = []
+    if errors:
+        problems.append(f"import failed: {errors[0]}")
+    if best is not None:
+        if best['cumulative_ms'] > budget:
+            problems.append(f"{best['cumulative_ms']:.1f} ms > budget {budget:.0f} ms")
+        loaded = [m for m in target['forbidden'] if m in best['modules']]
+        if loaded:
+            problems.append("imports " + ", ".join(loaded))
+    top = sorted(best['modules'].items(), key=lambda kv: kv[1], reverse=True)[:5] if best else []
+    return {
+        'target': name,
+        'cumulative_ms': best['cumulative_ms'] if best else None,
+        'budget_ms': round(budget, 1),
+        'ok': not problems,
+        'problems': problems,
+        'slowest_self_ms': dict((m, round(ms, 1)) for m, ms in top),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('targets', nargs='*', help=f"Any of {', '.join(TARGETS)} (default: all)")
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per target; the best one counts')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply every budget (slow CI machines)')
+    parser.add_argument('--output', help='Write the results as JSON to this path')
+    args = parser.parse_args()
+    unknown = [name for name in args.targets if name not in TARGETS]
+    if unknown:
+        parser.error(f"unknown target(s): {', '.join(unknown)}")
+
+    results = [check(name, TARGETS[name], args.repeat, args.scale) for name in (args.targets or TARGETS)]
+    for r in results:
+        took = f"{r['cumulative_ms']:.1f} ms" if r['cumulative_ms'] is not None else '?'
+        print(f"{'✅' if r['ok'] else '❌'} {r['target']:20s} {took:>10s} / {r['budget_ms']:.0f} ms")
+        for problem in r['problems']:
+            print(f"   {problem}")
+        if not r['ok']:
+            print("   slowest: " + ", ".join(f"{m} {ms} ms" for m, ms in r['slowest_self_ms'].items()))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+    sys.exit(0 if all(r['ok'] for r in results) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Regression checks for the incremental retraining (retrain.py) on a synthetic
+round summaries dataset in a temporary folder.
+
+- A batch of new rounds with both winners grows the forest with warm_start.
+- A batch where one side won every round cannot: warm_start would refit
+  classes_ to that one class and the bundle export would fail, on every run
+  until --full. It must take the full refit ('missing class') and export a
+  bundle with both classes.
+
+Usage:
+    python model/check_retrain.py
+    python model/check_retrain.py --demos 40 --keep
+"""
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+MODEL_FOLDER = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(MODEL_FOLDER))
+from backend.bundle import load_bundle
+from retrain import retrain
+from round_dataset import write_demo_rounds
+
+CT_WIN, T_WIN = 3, 2
+MAPS = ['de_nuke', 'de_mirage', 'de_anubis']
+ROUNDS = 24
+
+
+def write_demo(root: str, i: int, rng, winners=None) -> None:
+    """One synthetic demo's round summaries; random winners unless given."""
+    demo_path = os.path.join(root, "demos", f"{i}.dem")
+    os.makedirs(os.path.dirname(demo_path), exist_ok=True)
+    with open(demo_path, 'wb') as f:
+        f.write(rng.bytes(4096))
+    players = (76561197960000000 + rng.choice(1000, 10, replace=False)).tolist()
+    ct, t = players[:5], players[5:]
+    df = pd.DataFrame({
+        'round_winner': rng.choice([CT_WIN, T_WIN], ROUNDS) if winners is None else np.full(ROUNDS, winners),
+        'round_reason': rng.integers(1, 10, ROUNDS),
+        'team_ct_name': 'A', 'team_t_name': 'B',
+        'team_ct_players': [ct if r < 12 else t for r in range(ROUNDS)],
+        'team_t_players': [t if r < 12 else ct for r in range(ROUNDS)],
+        'team_ct_current_equip_value': rng.integers(0, 30000, ROUNDS),
+        'team_t_current_equip_value': rng.integers(0, 30000, ROUNDS),
+        'round': np.arange(1, ROUNDS + 1),
+        'map_name': MAPS[i % len(MAPS)],
+    })
+    write_demo_rounds(df, demo_path, os.path.join(root, "dataset"), match_date=dt.date(2025, 1, 1 + i % 28))
+
+
+def check(folder: str, demos: int) -> None:
+    rng = np.random.default_rng(0)
+    dataset, state, bundles = (os.path.join(folder, name) for name in ("dataset", "state", "bundles"))
+    params = {'n_estimators': 20, 'n_jobs': 1}
+    for i in range(demos):
+        write_demo(folder, i, rng)
+    summary = retrain(dataset, state, bundles, publish=False, forest_params=params)
+    assert summary['mode'].startswith('full'), summary
+
+    # Both winners and no drift limit: trees are added
+    write_demo(folder, demos, rng)
+    summary = retrain(dataset, state, bundles, drift_threshold=np.inf, publish=False, forest_params=params)
+    assert summary['mode'] == 'incremental', summary
+
+    # Only CT wins: refitted on everything, and the bundle still has both classes
+    write_demo(folder, demos + 1, rng, winners=CT_WIN)
+    summary = retrain(dataset, state, bundles, drift_threshold=np.inf, publish=False, forest_params=params)
+    assert summary['mode'] == 'full (missing class)', summary
+    classes = sorted(load_bundle(summary['bundle']).classes_.tolist())
+    assert classes == [T_WIN, CT_WIN], classes
+    assert retrain(dataset, state, bundles, publish=False) is None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--demos', type=int, default=20, help='Demos of the first full fit')
+    parser.add_argument('--keep', action='store_true', help='Keep the temporary folder')
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix='check_retrain-')
+    try:
+        check(folder, args.demos)
+    finally:
+        if args.keep:
+            print(f"📁 {folder}")
+        else:
+            shutil.rmtree(folder, ignore_errors=True)
+    print("✅ Incremental retraining checks passed")
+
+
+if __name__ == '__main__':
+    main()
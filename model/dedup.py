@@ -0,0 +1,138 @@
+"""
+Find copies of the same demo before parsing it twice.
+
+The same match lands in demos/ more than once: shared by several teams in
+teams.json, re-downloaded under another id, or extracted next to its .rar.
+Copies are found in three passes, each only over the files the previous one
+could not tell apart:
+1. size (free, from stat)
+2. sampled_hash: the size plus SAMPLE_BLOCKS blocks spread over the file
+3. full_hash of the whole file, to confirm
+"""
+import os
+import struct
+import hashlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+SAMPLE_BLOCKS = 8
+SAMPLE_BLOCK_BYTES = 64 * 1024
+FULL_HASH_CHUNK_BYTES = 1 << 20
+DEFAULT_HASH_WORKERS = 8
+
+
+def sampled_hash(path: str, size: int = None, blocks: int = SAMPLE_BLOCKS,
+                 block_bytes: int = SAMPLE_BLOCK_BYTES) -> str:
+    """
+    Hash of the file size plus `blocks` blocks at evenly spaced offsets
+    (always including the first and the last block). Files smaller than
+    blocks * block_bytes are hashed whole.
+    """
+    size = os.path.getsize(path) if size is None else size
+    digest = hashlib.blake2b(struct.pack('<Q', size), digest_size=16)
+    with open(path, 'rb') as f:
+        if size <= blocks * block_bytes:
+            digest.update(f.read())
+        else:
+            step = (size - block_bytes) / (blocks - 1)
+            for i in range(blocks):
+                f.seek(int(i * step))
+                digest.update(f.read(block_bytes))
+    return digest.hexdigest()
+
+
+def full_hash(path: str, chunk_bytes: int = FULL_HASH_CHUNK_BYTES) -> str:
+    digest = hashlib.blake2b(digest_size=32)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_bytes)
+            if not chunk:
+                return digest.hexdigest()
+            digest.update(chunk)
+
+
+def _groups(paths, key, max_workers):
+    # Group paths by key(path); only groups with more than one path are kept
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        keys = list(ex.map(key, paths))
+    groups = defaultdict(list)
+    for path, k in zip(paths, keys):
+        if k is not None:
+            groups[k].append(path)
+    return [g for g in groups.values() if len(g) > 1]
+
+
+def find_duplicates(paths, catalog=None, max_workers: int = DEFAULT_HASH_WORKERS) -> dict:
+    """
+    Split demo paths into unique demos and byte-identical copies.
+
+    The copy that is kept is, in order of preference: one already processed
+    successfully according to the catalog, the oldest file, the shortest path.
+
+    Args:
+        paths (list): Demo files.
+        catalog (demo_catalog.DemoCatalog): Optional; supplies processing
+            statuses and caches full hashes between runs.
+        max_workers (int): Files hashed in parallel.
+
+    Returns:
+        dict: 'unique' (paths to process, in input order), 'duplicates'
+            (copy -> kept path) and 'hashed_mb' (MB read to decide).
+    """
+    # Compare absolute paths, hand back the caller's strings
+    given = {}
+    for p in paths:
+        given.setdefault(os.path.abspath(p), p)
+    paths = list(given)
+    stats = {}
+    for path in paths:
+        try:
+            stats[path] = os.stat(path)
+        except OSError:
+            pass
+    known = catalog.hash_info(paths) if catalog is not None else {}
+
+    def by_size(path):
+        return stats[path].st_size if path in stats and stats[path].st_size > 0 else None
+
+    def by_sample(path):
+        return sampled_hash(path, stats[path].st_size)
+
+    def cached_full_hash(path):
+        row = known.get(path)
+        if row and row['full_hash'] and (row['size'], row['mtime']) == (stats[path].st_size, stats[path].st_mtime):
+            return row['full_hash']
+        return None
+
+    new_full_hashes, hashed_bytes = {}, 0
+
+    def by_content(path):
+        return cached_full_hash(path) or new_full_hashes[path]
+
+    confirmed = []
+    for same_size in _groups(paths, by_size, max_workers):
+        hashed_bytes += sum(min(stats[p].st_size, SAMPLE_BLOCKS * SAMPLE_BLOCK_BYTES) for p in same_size)
+        for same_sample in _groups(same_size, by_sample, max_workers):
+            todo = [p for p in same_sample if cached_full_hash(p) is None]
+            with ThreadPoolExecutor(max_workers=max_workers) as ex:
+                new_full_hashes.update(zip(todo, ex.map(full_hash, todo)))
+            hashed_bytes += sum(stats[p].st_size for p in todo)
+            confirmed.extend(_groups(same_sample, by_content, max_workers))
+
+    def preference(path):
+        processed = (known.get(path) or {}).get('status') == 'ok'
+        return (not processed, stats[path].st_mtime, len(path), path)
+
+    duplicates = {}
+    for group in confirmed:
+        keep, *copies = sorted(group, key=preference)
+        duplicates.update((copy, keep) for copy in copies)
+
+    if catalog is not None and new_full_hashes:
+        catalog.store_full_hashes({p: (h, stats[p].st_size, stats[p].st_mtime) for p, h in new_full_hashes.items()})
+
+    return {
+        'unique': [given[p] for p in paths if p not in duplicates],
+        'duplicates': {given[copy]: given[keep] for copy, keep in duplicates.items()},
+        'hashed_mb': round(hashed_bytes / 2**20, 1),
+    }
@@ -0,0 +1,380 @@
+"""
+SQLite catalog of the demos on disk.
+
+One row per .dem file with its size, a content hash, the header fields
+(map, server, protocol, build) and the duration from the file info, plus
+the processing status the batch builder records. Filling it only reads the
+header and file info messages, so a rescan of thousands of demos takes
+seconds and unchanged files are skipped.
+
+    with DemoCatalog() as catalog:
+        catalog.scan()
+        nuke = catalog.select("map_name = ?", ('de_nuke',))
+        todo = catalog.select("status = 'new'")
+
+Usage:
+    python model/demo_catalog.py                # scan demos/ and print a summary
+    python model/demo_catalog.py --rescan --workers 16
+"""
+import os
+import time
+import struct
+import sqlite3
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from dedup import sampled_hash
+
+MODEL_FOLDER = os.path.dirname(os.path.abspath(__file__))
+DEMOS_FOLDER = os.path.join(MODEL_FOLDER, "..", "demos")
+DEFAULT_CATALOG_PATH = os.path.join(DEMOS_FOLDER, "catalog.sqlite")
+DEFAULT_SCAN_WORKERS = 8
+
+DEMO_MAGIC = b'PBDEMS2\x00'
+# EDemoCommands
+DEM_FILE_HEADER = 1
+DEM_FILE_INFO = 2
+DEM_IS_COMPRESSED = 64
+
+# Bytes read from the start of the file for the magic and the header
+HEAD_BYTES = 64 * 1024
+# The file info message is small; anything bigger means a corrupt offset
+MAX_INFO_BYTES = 1 << 20
+
+# status: new (scanned, never processed), ok / failed (last batch build),
+# duplicate (copy of duplicate_of, skipped), unreadable (header could not be read).
+# content_hash is dedup.sampled_hash; full_hash is only filled for files
+# that share their size and sampled hash with another one
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS demos (
+    path TEXT PRIMARY KEY,
+    content_hash TEXT,
+    full_hash TEXT,
+    size INTEGER,
+    mtime REAL,
+    map_name TEXT,
+    server_name TEXT,
+    client_name TEXT,
+    network_protocol INTEGER,
+    demo_version_name TEXT,
+    build_num INTEGER,
+    playback_time REAL,
+    playback_ticks INTEGER,
+    status TEXT NOT NULL DEFAULT 'new',
+    reason TEXT,
+    rounds INTEGER,
+    duplicate_of TEXT,
+    error TEXT,
+    scanned_at REAL,
+    processed_at REAL
+);
+CREATE INDEX IF NOT EXISTS demos_map_name ON demos (map_name);
+CREATE INDEX IF NOT EXISTS demos_status ON demos (status);
+CREATE INDEX IF NOT EXISTS demos_content_hash ON demos (content_hash);
+"""
+
+HEADER_COLUMNS = ['map_name', 'server_name', 'client_name', 'network_protocol', 'demo_version_name', 'build_num']
+
+# CDemoFileHeader / CDemoFileInfo field numbers -> column
+_HEADER_FIELDS = {2: 'network_protocol', 3: 'server_name', 4: 'client_name', 5: 'map_name',
+                  11: 'demo_version_name', 13: 'build_num'}
+_INFO_FIELDS = {1: 'playback_time', 2: 'playback_ticks'}
+
+
+def _varint(buf: bytes, pos: int):
+    result = shift = 0
+    while True:
+        if pos >= len(buf):
+            raise ValueError("truncated varint")
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _protobuf_fields(buf: bytes, wanted: dict) -> dict:
+    # Just enough of the protobuf wire format for flat scalar and string fields
+    fields, pos = {}, 0
+    while pos < len(buf):
+        key, pos = _varint(buf, pos)
+        number, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = _varint(buf, pos)
+        elif wire_type == 1:
+            value, pos = struct.unpack_from('<d', buf, pos)[0], pos + 8
+        elif wire_type == 2:
+            size, pos = _varint(buf, pos)
+            value, pos = buf[pos:pos + size], pos + size
+        elif wire_type == 5:
+            value, pos = struct.unpack_from('<f', buf, pos)[0], pos + 4
+        else:
+            raise ValueError(f"unsupported wire type {wire_type}")
+        if number in wanted:
+            fields[wanted[number]] = value.decode('utf-8', 'replace') if isinstance(value, bytes) else value
+    return fields
+
+
+def _read_message(f, expected_command: int, max_bytes: int):
+    # One demo message: varint command, varint tick, varint size, payload
+    head = f.read(30)
+    command, pos = _varint(head, 0)
+    _, pos = _varint(head, pos)
+    size, pos = _varint(head, pos)
+    if command & ~DEM_IS_COMPRESSED != expected_command:
+        raise ValueError(f"expected demo command {expected_command}, got {command}")
+    if command & DEM_IS_COMPRESSED:
+        return None  # snappy; left to demoparser2
+    if size > max_bytes:
+        raise ValueError(f"message of {size} bytes")
+    payload = head[pos:pos + size] + f.read(max(size - (len(head) - pos), 0))
+    if len(payload) < size:
+        raise ValueError("message cut short by the end of the file")
+    return payload
+
+
+def read_demo_header(demo_path: str) -> dict:
+    """
+    Read a demo's header and file info without parsing the tick stream.
+
+    Args:
+        demo_path (str): Path to the .dem file.
+
+    Returns:
+        dict: size, content_hash, the HEADER_COLUMNS fields and
+            playback_time / playback_ticks (None when unavailable).
+
+    Raises:
+        OSError: The file cannot be read.
+        ValueError: The file is not a CS2 demo or its header is corrupt.
+    """
+    size = os.path.getsize(demo_path)
+    record = {'size': size, 'playback_time': None, 'playback_ticks': None}
+    record['content_hash'] = sampled_hash(demo_path, size)
+    with open(demo_path, 'rb') as f:
+        head = f.read(HEAD_BYTES)
+        if head[:8] != DEMO_MAGIC:
+            raise ValueError("not a CS2 demo (bad magic)")
+        info_offset = struct.unpack_from('<i', head, 8)[0]
+
+        f.seek(16)
+        header = _read_message(f, DEM_FILE_HEADER, MAX_INFO_BYTES)
+        if header is None:
+            header = _parse_header_fallback(demo_path)
+        else:
+            header = _protobuf_fields(header, _HEADER_FIELDS)
+        record.update({col: header.get(col) for col in HEADER_COLUMNS})
+
+        # Demos cut before the end have no file info (offset 0 or past EOF)
+        if 16 < info_offset < size:
+            f.seek(info_offset)
+            try:
+                info = _read_message(f, DEM_FILE_INFO, MAX_INFO_BYTES)
+            except ValueError:
+                info = None
+            if info is not None:
+                record.update(_protobuf_fields(info, _INFO_FIELDS))
+    if record['playback_time'] is not None:
+        record['playback_time'] = round(float(record['playback_time']), 3)
+    for col in ('network_protocol', 'build_num'):
+        if record.get(col) is not None:
+            record[col] = int(record[col])
+    return record
+
+
+def _parse_header_fallback(demo_path: str) -> dict:
+    # Compressed header: let demoparser2 decode it (it only reads the first messages)
+    from demoparser2 import DemoParser
+    return DemoParser(demo_path=demo_path).parse_header()
+
+
+def _scan_one(path: str) -> dict:
+    stat = os.stat(path)
+    record = {'path': path, 'mtime': stat.st_mtime, 'size': stat.st_size, 'error': None}
+    try:
+        record.update(read_demo_header(path))
+        record['status'] = 'new'
+    except Exception as e:
+        record.update(status='unreadable', error=f"{type(e).__name__}: {str(e)[:200]}")
+    return record
+
+
+class DemoCatalog():
+    """
+    SQLite index of demos, their headers and their processing status.
+
+    Args:
+        path (str): Database file; created with its schema when missing.
+    """
+
+    def __init__(self, path: str = DEFAULT_CATALOG_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _migrate(self):
+        # Catalogs created before a column existed get it added
+        existing = {row['name'] for row in self.conn.execute("PRAGMA table_info(demos)")}
+        for column in ('full_hash TEXT', 'duplicate_of TEXT'):
+            if column.split()[0] not in existing:
+                self.conn.execute(f"ALTER TABLE demos ADD COLUMN {column}")
+
+    def scan(self, paths=None, max_workers: int = DEFAULT_SCAN_WORKERS, rescan: bool = False) -> dict:
+        """
+        Add new and changed demos; a scan of the whole demos/ folder also
+        drops the rows whose file is gone.
+
+        A file whose size and mtime match its row is skipped unless rescan is
+        set. A changed file is rescanned and goes back to status 'new'.
+
+        Args:
+            paths (list): .dem files to index; defaults to everything under demos/.
+            max_workers (int): Header reads in flight (IO-bound, so threads).
+            rescan (bool): Read every header again.
+
+        Returns:
+            dict: Counts of added, updated, unchanged, removed and unreadable demos.
+        """
+        full_scan = paths is None
+        if full_scan:
+            from worker_utils import get_demos_paths
+            paths = get_demos_paths()
+        paths = [os.path.abspath(p) for p in dict.fromkeys(paths)]
+        known = {row['path']: (row['size'], row['mtime'])
+                 for row in self.conn.execute("SELECT path, size, mtime FROM demos")}
+
+        todo, counts = [], {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0, 'unreadable': 0}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if not rescan and known.get(path) == (stat.st_size, stat.st_mtime):
+                counts['unchanged'] += 1
+            else:
+                todo.append(path)
+
+        now = time.time()
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            records = list(ex.map(_scan_one, todo))
+        with self.conn:
+            for record in records:
+                counts['updated' if record['path'] in known else 'added'] += 1
+                counts['unreadable'] += record['status'] == 'unreadable'
+                self._upsert(record, now)
+            # An explicit list of paths says nothing about the other rows
+            gone = [p for p in known if full_scan and not os.path.exists(p)]
+            self.conn.executemany("DELETE FROM demos WHERE path = ?", [(p,) for p in gone])
+            counts['removed'] = len(gone)
+        return counts
+
+    def _upsert(self, record: dict, now: float):
+        columns = ['path', 'content_hash', 'size', 'mtime', *HEADER_COLUMNS, 'playback_time', 'playback_ticks',
+                   'status', 'error']
+        values = [record.get(col) for col in columns]
+        # A changed file loses its processing outcome
+        self.conn.execute(
+            f"INSERT INTO demos ({', '.join(columns)}, reason, rounds, processed_at, scanned_at) "
+            f"VALUES ({', '.join('?' * len(columns))}, NULL, NULL, NULL, ?) "
+            f"ON CONFLICT(path) DO UPDATE SET "
+            + ", ".join(f"{col} = excluded.{col}" for col in columns[1:])
+            + ", full_hash = NULL, reason = NULL, rounds = NULL, duplicate_of = NULL, processed_at = NULL, "
+            "scanned_at = excluded.scanned_at",
+            values + [now])
+
+    def record_reports(self, reports):
+        """
+        Store the outcome of processed demos (worker_utils._worker_report
+        reports, or batch_builder duplicate reports). Demos not in the
+        catalog yet are added without header data.
+        """
+        now = time.time()
+        with self.conn:
+            for r in reports:
+                path = os.path.abspath(r['demo_path'])
+                status = r['status'] if r['status'] in ('ok', 'duplicate') else 'failed'
+                self.conn.execute(
+                    "INSERT INTO demos (path, size, map_name, status, reason, rounds, duplicate_of, error, processed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(path) DO UPDATE SET status = excluded.status, reason = excluded.reason, "
+                    "rounds = excluded.rounds, duplicate_of = excluded.duplicate_of, error = excluded.error, "
+                    "processed_at = excluded.processed_at, map_name = COALESCE(demos.map_name, excluded.map_name)",
+                    (path, r.get('demo_bytes'), r.get('map_name'), status, r.get('reason'), r.get('rounds'),
+                     os.path.abspath(r['duplicate_of']) if r.get('duplicate_of') else None, r.get('error'), now))
+
+    def hash_info(self, paths) -> dict:
+        """path -> size, mtime, full_hash and status, for the paths in the catalog."""
+        wanted = set(paths)
+        rows = self.conn.execute("SELECT path, size, mtime, full_hash, status FROM demos")
+        return {row['path']: dict(row) for row in rows if row['path'] in wanted}
+
+    def store_full_hashes(self, hashes: dict):
+        """Cache full hashes ({path: (full_hash, size, mtime)}) for rows still describing that file."""
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE demos SET full_hash = ? WHERE path = ? AND size = ? AND mtime = ?",
+                [(h, path, size, mtime) for path, (h, size, mtime) in hashes.items()])
+
+    def select(self, where: str = "status != 'unreadable'", params=(), order_by: str = 'size DESC') -> list:
+        """
+        Demo paths matching a SQL condition, e.g.
+        select("map_name = ? AND status = 'new'", ('de_nuke',)).
+        """
+        sql = f"SELECT path FROM demos WHERE {where} ORDER BY {order_by}"
+        return [row['path'] for row in self.conn.execute(sql, params)]
+
+    def query(self, sql: str, params=()):
+        """Run any SQL against the catalog; returns a DataFrame."""
+        import pandas as pd
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def summary(self) -> dict:
+        rows = self.conn.execute(
+            "SELECT COALESCE(map_name, '?') AS map_name, status, COUNT(*) AS n, SUM(size) AS bytes "
+            "FROM demos GROUP BY 1, 2 ORDER BY 1, 2").fetchall()
+        maps = {}
+        for row in rows:
+            entry = maps.setdefault(row['map_name'], {'demos': 0, 'gb': 0.0})
+            entry['demos'] += row['n']
+            entry['gb'] = round(entry['gb'] + (row['bytes'] or 0) / 2**30, 3)
+            entry[row['status']] = row['n']
+        return maps
+
+
+def format_scan(counts: dict, summary: dict) -> str:
+    lines = [f"🗂️  Catalog: {counts['added']} added, {counts['updated']} updated, {counts['unchanged']} unchanged, "
+             f"{counts['removed']} removed, {counts['unreadable']} unreadable"]
+    for map_name, entry in summary.items():
+        statuses = ", ".join(f"{k}={v}" for k, v in entry.items() if k not in ('demos', 'gb'))
+        lines.append(f"   {map_name:16s} {entry['demos']:5d} demos {entry['gb']:8.2f} GB  ({statuses})")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--catalog', default=DEFAULT_CATALOG_PATH)
+    parser.add_argument('--workers', type=int, default=DEFAULT_SCAN_WORKERS)
+    parser.add_argument('--rescan', action='store_true', help='Read every header again')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with DemoCatalog(args.catalog) as catalog:
+        counts = catalog.scan(max_workers=args.workers, rescan=args.rescan)
+        print(format_scan(counts, catalog.summary()))
+    print(f"⏱️  {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
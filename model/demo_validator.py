@@ -0,0 +1,190 @@
+"""
+Cheap structural checks on .dem files, run before a parser ever sees them.
+
+A CS2 demo starts with the PBDEMS2 magic, the offsets of the file info and
+spawn group sections, and a CDemoFileHeader message. The file info message
+is written last, when the recording stops, so a truncated download or a
+broken extraction shows up as an offset past the end of the file or as a
+missing or unreadable message there. Each check only reads a few KB.
+
+Bad files are moved to demos_quarantine/ (next to demos/, so the demos
+glob does not pick them up again) with a JSON note of the reason.
+
+Usage:
+    python model/demo_validator.py              # validate demos/ and quarantine bad files
+    python model/demo_validator.py --dry-run
+"""
+import os
+import json
+import time
+import struct
+import shutil
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from demo_catalog import (DEM_FILE_HEADER, DEM_FILE_INFO, DEMO_MAGIC, DEMOS_FOLDER, MAX_INFO_BYTES,
+                          _protobuf_fields, _read_message)
+
+QUARANTINE_FOLDER = os.path.join(DEMOS_FOLDER, "..", "demos_quarantine")
+DEFAULT_VALIDATE_WORKERS = 8
+# Magic + file info offset + spawn groups offset
+PREAMBLE_BYTES = 16
+
+# What a download can legitimately be, by leading bytes
+PAYLOAD_SIGNATURES = {
+    b'Rar!\x1a\x07': 'rar',
+    b'PK\x03\x04': 'zip',
+    b'7z\xbc\xaf\x27\x1c': '7z',
+    b'\x1f\x8b': 'gzip',
+    b'BZh': 'bz2',
+    DEMO_MAGIC: 'dem',
+}
+
+# reason -> what it means, for the quarantine notes and the reports
+REASONS = {
+    'empty': 'zero-byte file',
+    'truncated_preamble': 'shorter than the 16-byte preamble',
+    'archive_not_extracted': 'an archive saved with a .dem name',
+    'html_page': 'an HTML page (error or login page saved as the download)',
+    'bad_magic': 'does not start with PBDEMS2',
+    'bad_header': 'CDemoFileHeader missing or unreadable',
+    'no_file_info': 'file info offset is 0: the recording was never finalized',
+    'truncated': 'a section offset points past the end of the file',
+    'bad_file_info': 'no readable CDemoFileInfo at its offset',
+    'unreadable': 'the file could not be opened',
+    'extract_failed': 'archive that could not be extracted',
+    'not_an_archive': 'download that is neither an archive nor a demo',
+}
+
+
+def sniff_payload(data: bytes):
+    """Kind of a downloaded payload ('rar', 'zip', ..., 'dem') or None."""
+    for signature, kind in PAYLOAD_SIGNATURES.items():
+        if data.startswith(signature):
+            return kind
+    return None
+
+
+def _looks_like_html(head: bytes) -> bool:
+    return head.lstrip()[:15].lower().startswith((b'<!doctype', b'<html', b'<?xml', b'<head', b'<body'))
+
+
+def validate_demo(demo_path: str):
+    """
+    Check a demo's magic, header and file info without parsing it.
+
+    Returns:
+        str: A reason code from REASONS, or None when the file looks complete.
+    """
+    size = os.path.getsize(demo_path)
+    if size == 0:
+        return 'empty'
+    with open(demo_path, 'rb') as f:
+        preamble = f.read(PREAMBLE_BYTES)
+        if preamble[:8] != DEMO_MAGIC:
+            if sniff_payload(preamble) not in (None, 'dem'):
+                return 'archive_not_extracted'
+            if _looks_like_html(preamble + f.read(64)):
+                return 'html_page'
+            return 'bad_magic'
+        if len(preamble) < PREAMBLE_BYTES:
+            return 'truncated_preamble'
+        info_offset, spawn_groups_offset = struct.unpack_from('<ii', preamble, 8)
+
+        try:
+            header = _read_message(f, DEM_FILE_HEADER, MAX_INFO_BYTES)
+            # None is a compressed header, which only the parser can check
+            if header is not None and not _protobuf_fields(header, {5: 'map_name'}).get('map_name'):
+                return 'bad_header'
+        except (ValueError, struct.error):
+            return 'bad_header'
+
+        if info_offset == 0:
+            return 'no_file_info'
+        if not PREAMBLE_BYTES < info_offset < size or not 0 <= spawn_groups_offset < size:
+            return 'truncated'
+        f.seek(info_offset)
+        try:
+            _read_message(f, DEM_FILE_INFO, MAX_INFO_BYTES)
+        except (ValueError, struct.error):
+            return 'bad_file_info'
+    return None
+
+
+def quarantine(path: str, reason: str, folder: str = QUARANTINE_FOLDER) -> str:
+    """
+    Move a bad file into the quarantine folder next to a <name>.json note
+    (reason, original path, size, time). Returns the new path.
+    """
+    os.makedirs(folder, exist_ok=True)
+    name = os.path.basename(path)
+    target = os.path.join(folder, name)
+    stem, ext = os.path.splitext(name)
+    n = 1
+    while os.path.exists(target):
+        target = os.path.join(folder, f"{stem}_{n}{ext}")
+        n += 1
+    size = os.path.getsize(path)
+    shutil.move(path, target)
+    with open(target + '.json', 'w') as f:
+        json.dump({'reason': reason, 'detail': REASONS.get(reason), 'original_path': os.path.abspath(path),
+                   'size': size, 'quarantined_at': time.strftime('%Y-%m-%dT%H:%M:%S%z')}, f, indent=2)
+    return target
+
+
+def validate_demos(paths, quarantine_folder: str = None, max_workers: int = DEFAULT_VALIDATE_WORKERS):
+    """
+    Validate demos in parallel and optionally quarantine the bad ones.
+
+    Args:
+        paths (list): Demo files.
+        quarantine_folder (str): Move bad files here; None to leave them in place.
+        max_workers (int): Files checked in parallel.
+
+    Returns:
+        tuple: (good, bad) with the paths that passed, in input order, and
+            {path: reason} for the others.
+    """
+    def check(path):
+        try:
+            return validate_demo(path)
+        except OSError:
+            return 'unreadable' if os.path.exists(path) else None  # vanished files are the scheduler's problem
+
+    paths = list(dict.fromkeys(paths))
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        reasons = list(ex.map(check, paths))
+    good = [p for p, reason in zip(paths, reasons) if reason is None]
+    bad = {p: reason for p, reason in zip(paths, reasons) if reason is not None}
+    if quarantine_folder:
+        for path, reason in bad.items():
+            try:
+                quarantine(path, reason, quarantine_folder)
+            except OSError as e:
+                print(f"⚠️  Could not quarantine {path}: {e}")
+    return good, bad
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*', help='Demo files (default: everything under demos/)')
+    parser.add_argument('--quarantine-folder', default=QUARANTINE_FOLDER)
+    parser.add_argument('--dry-run', action='store_true', help='Report bad files without moving them')
+    parser.add_argument('--workers', type=int, default=DEFAULT_VALIDATE_WORKERS)
+    args = parser.parse_args()
+
+    if args.paths:
+        paths = args.paths
+    else:
+        from worker_utils import get_demos_paths
+        paths = get_demos_paths()
+    start = time.perf_counter()
+    good, bad = validate_demos(paths, None if args.dry_run else args.quarantine_folder, args.workers)
+    for path, reason in bad.items():
+        print(f"❌ {reason:22s} {path}")
+    action = "found" if args.dry_run else f"moved to {os.path.normpath(args.quarantine_folder)}"
+    print(f"✅ {len(good)} valid, {len(bad)} bad {action} ({time.perf_counter() - start:.2f} s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,345 @@
+"""
+Compare round winner models on cached feature matrices.
+
+The preprocessor (TeamIdEncoder + map one-hot) is fitted on the training
+split once and the transformed train/test matrices are stored in
+cache/features/, keyed by a hash of the data, the preprocessor config and the
+split. Re-running a comparison on the same data skips the encoding.
+
+Every (candidate, fold) fit runs in parallel with joblib, then each candidate
+is refitted on the whole training split and scored on the hold-out split.
+Single-row predict latency is measured afterwards, one candidate at a time,
+since the predictor serves one row per request.
+
+Usage:
+    python model/model_selection.py                                  # whole round_summaries dataset
+    python model/model_selection.py --maps de_nuke --candidates random_forest logistic --folds 3
+    python model/model_selection.py --output selection.json
+"""
+import os
+import sys
+import time
+import json
+import argparse
+import platform
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+from sklearn.dummy import DummyClassifier
+from sklearn.ensemble import ExtraTreesClassifier, HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, log_loss
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import FunctionTransformer, MaxAbsScaler, OneHotEncoder
+
+MODEL_FOLDER = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(MODEL_FOLDER))
+from backend.encoders import TeamIdEncoder
+
+FEATURE_CACHE_FOLDER = os.path.join(MODEL_FOLDER, "cache", "features")
+TARGET = 'round_winner'
+DROP_COLUMNS = ['round_winner', 'team_ct_name', 'team_t_name', 'round_reason']
+LATENCY_ROWS = 200
+
+
+def default_preprocessor() -> ColumnTransformer:
+    # Same features as the notebook's pipeline and the predictor's FeatureSchema
+    return ColumnTransformer(
+        transformers=[
+            ('player_id', TeamIdEncoder(), ['team_ct_players', 'team_t_players']),
+            ('map_', OneHotEncoder(handle_unknown='ignore'), ['map_name']),
+        ], remainder='passthrough'
+    )
+
+
+def _to_dense(X):
+    return X.toarray() if hasattr(X, 'toarray') else X
+
+
+def default_candidates(random_state: int = 0) -> dict:
+    """name -> unfitted estimator taking the (sparse) preprocessor output."""
+    return {
+        'most_frequent': DummyClassifier(strategy='most_frequent'),
+        'logistic': make_pipeline(MaxAbsScaler(), LogisticRegression(max_iter=2000)),
+        'random_forest': RandomForestClassifier(n_estimators=100, random_state=random_state),
+        'extra_trees': ExtraTreesClassifier(n_estimators=100, random_state=random_state),
+        'hist_gradient_boosting': make_pipeline(FunctionTransformer(_to_dense, accept_sparse=True),
+                                                HistGradientBoostingClassifier(random_state=random_state)),
+    }
+
+
+def split_features(df: pd.DataFrame):
+    """(X, y) from a round summaries frame, as in the training notebook."""
+    return df.drop(columns=[c for c in DROP_COLUMNS if c in df]), df[TARGET]
+
+
+def dataset_version(X: pd.DataFrame, y) -> str:
+    """Content hash of the rows, so a rebuilt dataset with the same rounds keeps its cache."""
+    return joblib.hash((X, pd.Series(y).to_numpy()))
+
+
+def encoder_config(preprocessor) -> str:
+    """Hash of the unfitted preprocessor (transformers, columns and parameters)."""
+    return joblib.hash(clone(preprocessor))
+
+
+class FeatureCache():
+    """
+    Transformed train/test matrices on disk.
+
+    Entries are joblib files named after the dataset version, the encoder
+    config, the split parameters and the scikit-learn version, each holding
+    X_train, X_test, y_train, y_test, the fitted preprocessor and the feature
+    names.
+    """
+
+    def __init__(self, folder: str = FEATURE_CACHE_FOLDER):
+        self.folder = folder
+
+    def key(self, version: str, config: str, test_size: float, random_state: int) -> str:
+        return joblib.hash((version, config, test_size, random_state, sklearn.__version__))
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.folder, f"{key}.joblib")
+
+    def load(self, key: str):
+        try:
+            return joblib.load(self.path(key))
+        except (OSError, EOFError, ValueError):
+            return None
+
+    def store(self, key: str, entry: dict) -> str:
+        os.makedirs(self.folder, exist_ok=True)
+        path = self.path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        joblib.dump(entry, tmp)
+        os.replace(tmp, path)
+        return path
+
+    def clear(self) -> int:
+        removed = 0
+        if os.path.isdir(self.folder):
+            for name in os.listdir(self.folder):
+                if name.endswith('.joblib'):
+                    os.remove(os.path.join(self.folder, name))
+                    removed += 1
+        return removed
+
+
+def prepare_matrices(X: pd.DataFrame, y, preprocessor=None, cache: FeatureCache = None, test_size: float = 0.2,
+                     random_state: int = 32, version: str = None) -> dict:
+    """
+    Split, fit the preprocessor on the training rows and transform both splits,
+    or load the result from the cache.
+
+    Args:
+        X (pd.DataFrame): Feature columns (see split_features).
+        y: Round winners.
+        preprocessor: Unfitted transformer; default_preprocessor() when None.
+        cache (FeatureCache): Where to look up and store the matrices; None disables caching.
+        test_size (float): Hold-out fraction.
+        random_state (int): Split seed (the notebook uses 32).
+        version (str): Dataset version; the content hash of X and y when None.
+
+    Returns:
+        dict: X_train, X_test, y_train, y_test, preprocessor, feature_names,
+            plus 'cached' (bool) and 'seconds' spent.
+    """
+    start = time.perf_counter()
+    preprocessor = clone(preprocessor if preprocessor is not None else default_preprocessor())
+    key = None
+    if cache is not None:
+        key = cache.key(version or dataset_version(X, y), encoder_config(preprocessor), test_size, random_state)
+        entry = cache.load(key)
+        if entry is not None:
+            return {**entry, 'cached': True, 'seconds': time.perf_counter() - start}
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
+    entry = {
+        'X_train': preprocessor.fit_transform(X_train),
+        'X_test': preprocessor.transform(X_test),
+        'y_train': np.asarray(y_train),
+        'y_test': np.asarray(y_test),
+        'preprocessor': preprocessor,
+        'feature_names': preprocessor.get_feature_names_out(),
+    }
+    if cache is not None:
+        cache.store(key, entry)
+    return {**entry, 'cached': False, 'seconds': time.perf_counter() - start}
+
+
+def _single_threaded(estimator):
+    # The parallelism is across candidates and folds; nested n_jobs would oversubscribe the cores
+    params = {name: 1 for name in estimator.get_params() if name == 'n_jobs' or name.endswith('__n_jobs')}
+    return estimator.set_params(**params)
+
+
+def _rows(X, index):
+    return X[index] if hasattr(X, 'tocsr') else X[index, ...]
+
+
+def _scores(estimator, X, y) -> dict:
+    proba = estimator.predict_proba(X)
+    pred = estimator.classes_[np.argmax(proba, axis=1)]
+    return {'accuracy': accuracy_score(y, pred), 'log_loss': log_loss(y, proba, labels=estimator.classes_)}
+
+
+def _fit_and_score(name, estimator, X_train, y_train, X_eval, y_eval, fold):
+    estimator = _single_threaded(clone(estimator))
+    start = time.perf_counter()
+    estimator.fit(X_train, y_train)
+    fit_s = time.perf_counter() - start
+    return {'model': name, 'fold': fold, 'fit_s': fit_s, **_scores(estimator, X_eval, y_eval)}, estimator
+
+
+def predict_latency(estimator, X, n_rows: int = LATENCY_ROWS) -> dict:
+    """p50/p95 milliseconds of predict_proba on one row, over n_rows different rows."""
+    n_rows = min(n_rows, X.shape[0])
+    estimator.predict_proba(_rows(X, slice(0, 1)))  # warm-up
+    times = []
+    for i in range(n_rows):
+        row = _rows(X, slice(i, i + 1))
+        start = time.perf_counter()
+        estimator.predict_proba(row)
+        times.append(time.perf_counter() - start)
+    times = np.asarray(times) * 1000
+    return {'predict_ms_p50': float(np.percentile(times, 50)), 'predict_ms_p95': float(np.percentile(times, 95))}
+
+
+def select_models(X: pd.DataFrame, y, preprocessor=None, candidates: dict = None, cache: FeatureCache = None,
+                  folds: int = 5, n_jobs: int = -1, test_size: float = 0.2, random_state: int = 32,
+                  latency_rows: int = LATENCY_ROWS, verbose: int = 0):
+    """
+    Cross-validate candidates on the training split, then score them on the hold-out split.
+
+    Args:
+        X (pd.DataFrame): Feature columns (see split_features).
+        y: Round winners.
+        preprocessor: Unfitted transformer; default_preprocessor() when None.
+        candidates (dict): name -> unfitted estimator; default_candidates() when None.
+        cache (FeatureCache): Cache of the transformed matrices; None to always encode.
+        folds (int): Stratified CV folds on the training split (0 to skip CV).
+        n_jobs (int): joblib workers for the fits (-1: all cores).
+        test_size (float): Hold-out fraction.
+        random_state (int): Split and fold seed.
+        latency_rows (int): Single rows timed per candidate.
+        verbose (int): joblib verbosity.
+
+    Returns:
+        tuple: (results, fitted) with one row per candidate, best hold-out
+            log-loss first, and name -> estimator refitted on the whole
+            training split.
+    """
+    candidates = candidates or default_candidates()
+    data = prepare_matrices(X, y, preprocessor, cache, test_size, random_state)
+    X_train, X_test, y_train, y_test = data['X_train'], data['X_test'], data['y_train'], data['y_test']
+    print(f"🧮 Features {X_train.shape[0]:,} x {X_train.shape[1]:,} train, {X_test.shape[0]:,} test "
+          f"({'cache hit' if data['cached'] else 'encoded'} in {data['seconds']:.2f} s)")
+
+    tasks = []
+    if folds and folds > 1:
+        splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=random_state)
+        for fold, (fit_idx, val_idx) in enumerate(splitter.split(np.zeros(len(y_train)), y_train)):
+            for name, estimator in candidates.items():
+                tasks.append((name, estimator, _rows(X_train, fit_idx), y_train[fit_idx],
+                              _rows(X_train, val_idx), y_train[val_idx], fold))
+    for name, estimator in candidates.items():
+        tasks.append((name, estimator, X_train, y_train, X_test, y_test, 'holdout'))
+
+    start = time.perf_counter()
+    outputs = Parallel(n_jobs=n_jobs, verbose=verbose)(delayed(_fit_and_score)(*task) for task in tasks)
+    print(f"⚙️  {len(tasks)} fits in {time.perf_counter() - start:.1f} s")
+
+    scores = pd.DataFrame([score for score, _ in outputs])
+    fitted = {score['model']: estimator for score, estimator in outputs if score['fold'] == 'holdout'}
+
+    rows = []
+    for name in candidates:
+        cv = scores[(scores['model'] == name) & (scores['fold'] != 'holdout')]
+        holdout = scores[(scores['model'] == name) & (scores['fold'] == 'holdout')].iloc[0]
+        rows.append({
+            'model': name,
+            'cv_accuracy': cv['accuracy'].mean() if len(cv) else np.nan,
+            'cv_accuracy_std': cv['accuracy'].std() if len(cv) else np.nan,
+            'cv_log_loss': cv['log_loss'].mean() if len(cv) else np.nan,
+            'holdout_accuracy': holdout['accuracy'],
+            'holdout_log_loss': holdout['log_loss'],
+            'fit_s': holdout['fit_s'],
+            # Measured here, serially, so the parallel fits do not skew it
+            **predict_latency(fitted[name], X_test, latency_rows),
+        })
+    results = pd.DataFrame(rows).sort_values('holdout_log_loss').reset_index(drop=True)
+    return results, fitted
+
+
+def main():
+    from round_dataset import DATASET_FOLDER, load_rounds
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dataset', default=DATASET_FOLDER, help='Round summaries dataset (round_dataset)')
+    parser.add_argument('--maps', nargs='+', help='Only these maps')
+    parser.add_argument('--date-from')
+    parser.add_argument('--date-to')
+    parser.add_argument('--candidates', nargs='+', help='Candidate names (default: all)')
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--latency-rows', type=int, default=LATENCY_ROWS)
+    parser.add_argument('--cache-folder', default=FEATURE_CACHE_FOLDER)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--player-stats', help='Add the features of this player store (player_stats.py)')
+    parser.add_argument('--output', help='Write the results as JSON to this path')
+    args = parser.parse_args()
+
+    candidates = default_candidates()
+    if args.candidates:
+        unknown = sorted(set(args.candidates) - set(candidates))
+        if unknown:
+            parser.error(f"unknown candidates {unknown}; choose from {sorted(candidates)}")
+        candidates = {name: candidates[name] for name in args.candidates}
+
+    store, date_from = None, args.date_from
+    if args.player_stats:
+        from backend.player_store import load_player_store
+        from player_stats import add_player_features, training_date_from
+        store = load_player_store(args.player_stats)
+        if store is None:
+            sys.exit(f"❌ No player store in {args.player_stats}; build it with model/player_stats.py")
+        # The store's win rates include the rounds up to its date_to, so only later rounds are compared on
+        try:
+            date_from = training_date_from(store, args.date_from)
+        except ValueError as e:
+            sys.exit(f"❌ {e}")
+    df = load_rounds(args.dataset, maps=args.maps, date_from=date_from, date_to=args.date_to)
+    if df.empty:
+        sys.exit(f"❌ No rounds in {args.dataset}" + (f" from {date_from}" if date_from else '')
+                 + "; build it with clean_demos_safe(..., dataset_folder=...)")
+    if store is not None:
+        # Passed through by the preprocessor as numeric columns
+        df = add_player_features(df, store)
+    X, y = split_features(df)
+    cache = None if args.no_cache else FeatureCache(args.cache_folder)
+    results, _ = select_models(X, y, candidates=candidates, cache=cache, folds=args.folds, n_jobs=args.n_jobs,
+                               latency_rows=args.latency_rows)
+    with pd.option_context('display.width', 200, 'display.float_format', '{:.4f}'.format):
+        print(results.to_string(index=False))
+
+    if args.output:
+        report = {'meta': {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'python': platform.python_version(),
+                           'sklearn': sklearn.__version__, 'rows': int(len(df)), 'folds': args.folds,
+                           'maps': args.maps, 'date_from': str(date_from) if date_from else None,
+                           'date_to': args.date_to,
+                           'player_stats': args.player_stats},
+                  'results': results.to_dict(orient='records')}
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
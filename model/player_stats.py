@@ -0,0 +1,170 @@
+"""
+Offline job: per-player stats from the round summaries dataset, written to
+the player feature store (backend/player_store.py) the predictor loads.
+
+For every player: rounds played, rounds played and won on each side, rounds
+played and won on each map, and the average buy (their team's equipment
+value split over the team). The rounds are exploded into one row per
+player and aggregated with np.unique + bincount, so a whole dataset is one
+pass over flat arrays.
+
+The win rates are built from round outcomes, so a model trained with these
+features may only see rounds after the store's --date-to, otherwise the
+features leak the target: retrain.py and model_selection.py refuse a store
+built without --date-to and train on the rounds after it (training_date_from).
+
+Usage:
+    python model/player_stats.py                          # whole dataset -> player_stats/, for serving
+    python model/player_stats.py --date-to 2025-06-01 --output model/player_stats_train   # for training on later rounds
+    python model/player_stats.py --show 76561198000000000
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+MODEL_FOLDER = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(MODEL_FOLDER))
+from backend.player_store import (DEFAULT_PRIOR_ROUNDS, PLAYER_STAT_FEATURES, PLAYER_STORE_DIR, PlayerStore,
+                                  load_player_store, stats_dtype, write_player_store)
+from round_dataset import DATASET_FOLDER, load_rounds
+
+CT_WIN, T_WIN = 3, 2
+STATS_COLUMNS = ['round_winner', 'team_ct_players', 'team_t_players', 'team_ct_current_equip_value',
+                 'team_t_current_equip_value', 'map_name']
+
+
+def _explode_side(df: pd.DataFrame, side: str):
+    # (steamid, round position, per-player buy) for one side's players
+    teams = df[f'team_{side}_players'].tolist()
+    lengths = np.fromiter((len(team) for team in teams), dtype=np.int64, count=len(teams))
+    steamids = np.fromiter((p for team in teams for p in team), dtype=np.uint64, count=int(lengths.sum()))
+    positions = np.repeat(np.arange(len(teams)), lengths)
+    buy = df[f'team_{side}_current_equip_value'].to_numpy(dtype=np.float64) / np.maximum(lengths, 1)
+    return steamids, positions, buy[positions]
+
+
+def aggregate_players(df: pd.DataFrame):
+    """
+    Per-player stats of a round summaries frame.
+
+    Args:
+        df (pd.DataFrame): Rounds with the STATS_COLUMNS; rounds without a
+            winner are skipped.
+
+    Returns:
+        tuple: (stats struct array in stats_dtype, map names in column order).
+    """
+    df = df[df['round_winner'].isin([CT_WIN, T_WIN])]
+    maps = sorted(df['map_name'].astype(str).unique())
+    map_codes = pd.Categorical(df['map_name'].astype(str), categories=maps).codes.astype(np.int64)
+    ct_won = df['round_winner'].to_numpy() == CT_WIN
+
+    parts = []
+    for side in ('ct', 't'):
+        steamids, positions, buy = _explode_side(df, side)
+        won = ct_won[positions] if side == 'ct' else ~ct_won[positions]
+        parts.append((steamids, np.full(len(steamids), side == 'ct'), won, map_codes[positions], buy))
+    steamids, is_ct, won, map_idx, buy = (np.concatenate(columns) for columns in zip(*parts))
+
+    players, player = np.unique(steamids, return_inverse=True)
+    n, n_maps = len(players), len(maps)
+    stats = np.zeros(n, dtype=stats_dtype(n_maps))
+    stats['steamid'] = players
+    stats['rounds'] = np.bincount(player, minlength=n)
+    stats['ct_rounds'] = np.bincount(player, weights=is_ct, minlength=n)
+    stats['ct_wins'] = np.bincount(player, weights=is_ct & won, minlength=n)
+    stats['t_rounds'] = stats['rounds'] - stats['ct_rounds']
+    stats['t_wins'] = np.bincount(player, weights=~is_ct & won, minlength=n)
+    stats['avg_buy'] = np.bincount(player, weights=buy, minlength=n) / np.maximum(stats['rounds'], 1)
+    cell = player * n_maps + map_idx
+    stats['map_rounds'] = np.bincount(cell, minlength=n * n_maps).reshape(n, n_maps)
+    stats['map_wins'] = np.bincount(cell, weights=won, minlength=n * n_maps).reshape(n, n_maps)
+    return stats, maps
+
+
+def build_player_store(dataset_folder: str = DATASET_FOLDER, folder: str = PLAYER_STORE_DIR, date_from=None,
+                       date_to=None, prior_rounds: int = DEFAULT_PRIOR_ROUNDS) -> dict:
+    """
+    Aggregate the dataset (optionally a date range of it) and write the store.
+
+    Returns:
+        dict: players, rounds, maps and seconds, or None when there are no rounds.
+    """
+    start = time.perf_counter()
+    df = load_rounds(dataset_folder, date_from=date_from, date_to=date_to, columns=STATS_COLUMNS)
+    if df.empty:
+        return None
+    stats, maps = aggregate_players(df)
+    summary = {
+        'players': int(len(stats)),
+        'rounds': int(df['round_winner'].isin([CT_WIN, T_WIN]).sum()),
+        'maps': maps,
+        'date_from': str(date_from) if date_from else None,
+        'date_to': str(date_to) if date_to else None,
+        'built_at': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+    }
+    write_player_store(stats, maps, folder, metadata=summary, prior_rounds=prior_rounds)
+    summary['seconds'] = round(time.perf_counter() - start, 2)
+    return summary
+
+
+def training_date_from(store: PlayerStore, date_from=None) -> date:
+    """
+    First match date a model trained with the store's features may see: the
+    day after the store's date_to, or date_from when that is later.
+
+    Raises:
+        ValueError: The store was built without --date-to, so its win rates
+            include every round a model could train on.
+    """
+    date_to = store.meta.get('metadata', {}).get('date_to')
+    if not date_to:
+        raise ValueError("The player store was built without --date-to, so its win rates include the training "
+                         "rounds; rebuild it with model/player_stats.py --date-to <last day of history>")
+    start = date.fromisoformat(str(date_to)[:10]) + timedelta(days=1)
+    if date_from is not None:
+        start = max(start, date.fromisoformat(date_from) if isinstance(date_from, str) else date_from)
+    return start
+
+
+def add_player_features(df: pd.DataFrame, store: PlayerStore) -> pd.DataFrame:
+    """A copy of a round summaries frame with the PLAYER_STAT_FEATURES columns added, for training."""
+    features = store.features(df['map_name'].astype(str).tolist(), df['team_ct_players'].tolist(),
+                              df['team_t_players'].tolist())
+    return df.assign(**{name: features[name] for name in PLAYER_STAT_FEATURES})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dataset', default=DATASET_FOLDER, help='Round summaries dataset (round_dataset)')
+    parser.add_argument('--output', default=PLAYER_STORE_DIR, help='Player store folder')
+    parser.add_argument('--date-from')
+    parser.add_argument('--date-to')
+    parser.add_argument('--prior-rounds', type=int, default=DEFAULT_PRIOR_ROUNDS,
+                        help='Rounds of a 50%% win rate every player starts with')
+    parser.add_argument('--show', nargs='+', metavar='STEAMID', help='Print these players from the store and exit')
+    args = parser.parse_args()
+
+    if args.show:
+        store = load_player_store(args.output)
+        if store is None:
+            sys.exit(f"❌ No player store in {args.output}")
+        for steamid in args.show:
+            print(f"{steamid}: {store.player(steamid) or 'not in the store'}")
+        return
+
+    summary = build_player_store(args.dataset, args.output, args.date_from, args.date_to, args.prior_rounds)
+    if summary is None:
+        sys.exit(f"❌ No rounds in {args.dataset}; build it with clean_demos_safe(..., dataset_folder=...)")
+    print(f"👤 {summary['players']:,} players from {summary['rounds']:,} rounds on {len(summary['maps'])} maps "
+          f"in {summary['seconds']} s")
+    print(f"💾 Player store written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,279 @@
+"""
+Incremental retraining of the round winner forest as new demos are ingested.
+
+The training state (training_state/) keeps the fitted RandomForestClassifier,
+its feature schema and the ids of the demos it has seen (round_dataset demo
+ids). A run only reads the demos that are new since the last one:
+
+1. The schema is extended append-only with the new maps and players, so
+   every existing column keeps its index and the old trees stay valid.
+2. Drift: the current forest scores the new rounds. If their log-loss is
+   more than drift_threshold above the baseline of the last full fit (or the
+   forest would grow past max_trees), the forest is refitted on everything,
+   as it is when the new rounds lack a winner class (warm_start needs all of
+   them; see check_retrain.py).
+3. Otherwise trees are added with warm_start, fitted on the new rounds only.
+   The number of new trees follows the share of new rows, so every round
+   keeps about the same weight in the average.
+
+The result is exported as a new versioned bundle and published through the
+CURRENT pointer, which the predictor re-reads without a restart.
+
+With --player-stats the rounds get the player store features
+(player_stats.py), appended to the schema as numeric columns; the predictor
+adds the same features from the store it serves. The store's win rates come
+from round outcomes, so it must be built with --date-to and only the rounds
+after that date are trained on (new demos from before it are skipped).
+
+Usage:
+    python model/retrain.py                   # train on the demos added to datasets/round_summaries
+    python model/retrain.py --full            # refit on the whole dataset
+    python model/retrain.py --no-publish --drift-threshold 0.1
+    python model/player_stats.py --date-to 2025-06-01 --output model/player_stats_train
+    python model/retrain.py --full --player-stats model/player_stats_train
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import log_loss
+
+MODEL_FOLDER = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(MODEL_FOLDER))
+from backend.bundle import (BUNDLES_DIR, NUMERIC_FEATURES, FeatureSchema, current_bundle_path, export_bundle,
+                            load_bundle, new_version, publish_bundle)
+from backend.player_store import PLAYER_STAT_FEATURES, load_player_store
+from player_stats import add_player_features, training_date_from
+from round_dataset import DATASET_FOLDER, list_demos, load_rounds
+
+STATE_FOLDER = os.path.join(MODEL_FOLDER, "training_state")
+STATE_FILE = "state.json"
+TARGET = 'round_winner'
+
+DEFAULT_DRIFT_THRESHOLD = 0.05
+DEFAULT_MAX_TREES = 500
+MIN_NEW_TREES = 5
+# Same forest as the notebook's
+FOREST_PARAMS = {'n_estimators': 100, 'random_state': 32, 'n_jobs': -1}
+
+
+def load_state(folder: str = STATE_FOLDER):
+    """(state dict, fitted forest), or (None, None) before the first run."""
+    path = os.path.join(folder, STATE_FILE)
+    if not os.path.isfile(path):
+        return None, None
+    with open(path, 'r') as f:
+        state = json.load(f)
+    return state, joblib.load(os.path.join(folder, state['forest']))
+
+
+def save_state(folder: str, state: dict, forest) -> None:
+    # The forest file is named after the bundle version and state.json is
+    # replaced last, so an interrupted save leaves the previous state intact
+    os.makedirs(folder, exist_ok=True)
+    joblib.dump(forest, os.path.join(folder, state['forest']))
+    tmp = os.path.join(folder, f"{STATE_FILE}.tmp-{os.getpid()}")
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, os.path.join(folder, STATE_FILE))
+    for name in os.listdir(folder):
+        if name.startswith('forest-') and name != state['forest']:
+            os.remove(os.path.join(folder, name))
+
+
+def _initial_schema(bundles_dir: str) -> FeatureSchema:
+    # Start from the published layout so its column indices carry over
+    path = current_bundle_path(bundles_dir)
+    if path is not None:
+        return load_bundle(path).schema
+    return FeatureSchema(list(NUMERIC_FEATURES), [], [], NUMERIC_FEATURES)
+
+
+def _extend(schema: FeatureSchema, df) -> FeatureSchema:
+    players = set()
+    for column in ('team_ct_players', 'team_t_players'):
+        for ids in df[column]:
+            players.update(str(p) for p in ids)
+    # New columns in a stable order: maps by name, players by id
+    return schema.extend(sorted(df['map_name'].unique()), sorted(players, key=lambda p: (len(p), p)))
+
+
+def _bundle_proba(bundle, df, chunk_rows: int = 10_000) -> np.ndarray:
+    # Trees added with warm_start are wider than the older ones, which sklearn's
+    # predict refuses; the bundle evaluator only follows feature indices
+    return np.vstack([bundle.predict_proba(bundle.schema.encode_frame(df.iloc[i:i + chunk_rows]).toarray())
+                      for i in range(0, len(df), chunk_rows)])
+
+
+def _log_loss(proba, y, classes) -> float:
+    return float(log_loss(y, proba, labels=classes))
+
+
+def _fit_full(X, y, params: dict):
+    forest = RandomForestClassifier(**{**params, 'oob_score': True})
+    forest.fit(X, y)
+    oob = forest.oob_decision_function_
+    seen = ~np.isnan(oob).any(axis=1)
+    baseline = _log_loss(oob[seen], y[seen], forest.classes_)
+    # OOB only makes sense for the data the trees were bootstrapped from
+    forest.set_params(oob_score=False)
+    for attr in ('oob_score_', 'oob_decision_function_'):
+        if hasattr(forest, attr):
+            delattr(forest, attr)
+    return forest, baseline
+
+
+def retrain(dataset_folder: str = DATASET_FOLDER, state_folder: str = STATE_FOLDER, bundles_dir: str = BUNDLES_DIR,
+            drift_threshold: float = DEFAULT_DRIFT_THRESHOLD, max_trees: int = DEFAULT_MAX_TREES,
+            full: bool = False, publish: bool = True, forest_params: dict = None, player_stats: str = None):
+    """
+    Train on the demos the state has not seen and export a new bundle.
+
+    Args:
+        dataset_folder (str): Round summaries dataset (round_dataset).
+        state_folder (str): Training state folder.
+        bundles_dir (str): Where bundles are written and published.
+        drift_threshold (float): Log-loss increase on the new rounds, over the
+            last full fit's out-of-bag log-loss, that triggers a full refit.
+        max_trees (int): Refit from scratch instead of growing past this.
+        full (bool): Refit on the whole dataset regardless of drift.
+        publish (bool): Point CURRENT at the new bundle.
+        forest_params (dict): RandomForestClassifier parameters for full fits.
+        player_stats (str): Player store folder whose features are added to the rounds.
+
+    Returns:
+        dict: What was done ('mode', rows, trees, drift, bundle path), or
+            None when there was nothing new.
+    """
+    start = time.perf_counter()
+    params = {**FOREST_PARAMS, **(forest_params or {})}
+    state, forest = load_state(state_folder)
+    demos = list_demos(dataset_folder)
+    trained = set(state['trained_demo_ids']) if state else set()
+    new_ids = [d for d in demos['demo_id'] if d not in trained]
+    if not new_ids and not full:
+        print("✅ No new demos since the last training")
+        return None
+
+    store, date_from = None, None
+    if player_stats:
+        store = load_player_store(player_stats)
+        if store is None:
+            raise FileNotFoundError(f"No player store in {player_stats} (see model/player_stats.py)")
+        # Rounds up to the store's date_to are in its win rates
+        date_from = training_date_from(store)
+
+    schema = FeatureSchema.from_dict(state['schema']) if state else _initial_schema(bundles_dir)
+    if store is None and schema.player_stat_features:
+        raise ValueError("The training state uses the player store features; pass the store with --player-stats")
+    new_df = load_rounds(dataset_folder, demo_ids=new_ids, date_from=date_from)
+    if new_df.empty and not full:
+        print(f"✅ No new rounds after the player store's date_to ({date_from})")
+        return None
+    if store is not None:
+        new_df = add_player_features(new_df, store)
+        schema = schema.extend(numeric=PLAYER_STAT_FEATURES)
+    schema = _extend(schema, new_df)
+    summary = {'new_demos': len(new_ids), 'new_rows': int(len(new_df)), 'drift': None}
+
+    reason = 'requested' if full else None
+    if reason is None and state is None:
+        reason = 'first run'
+    previous = os.path.join(bundles_dir, state['version']) if state else None
+    if reason is None and not os.path.isdir(previous):
+        reason = 'previous bundle missing'
+    if reason is None and store is not None and state.get('player_store') != store.identity:
+        reason = 'player store changed'
+    if reason is None:
+        X_new = schema.encode_frame(new_df)
+        y_new = new_df[TARGET].to_numpy()
+        # warm_start refits classes_ from the new rounds, so they must have every class the forest has
+        new_classes = set(np.unique(y_new))
+        if not new_classes <= set(forest.classes_):
+            reason = 'new class'
+        elif new_classes != set(forest.classes_):
+            reason = 'missing class'
+        else:
+            # Scored by the bundle of the last run, which is the current forest
+            proba = _bundle_proba(load_bundle(previous), new_df)
+            summary['drift'] = _log_loss(proba, y_new, forest.classes_) - state['baseline_log_loss']
+            n_new_trees = max(MIN_NEW_TREES, round(state['base_trees'] * len(new_df) / max(state['rows'], 1)))
+            if summary['drift'] > drift_threshold:
+                reason = f"drift {summary['drift']:+.3f}"
+            elif len(forest.estimators_) + n_new_trees > max_trees:
+                reason = 'max trees'
+
+    if reason is None:
+        forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + n_new_trees)
+        forest.fit(X_new, y_new)
+        forest.set_params(warm_start=False)
+        state = {**state, 'rows': state['rows'] + len(new_df)}
+        summary['mode'] = 'incremental'
+    else:
+        df = load_rounds(dataset_folder, date_from=date_from)
+        if df.empty:
+            raise ValueError(f"No rounds to train on in {dataset_folder}"
+                             + (f" after the player store's date_to ({date_from})" if date_from else ''))
+        if store is not None:
+            df = add_player_features(df, store)
+        schema = _extend(schema, df)
+        forest, baseline = _fit_full(schema.encode_frame(df), df[TARGET].to_numpy(), params)
+        state = {'rows': int(len(df)), 'base_trees': len(forest.estimators_), 'baseline_log_loss': baseline,
+                 'history': (state or {}).get('history', [])}
+        summary['mode'] = f"full ({reason})"
+    summary.update({'trees': len(forest.estimators_), 'features': schema.n_features,
+                    'seconds': round(time.perf_counter() - start, 2)})
+
+    version = new_version('round_winner')
+    trained_demo_ids = sorted(set(demos['demo_id']))
+    # The demos the forest has seen, so backtest.py can score only held-out rounds, and the
+    # player store its features came from, so backtest.py can add the same ones
+    player_store = store.identity if store is not None else None
+    bundle_dir = export_bundle(forest, out_dir=os.path.join(bundles_dir, version), schema=schema, version=version,
+                               metadata={'training': summary, 'rows': state['rows'],
+                                         'training_demo_ids': trained_demo_ids, 'player_store': player_store})
+    summary['bundle'] = bundle_dir
+    if publish:
+        publish_bundle(bundle_dir, bundles_dir)
+
+    state.update({
+        'version': version,
+        'forest': f"forest-{version}.joblib",
+        'schema': schema.to_dict(),
+        'trained_demo_ids': trained_demo_ids,
+        'player_store': player_store,
+        'history': state['history'] + [{'version': version, 'at': time.strftime('%Y-%m-%dT%H:%M:%S%z'), **summary}],
+    })
+    save_state(state_folder, state, forest)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dataset', default=DATASET_FOLDER)
+    parser.add_argument('--state-folder', default=STATE_FOLDER)
+    parser.add_argument('--bundles-dir', default=BUNDLES_DIR)
+    parser.add_argument('--drift-threshold', type=float, default=DEFAULT_DRIFT_THRESHOLD)
+    parser.add_argument('--max-trees', type=int, default=DEFAULT_MAX_TREES)
+    parser.add_argument('--full', action='store_true', help='Refit on the whole dataset')
+    parser.add_argument('--no-publish', action='store_true', help='Export the bundle without publishing it')
+    parser.add_argument('--player-stats', help='Add the features of this player store (player_stats.py)')
+    args = parser.parse_args()
+
+    summary = retrain(args.dataset, args.state_folder, args.bundles_dir, args.drift_threshold, args.max_trees,
+                      full=args.full, publish=not args.no_publish, player_stats=args.player_stats)
+    if summary is None:
+        return
+    drift = '' if summary['drift'] is None else f", drift {summary['drift']:+.3f}"
+    print(f"🌲 {summary['mode']}: {summary['new_demos']} new demos ({summary['new_rows']:,} rounds{drift}) -> "
+          f"{summary['trees']} trees, {summary['features']} features in {summary['seconds']} s")
+    print(f"{'🚀 Published' if not args.no_publish else '💾 Exported'} {summary['bundle']}")
+
+
+if __name__ == '__main__':
+    main()
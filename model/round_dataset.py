@@ -0,0 +1,187 @@
+"""
+Round summaries as a Parquet dataset partitioned by map and match date.
+
+    datasets/round_summaries/map_name=de_nuke/match_date=2025-11-30/<demo_id>.parquet
+
+One file per demo, named after its content hash (dedup.sampled_hash), so
+rebuilding a demo replaces its file instead of adding its rounds twice.
+The match date is the demo file's modification date: the archives keep the
+time the demo was recorded.
+
+load_rounds pushes the map and date filters down to the partition paths and
+the round filter to the Parquet statistics, so a per-map experiment only
+opens that map's files:
+
+    final_df = load_rounds(maps=['de_nuke'], date_from='2025-06-01', max_round=12)
+"""
+import os
+import uuid
+import datetime as dt
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from dedup import sampled_hash
+
+MODEL_FOLDER = os.path.dirname(os.path.abspath(__file__))
+DATASET_FOLDER = os.path.join(MODEL_FOLDER, "datasets", "round_summaries")
+
+# Columns of worker_utils.build_round_summary (plus map_name), in order
+ROUND_COLUMNS = ['round_winner', 'round_reason', 'team_ct_name', 'team_t_name', 'team_ct_players', 'team_t_players',
+                 'team_ct_current_equip_value', 'team_t_current_equip_value', 'round', 'map_name']
+SOURCE_COLUMNS = ['demo_id', 'match_date']
+
+PARTITION_SCHEMA = pa.schema([('map_name', pa.string()), ('match_date', pa.date32())])
+FILE_SCHEMA = pa.schema([
+    ('round_winner', pa.int64()),
+    ('round_reason', pa.int64()),
+    ('team_ct_name', pa.string()),
+    ('team_t_name', pa.string()),
+    ('team_ct_players', pa.list_(pa.int64())),
+    ('team_t_players', pa.list_(pa.int64())),
+    ('team_ct_current_equip_value', pa.int64()),
+    ('team_t_current_equip_value', pa.int64()),
+    ('round', pa.int64()),
+    ('demo_id', pa.string()),
+])
+
+
+def match_date_of(demo_path: str) -> dt.date:
+    return dt.datetime.fromtimestamp(os.path.getmtime(demo_path), tz=dt.timezone.utc).date()
+
+
+def _partition_dir(root: str, map_name: str, match_date: dt.date) -> str:
+    return os.path.join(root, f"map_name={map_name}", f"match_date={match_date.isoformat()}")
+
+
+def write_demo_rounds(round_summary_df: pd.DataFrame, demo_path: str, root: str = DATASET_FOLDER,
+                      match_date: dt.date = None) -> str:
+    """
+    Write one demo's round summaries into its partition.
+
+    Args:
+        round_summary_df (pd.DataFrame): The worker output for the demo (with map_name).
+        demo_path (str): The .dem file, for the demo id and the match date.
+        root (str): Dataset folder.
+        match_date (datetime.date): Overrides the file's modification date.
+
+    Returns:
+        str: Path of the written file.
+    """
+    map_name = str(round_summary_df['map_name'].iloc[0])
+    match_date = match_date or match_date_of(demo_path)
+    demo_id = sampled_hash(demo_path)
+
+    frame = round_summary_df.drop(columns=['map_name']).assign(demo_id=demo_id)
+    table = pa.Table.from_pandas(frame[FILE_SCHEMA.names], schema=FILE_SCHEMA, preserve_index=False)
+
+    folder = _partition_dir(root, map_name, match_date)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{demo_id}.parquet")
+    # Write next to the target and rename, so readers never see half a file
+    tmp = os.path.join(folder, f".{demo_id}.{uuid.uuid4().hex}.tmp")
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+    return path
+
+
+def _dataset(root: str, files: list = None) -> ds.Dataset:
+    return ds.dataset(files if files is not None else root, format='parquet',
+                      schema=pa.unify_schemas([FILE_SCHEMA, PARTITION_SCHEMA]),
+                      partitioning=ds.partitioning(PARTITION_SCHEMA, flavor='hive'), partition_base_dir=root,
+                      exclude_invalid_files=False, ignore_prefixes=['.', '_'])
+
+
+def _date(value):
+    return dt.date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _filter_expression(maps=None, date_from=None, date_to=None, min_round=None, max_round=None):
+    conditions = []
+    if maps is not None:
+        conditions.append(ds.field('map_name').isin(list(maps)))
+    if date_from is not None:
+        conditions.append(ds.field('match_date') >= _date(date_from))
+    if date_to is not None:
+        conditions.append(ds.field('match_date') <= _date(date_to))
+    if min_round is not None:
+        conditions.append(ds.field('round') >= min_round)
+    if max_round is not None:
+        conditions.append(ds.field('round') <= max_round)
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _to_frame(table: pa.Table) -> pd.DataFrame:
+    df = table.to_pandas()
+    # Player lists as Python lists of ints, like the worker output
+    for column in ('team_ct_players', 'team_t_players'):
+        if column in df:
+            df[column] = table.column(column).to_pylist()
+    return df
+
+
+def load_rounds(root: str = DATASET_FOLDER, maps=None, date_from=None, date_to=None, min_round: int = None,
+                max_round: int = None, columns=None, with_source: bool = False, demo_ids=None) -> pd.DataFrame:
+    """
+    Load round summaries, reading only the partitions and row groups that match.
+
+    Args:
+        root (str): Dataset folder.
+        maps (list): Map names to keep.
+        date_from, date_to (str | datetime.date): Inclusive match date range.
+        min_round, max_round (int): Inclusive round range.
+        columns (list): Columns to read (default: the final_df columns).
+        with_source (bool): Also return demo_id and match_date.
+        demo_ids (list): Only these demos; their files are found from the
+            folder layout, so the other demos are never opened.
+
+    Returns:
+        pd.DataFrame: Same columns as the batch build's final_df.
+    """
+    columns = list(columns or ROUND_COLUMNS + (SOURCE_COLUMNS if with_source else []))
+    files = None
+    if demo_ids is not None:
+        demos = list_demos(root)
+        files = demos.loc[demos['demo_id'].isin(set(demo_ids)), 'path'].tolist()
+    if not os.path.isdir(root) or files == []:
+        return pd.DataFrame(columns=columns)
+
+    expression = _filter_expression(maps, date_from, date_to, min_round, max_round)
+    return _to_frame(_dataset(root, files).to_table(columns=columns, filter=expression))
+
+
+def read_files(files: list, root: str = DATASET_FOLDER, min_round: int = None, max_round: int = None,
+               columns=None, with_source: bool = False) -> pd.DataFrame:
+    """load_rounds over a list of the dataset's files (e.g. a slice of list_demos()['path'])."""
+    columns = list(columns or ROUND_COLUMNS + (SOURCE_COLUMNS if with_source else []))
+    if not files:
+        return pd.DataFrame(columns=columns)
+    expression = _filter_expression(min_round=min_round, max_round=max_round)
+    return _to_frame(_dataset(root, list(files)).to_table(columns=columns, filter=expression))
+
+
+def list_demos(root: str = DATASET_FOLDER) -> pd.DataFrame:
+    """Every demo file in the dataset (map_name, match_date, demo_id, path), from the folder layout alone."""
+    rows = []
+    if os.path.isdir(root):
+        for map_dir in sorted(os.listdir(root)):
+            if not map_dir.startswith('map_name='):
+                continue
+            for date_dir in sorted(os.listdir(os.path.join(root, map_dir))):
+                folder = os.path.join(root, map_dir, date_dir)
+                for name in sorted(os.listdir(folder)):
+                    if name.endswith('.parquet') and not name.startswith('.'):
+                        rows.append({'map_name': map_dir.split('=', 1)[1], 'match_date': date_dir.split('=', 1)[1],
+                                     'demo_id': name[:-len('.parquet')], 'path': os.path.join(folder, name)})
+    return pd.DataFrame(rows, columns=['map_name', 'match_date', 'demo_id', 'path'])
+
+
+def list_partitions(root: str = DATASET_FOLDER) -> pd.DataFrame:
+    """Demos per (map, match date) partition."""
+    demos = list_demos(root)
+    return demos.groupby(['map_name', 'match_date']).size().rename('demos').reset_index()
@@ -0,0 +1,203 @@
+import numpy as np
+import pandas as pd
+
+# Same wanted_props as worker_utils.parse_demo; demoparser2 appends steamid and name
+WANTED_PROPS = ['tick', 'X', 'Y', 'health', 'weapon_name', 'is_freeze_period', 'is_warmup_period', 'team_name',
+                'round_win_status', 'round_win_reason', 'bomb_planted', 'round_start_time', 'round_end_time',
+                'is_bomb_planted', 'game_time', 'total_rounds_played', 'current_equip_value']
+COLUMNS = WANTED_PROPS + ['steamid', 'name']
+
+# dtypes demoparser2 returns for these props
+DTYPES = {
+    'tick': 'int32', 'X': 'float32', 'Y': 'float32', 'health': 'int32', 'weapon_name': 'object',
+    'is_freeze_period': 'bool', 'is_warmup_period': 'bool', 'team_name': 'object',
+    'round_win_status': 'int32', 'round_win_reason': 'int32', 'bomb_planted': 'bool',
+    'round_start_time': 'float32', 'round_end_time': 'float32', 'is_bomb_planted': 'bool',
+    'game_time': 'float32', 'total_rounds_played': 'int32', 'current_equip_value': 'int32',
+    'steamid': 'uint64', 'name': 'object',
+}
+
+CT, T = 'CT', 'TERRORIST'
+CT_WIN, T_WIN = 3, 2
+# round_win_reason codes (see backend.constants.REASON_MAP) by winning side
+CT_REASONS = [7, 8, 12]
+T_REASONS = [1, 9]
+
+REGULATION_ROUNDS = 24
+HALF_ROUNDS = 12
+OVERTIME_ROUNDS = 6
+
+# Active weapon names as demoparser2 reports them
+PISTOLS = {CT: ['USP-S', 'P2000', 'Five-SeveN', 'P250'], T: ['Glock-18', 'Tec-9', 'P250', 'Desert Eagle']}
+RIFLES = {CT: ['M4A1-S', 'M4A4', 'AWP', 'FAMAS', 'AUG', 'MP9'], T: ['AK-47', 'AWP', 'Galil AR', 'SG 553', 'MAC-10']}
+UTILITY = ['Smoke Grenade', 'Flashbang', 'High Explosive Grenade', 'Molotov', 'Incendiary Grenade']
+KNIFE = {CT: 'knife', T: 'knife_t'}
+
+
+def _round_sides(round_index: int) -> int:
+    """
+    Which of the two teams is CT in a round (0 or 1): sides swap at the half
+    and every three rounds in overtime.
+    """
+    if round_index < REGULATION_ROUNDS:
+        return 0 if round_index < HALF_ROUNDS else 1
+    return 1 if ((round_index - REGULATION_ROUNDS) // 3) % 2 == 0 else 0
+
+
+def _is_pistol_round(round_index: int) -> bool:
+    return round_index in (0, HALF_ROUNDS)
+
+
+def generate_demo(rounds: int = REGULATION_ROUNDS, tick_rate: int = 64, overtimes: int = 0,
+                  tick_step: int = 1, warmup_seconds: float = 30.0, freeze_seconds: float = 15.0,
+                  round_seconds: tuple = (35.0, 115.0), post_round_seconds: float = 7.0,
+                  warmup_win_event: bool = True, missing_final_win: bool = False,
+                  map_name: str = 'de_mirage', seed: int = 0):
+    """
+    Generate a synthetic demo shaped like worker_utils.parse_demo output.
+
+    The tick stream has a warmup, then per round a freeze period, the live
+    phase and a post-round phase. The win event is only visible after
+    total_rounds_played increments, as in real demos.
+
+    Args:
+        rounds (int): Regulation rounds played (at most 24).
+        tick_rate (int): Server ticks per second.
+        overtimes (int): Overtime blocks of six rounds played after regulation.
+        tick_step (int): Keep every tick_step-th tick, as parse_ticks(ticks=...) would.
+        warmup_seconds (float): Length of the warmup; 0 to skip it.
+        freeze_seconds (float): Freeze time at the start of every round.
+        round_seconds (tuple): Range of the live phase length, in seconds.
+        post_round_seconds (float): Time between the win event and the next freeze.
+        warmup_win_event (bool): End the warmup with a spurious win status, which
+            process_round_results must ignore.
+        missing_final_win (bool): Cut the demo before the last round's win event.
+        map_name (str): Map reported in the header.
+        seed (int): Seed for the random generator.
+
+    Returns:
+        tuple: (ticks_df, header) like parse_demo.
+    """
+    if rounds > REGULATION_ROUNDS or (overtimes and rounds != REGULATION_ROUNDS):
+        raise ValueError("Overtime needs exactly 24 regulation rounds, and regulation has at most 24")
+    rng = np.random.default_rng(seed)
+    total_rounds = rounds + OVERTIME_ROUNDS * overtimes
+    tick_step = max(int(tick_step), 1)
+
+    steamids = (76561197960265728 + rng.choice(10 ** 9, size=10, replace=False)).astype(np.uint64)
+    names = [f'player_{i}' for i in range(10)]
+    # Team 0 is players 0-4, team 1 players 5-9
+    spawn = rng.uniform(-2500, 2500, size=(10, 2)).astype(np.float32)
+
+    parts = {col: [] for col in COLUMNS}
+    tick = 1
+
+    def segment(n_ticks, total_rounds_played, round_start_time, ct_team, freeze=False, warmup=False,
+                win_status=0, win_reason=0, round_end_time=0.0, equip=None, alive_until=None,
+                weapons=None, plant_tick=None):
+        nonlocal tick
+        ticks = np.arange(tick, tick + n_ticks, dtype=np.int32)
+        tick += n_ticks
+        ticks = ticks[ticks % tick_step == 0]
+        n = len(ticks)
+        if n == 0:
+            return
+        game_time = (ticks / tick_rate).astype(np.float32)
+        sides = np.where((np.arange(10) < 5) == (ct_team == 0), CT, T)
+
+        rows_tick = np.repeat(ticks, 10)
+        rows_player = np.tile(np.arange(10), n)
+        alive = np.ones(n * 10, dtype=bool)
+        if alive_until is not None:
+            alive = rows_tick <= alive_until[rows_player]
+
+        # Players drift away from their spawn while alive
+        drift = rng.normal(0, 4, size=(n * 10, 2)).astype(np.float32)
+        xy = spawn[rows_player] + np.cumsum(drift.reshape(n, 10, 2), axis=0).reshape(n * 10, 2)
+
+        parts['tick'].append(rows_tick)
+        parts['X'].append(xy[:, 0])
+        parts['Y'].append(xy[:, 1])
+        parts['health'].append(np.where(alive, 100, 0).astype(np.int32))
+        held = np.asarray(weapons if weapons is not None else [KNIFE[s] for s in sides], dtype=object)
+        parts['weapon_name'].append(np.where(alive, held[rows_player], None))
+        parts['is_freeze_period'].append(np.full(n * 10, freeze))
+        parts['is_warmup_period'].append(np.full(n * 10, warmup))
+        parts['team_name'].append(sides[rows_player])
+        parts['round_win_status'].append(np.full(n * 10, win_status, dtype=np.int32))
+        parts['round_win_reason'].append(np.full(n * 10, win_reason, dtype=np.int32))
+        planted = np.zeros(n * 10, dtype=bool) if plant_tick is None else rows_tick >= plant_tick
+        parts['bomb_planted'].append(planted)
+        parts['round_start_time'].append(np.full(n * 10, round_start_time, dtype=np.float32))
+        parts['round_end_time'].append(np.full(n * 10, round_end_time, dtype=np.float32))
+        parts['is_bomb_planted'].append(planted)
+        parts['game_time'].append(np.repeat(game_time, 10))
+        parts['total_rounds_played'].append(np.full(n * 10, total_rounds_played, dtype=np.int32))
+        equip = np.zeros(10, dtype=np.int32) if equip is None else equip
+        parts['current_equip_value'].append(np.where(alive, equip[rows_player], 0).astype(np.int32))
+        parts['steamid'].append(steamids[rows_player])
+        parts['name'].append(np.asarray(names, dtype=object)[rows_player])
+
+    if warmup_seconds > 0:
+        n_warmup = int(warmup_seconds * tick_rate)
+        segment(n_warmup, 0, 0.0, ct_team=0, warmup=True)
+        if warmup_win_event:
+            # Warmup rounds can end with a bogus winner that must not be counted
+            segment(int(2 * tick_rate), 0, 0.0, ct_team=0, warmup=True, win_status=CT_WIN, win_reason=8)
+
+    for r in range(total_rounds):
+        ct_team = _round_sides(r)
+        sides = np.where((np.arange(10) < 5) == (ct_team == 0), CT, T)
+        round_start_time = tick / tick_rate
+
+        # Freeze: pistol kit until the buy lands a few seconds in
+        n_freeze = int(freeze_seconds * tick_rate)
+        n_buy = n_freeze // 4
+        segment(n_buy, r, round_start_time, ct_team, freeze=True, equip=np.full(10, 200, dtype=np.int32),
+                weapons=[PISTOLS[s][0] for s in sides])
+        if _is_pistol_round(r):
+            # Pistol rounds: team totals stay under the 5500 the worker filter checks
+            equip = rng.integers(2, 9, size=10).astype(np.int32) * 100
+            weapons = [rng.choice(PISTOLS[s]) for s in sides]
+        else:
+            equip = rng.integers(10, 66, size=10).astype(np.int32) * 100
+            weapons = [rng.choice(RIFLES[s]) if e >= 2500 else rng.choice(PISTOLS[s] + UTILITY)
+                       for s, e in zip(sides, equip)]
+        segment(n_freeze - n_buy, r, round_start_time, ct_team, freeze=True, equip=equip, weapons=weapons)
+
+        # Live phase: the losing side dies, a few winners too
+        n_live = int(rng.uniform(*round_seconds) * tick_rate)
+        live_start = tick
+        round_end = live_start + n_live
+        winner_is_ct = bool(rng.random() < 0.5)
+        win_status = CT_WIN if winner_is_ct else T_WIN
+        win_reason = int(rng.choice(CT_REASONS if winner_is_ct else T_REASONS))
+        losers = (sides == T) if winner_is_ct else (sides == CT)
+        dies = (losers & (rng.random(10) < (0.9 if win_reason != 12 else 0.5))) | (~losers & (rng.random(10) < 0.3))
+        alive_until = np.where(dies, rng.integers(live_start, round_end, size=10), np.iinfo(np.int32).max)
+        plant_tick = live_start + int(0.6 * n_live) if win_reason in (1, 7) else None
+        segment(n_live, r, round_start_time, ct_team, equip=equip, alive_until=alive_until,
+                weapons=weapons, plant_tick=plant_tick)
+
+        if missing_final_win and r == total_rounds - 1:
+            break
+        # The win event shows up once total_rounds_played has moved on
+        segment(int(post_round_seconds * tick_rate), r + 1, round_start_time, ct_team,
+                win_status=win_status, win_reason=win_reason, round_end_time=round_end / tick_rate,
+                equip=equip, alive_until=alive_until, weapons=weapons, plant_tick=plant_tick)
+
+    ticks_df = pd.DataFrame({col: np.concatenate(parts[col]) for col in COLUMNS})
+    ticks_df = ticks_df.astype(DTYPES)
+    ticks_df.sort_values(['total_rounds_played', 'tick', 'team_name'], inplace=True)
+
+    header = {
+        'map_name': map_name,
+        'demo_path': f'synthetic://{map_name}/{seed}',
+        'map_png_path': None,
+        'server_name': 'Synthetic Server',
+        'client_name': 'SourceTV Demo',
+        'demo_file_stamp': 'PBDEMS2\x00',
+        'network_protocol': '14070',
+        'game_directory': '/home/steam/cs2/game/csgo',
+    }
+    return ticks_df, header
@@ -0,0 +1,213 @@
+import json
+import time
+from collections import Counter, deque
+
+try:
+    import psutil
+except ImportError:  # optional: without it there are no RSS/CPU/IO figures
+    psutil = None
+
+DEFAULT_INTERVAL = 10.0
+# Rates and the ETA use the demos finished in this many seconds
+ROLLING_WINDOW = 120.0
+
+# Thresholds used to label a snapshot as CPU-, IO- or memory-bound
+CPU_BOUND_PERCENT = 80.0
+IO_WAIT_PERCENT = 20.0
+LOW_MEMORY_FRACTION = 0.10
+
+
+def _format_seconds(seconds):
+    if seconds is None:
+        return '?'
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class BatchTelemetry():
+    """
+    Throughput and progress telemetry for a corpus build.
+
+    Fed by the batch builder with every submitted demo and every worker
+    report, it periodically takes a snapshot (demos/s, MB/s, rolling ETA,
+    per-worker RSS and CPU, system IO wait and free memory, accepted and
+    rejected demos by reason), appends it as a JSON line to path and keeps a
+    one-line summary for the progress bar.
+    """
+
+    def __init__(self, total_demos: int, total_bytes: int, path: str = None, interval: float = DEFAULT_INTERVAL):
+        self.total_demos = total_demos
+        self.total_bytes = total_bytes
+        self.path = path
+        self.interval = interval
+        self.start = time.time()
+        self.last_snapshot = 0.0
+        self.done = 0
+        self.done_bytes = 0
+        self.in_flight = {}
+        self.outcomes = Counter()
+        self.recent = deque()  # (finished at, demo bytes)
+        self.last = None
+        self._workers = {}
+        self._disk = psutil.disk_io_counters() if psutil is not None else None
+        self._disk_at = time.time()
+        self._file = open(path, 'a', buffering=1) if path else None
+        if psutil is not None:
+            psutil.cpu_times_percent(interval=None)
+
+    def submitted(self, demo_path: str, demo_bytes: int, estimate_mb: float = None):
+        self.in_flight[demo_path] = estimate_mb
+
+    def finished(self, report: dict):
+        self.in_flight.pop(report['demo_path'], None)
+        now = time.time()
+        size = report.get('demo_bytes') or 0
+        self.done += 1
+        self.done_bytes += size
+        self.outcomes['ok' if report['status'] == 'ok' else report.get('reason') or 'unknown'] += 1
+        self.recent.append((now, size))
+
+    def _worker_stats(self):
+        # RSS and CPU of every process the pool started
+        if psutil is None:
+            return {}
+        stats = {}
+        try:
+            children = psutil.Process().children(recursive=True)
+        except psutil.Error:
+            return {}
+        for child in children:
+            proc = self._workers.setdefault(child.pid, child)
+            try:
+                stats[str(child.pid)] = {
+                    'rss_mb': round(proc.memory_info().rss / 2**20, 1),
+                    # First call for a new worker returns 0.0; later calls cover the time since the last snapshot
+                    'cpu_percent': proc.cpu_percent(interval=None),
+                }
+            except psutil.Error:
+                continue
+        self._workers = {pid: p for pid, p in self._workers.items() if str(pid) in stats}
+        return stats
+
+    def _system_stats(self):
+        if psutil is None:
+            return {}
+        now = time.time()
+        memory = psutil.virtual_memory()
+        stats = {
+            'cpu_percent': psutil.cpu_percent(interval=None),
+            'iowait_percent': getattr(psutil.cpu_times_percent(interval=None), 'iowait', None),
+            'mem_available_mb': round(memory.available / 2**20, 1),
+            'mem_available_fraction': round(memory.available / memory.total, 4),
+            'disk_read_mb_s': None,
+        }
+        disk = psutil.disk_io_counters()
+        if disk is not None and self._disk is not None and now > self._disk_at:
+            stats['disk_read_mb_s'] = round((disk.read_bytes - self._disk.read_bytes) / 2**20 / (now - self._disk_at), 2)
+        self._disk, self._disk_at = disk, now
+        return stats
+
+    @staticmethod
+    def _bound(workers: dict, system: dict) -> str:
+        # Coarse label: what limits the run right now
+        if not system:
+            return 'unknown'
+        if system['mem_available_fraction'] < LOW_MEMORY_FRACTION:
+            return 'memory'
+        if system.get('iowait_percent') is not None and system['iowait_percent'] >= IO_WAIT_PERCENT:
+            return 'io'
+        cpu = [w['cpu_percent'] for w in workers.values() if w['cpu_percent'] > 0]
+        if not cpu:
+            # No busy worker to look at (start-up or the pool just drained)
+            return 'cpu' if system['cpu_percent'] >= CPU_BOUND_PERCENT else 'unknown'
+        # Busy workers below a full core are waiting on something other than the CPU
+        return 'cpu' if sum(cpu) / len(cpu) >= CPU_BOUND_PERCENT else 'io'
+
+    def snapshot(self, force: bool = False):
+        """Record a snapshot if interval seconds have passed (or force). Returns it, or None."""
+        now = time.time()
+        if not force and now - self.last_snapshot < self.interval:
+            return None
+        self.last_snapshot = now
+
+        while self.recent and now - self.recent[0][0] > ROLLING_WINDOW:
+            self.recent.popleft()
+        elapsed = max(now - self.start, 1e-9)
+        window = min(ROLLING_WINDOW, elapsed)
+        recent_demos = len(self.recent)
+        recent_bytes = sum(size for _, size in self.recent)
+
+        # Largest demos go first, so the ETA is driven by bytes left rather than demos left
+        bytes_left = max(self.total_bytes - self.done_bytes, 0)
+        rolling_mb_s = recent_bytes / 2**20 / window
+        if self.done >= self.total_demos:
+            eta = 0.0
+        elif rolling_mb_s > 0:
+            eta = bytes_left / 2**20 / rolling_mb_s
+        elif recent_demos:
+            eta = (self.total_demos - self.done) / (recent_demos / window)
+        else:
+            eta = None
+
+        workers = self._worker_stats()
+        system = self._system_stats()
+        record = {
+            'ts': round(now, 3),
+            'elapsed_s': round(elapsed, 1),
+            'done': self.done,
+            'total': self.total_demos,
+            'in_flight': len(self.in_flight),
+            'planned_mb': round(sum(mb or 0 for mb in self.in_flight.values()), 1),
+            'demos_per_s': round(self.done / elapsed, 4),
+            'mb_per_s': round(self.done_bytes / 2**20 / elapsed, 3),
+            'rolling_demos_per_s': round(recent_demos / window, 4),
+            'rolling_mb_per_s': round(rolling_mb_s, 3),
+            'eta_s': round(eta, 1) if eta is not None else None,
+            'accepted': self.outcomes.get('ok', 0),
+            'rejected': dict((k, v) for k, v in self.outcomes.most_common() if k != 'ok'),
+            'workers': workers,
+            'system': system,
+            'bound': self._bound(workers, system),
+        }
+        self.last = record
+        if self._file is not None:
+            self._file.write(json.dumps(record) + '\n')
+        return record
+
+    def summary_line(self, record: dict = None) -> str:
+        record = record or self.last
+        if record is None:
+            return ''
+        rss = [w['rss_mb'] for w in record['workers'].values()]
+        rss_text = f"RSS {len(rss)}x≤{max(rss) / 1024:.1f}GB" if rss else "RSS ?"
+        rejected = sum(record['rejected'].values())
+        top = ', '.join(f"{k}={v}" for k, v in list(record['rejected'].items())[:2])
+        return (f"{record['rolling_demos_per_s']:.2f} demos/s | {record['rolling_mb_per_s']:.1f} MB/s | "
+                f"ETA {_format_seconds(record['eta_s'])} | {rss_text} | ok {record['accepted']} "
+                f"rej {rejected}{f' ({top})' if top else ''} | {record['bound']}")
+
+    def close(self):
+        record = self.snapshot(force=True)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        return record
+
+
+def format_telemetry(record: dict) -> str:
+    """Compact end-of-run summary from the last snapshot."""
+    lines = [
+        f"🚚 {record['done']}/{record['total']} demos in {_format_seconds(record['elapsed_s'])}: "
+        f"{record['demos_per_s']:.2f} demos/s, {record['mb_per_s']:.1f} MB/s",
+        f"✅ {record['accepted']} accepted, ❌ {sum(record['rejected'].values())} rejected"
+        + (": " + ", ".join(f"{k}={v}" for k, v in record['rejected'].items()) if record['rejected'] else ""),
+    ]
+    system = record.get('system') or {}
+    if system:
+        lines.append(f"🖥️  CPU {system['cpu_percent']}%, IO wait {system.get('iowait_percent')}%, "
+                     f"{system['mem_available_mb'] / 1024:.1f} GB free -> {record['bound']}-bound")
+    return "\n".join(lines)
@@ -0,0 +1,116 @@
+"""
+Fit the in-round win probability model (backend.inround.InRoundModel).
+
+Every demo is reduced to its state-change ticks (players alive per side, bomb
+planted, time elapsed: the same ticks the scorer keeps) labelled with the
+round's winner, one demo at a time, so only the states are kept in memory.
+A logistic regression is fitted on them and saved as JSON for the scorer.
+Demos are split into train and test, so the reported log-loss and Brier
+score are on matches the model has not seen.
+
+Usage:
+    python model/train_inround.py                      # every demo under demos/
+    python model/train_inround.py --synthetic 40       # synthetic demos (no .dem files needed)
+    python model/train_inround.py --output /tmp/inround_model.json
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import brier_score_loss, log_loss
+from tqdm import tqdm
+
+MODEL_FOLDER = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(MODEL_FOLDER))
+from backend.inround import (CT_WIN, DEFAULT_TIME_STEP, FEATURES, INROUND_MODEL_PATH, ChangeFilter, InRoundModel,
+                             state_features, tick_states)
+from worker_utils import process_round_results
+
+
+def labelled_states(ticks_df: pd.DataFrame, time_step: float = DEFAULT_TIME_STEP) -> pd.DataFrame:
+    """State-change ticks of one demo with ct_win (1/0); rounds without a winner are dropped."""
+    winners = process_round_results(ticks_df).set_index('round_index')['round_winner']
+    states = ChangeFilter(time_step)(tick_states(ticks_df))
+    winner = states['round'].sub(1).map(winners)
+    states = states[winner.notna()].copy()
+    states['ct_win'] = (winner[winner.notna()] == CT_WIN).astype(np.int64)
+    return states
+
+
+def _demo_ticks(paths, synthetic: int, seed: int):
+    # (name, ticks_df) per demo, parsed one at a time
+    if synthetic:
+        from synthetic_ticks import generate_demo
+        for i in range(synthetic):
+            yield f"synthetic-{i}", generate_demo(tick_step=8, seed=seed + i)[0]
+        return
+    from worker_utils import parse_demo
+    for path in paths:
+        ticks_df, _ = parse_demo(path)
+        if ticks_df is not None:
+            yield os.path.basename(path), ticks_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*', help='Demo files (default: everything under demos/)')
+    parser.add_argument('--synthetic', type=int, default=0, help='Train on this many synthetic demos instead')
+    parser.add_argument('--time-step', type=float, default=DEFAULT_TIME_STEP)
+    parser.add_argument('--test-size', type=float, default=0.2, help='Fraction of demos held out')
+    parser.add_argument('--C', type=float, default=1.0, help='Inverse regularization strength')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=INROUND_MODEL_PATH)
+    args = parser.parse_args()
+
+    paths = args.paths
+    if not paths and not args.synthetic:
+        from worker_utils import get_demos_paths
+        paths = list(get_demos_paths())
+    start = time.perf_counter()
+    parts = []
+    total = args.synthetic or len(paths)
+    for name, ticks_df in tqdm(_demo_ticks(paths, args.synthetic, args.seed), total=total, desc="States"):
+        states = labelled_states(ticks_df, args.time_step)
+        parts.append(states.assign(demo=name))
+        del ticks_df
+    if not parts:
+        sys.exit("❌ No demos could be parsed")
+    data = pd.concat(parts, ignore_index=True)
+
+    # Hold out whole demos
+    demos = data['demo'].unique()
+    rng = np.random.default_rng(args.seed)
+    test_demos = set(rng.choice(demos, size=max(1, int(len(demos) * args.test_size)), replace=False)) \
+        if len(demos) > 1 else set()
+    test = data['demo'].isin(test_demos).to_numpy()
+
+    clf = LogisticRegression(C=args.C, max_iter=1000)
+    clf.fit(state_features(data[~test]), data.loc[~test, 'ct_win'])
+    ct_column = list(clf.classes_).index(1)
+    sign = 1.0 if ct_column == 1 else -1.0
+    model = InRoundModel(sign * clf.coef_[0], sign * clf.intercept_[0], FEATURES)
+
+    metrics = {}
+    if test.any():
+        p_ct = model.predict_ct(data[test])
+        y = data.loc[test, 'ct_win'].to_numpy()
+        metrics = {'test_log_loss': round(float(log_loss(y, p_ct, labels=[0, 1])), 4),
+                   'test_brier': round(float(brier_score_loss(y, p_ct)), 4)}
+    model.metadata = {'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'demos': int(len(demos)),
+                      'test_demos': len(test_demos), 'states': int(len(data)), 'time_step': args.time_step,
+                      'C': args.C, 'synthetic': bool(args.synthetic), **metrics}
+    model.save(args.output)
+
+    print(f"✅ {len(data):,} states from {len(demos)} demos in {time.perf_counter() - start:.1f} s")
+    if metrics:
+        print(f"   held-out log-loss {metrics['test_log_loss']:.4f}, Brier {metrics['test_brier']:.4f} "
+              f"({len(test_demos)} demos)")
+    print(f"💾 Model written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,53 @@
 import pandas as pd
-from demoparser2 import DemoParser
 import os
+import sys
+import time
+import logging
+import threading
+from functools import lru_cache
 from glob import glob
 
-# Define the path to the 'demos' folder
-DEMOS_FOLDER = os.path.join(os.path.dirname(''), "..", "demos")
+# Define the path to the 'demos' folder (relative to this file, not the working directory)
+MODEL_FOLDER = os.path.dirname(os.path.abspath(__file__))
+DEMOS_FOLDER = os.path.join(MODEL_FOLDER, "..", "demos")
 
-ASSETS_FOLDER = os.path.join(os.path.dirname(''), "..", "assets")
+ASSETS_FOLDER = os.path.join(MODEL_FOLDER, "..", "assets")
 MAPS_BACKGROUND_FOLDER = os.path.join(ASSETS_FOLDER, "maps_background")
 
-# Load all demos paths
-demos_paths = glob(os.path.join(DEMOS_FOLDER, "**", "*.dem"), recursive=True)
-
-# Load all map background images paths
-maps_background_paths = {f.split('.')[0]: os.path.join(MAPS_BACKGROUND_FOLDER, f) for f in os.listdir(MAPS_BACKGROUND_FOLDER) if f.endswith('.png')}
+# Nothing below touches the disk at import time: pool workers started with
+# spawn re-import this module, so the scans are done on first use and cached
+
+@lru_cache(maxsize=1)
+def get_demos_paths() -> tuple:
+    # All demos paths
+    return tuple(glob(os.path.join(DEMOS_FOLDER, "**", "*.dem"), recursive=True))
+
+@lru_cache(maxsize=1)
+def get_maps_background_paths() -> dict:
+    # All map background images paths
+    if not os.path.isdir(MAPS_BACKGROUND_FOLDER):
+        return {}
+    return {f.split('.')[0]: os.path.join(MAPS_BACKGROUND_FOLDER, f) for f in os.listdir(MAPS_BACKGROUND_FOLDER) if f.endswith('.png')}
+
+def __getattr__(name):
+    # Old module-level names, now computed on first access
+    if name == 'demos_paths':
+        return list(get_demos_paths())
+    if name == 'maps_background_paths':
+        return get_maps_background_paths()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _demo_parser(demo_path: str):
+    from demoparser2 import DemoParser
+    return DemoParser(demo_path=demo_path)
+
+@lru_cache(maxsize=1)
+def _psutil():
+    try:
+        import psutil
+    except ImportError:  # optional, only used for per-stage RSS
+        return None
+    return psutil
 
 def build_round_summary(ticks_df: pd.DataFrame, round_results: pd.DataFrame) -> pd.DataFrame:
     """
@@ -247,49 +281,242 @@ def process_round_results(ticks_df: pd.DataFrame) -> pd.DataFrame:
 
     return round_results
 
+# Props read from every demo
+TICK_PROPS = ['tick', 'X', 'Y', 'health', 'weapon_name', 'is_freeze_period', 'is_warmup_period','team_name', 'round_win_status', 'round_win_reason', 'bomb_planted', 'round_start_time',
+        'round_end_time', 'is_bomb_planted', 'game_time', 'total_rounds_played', 'current_equip_value']
+
+# Pistol rounds cannot exceed this team equip value; higher means the demo does not start at round 1
+MAX_PISTOL_EQUIP_VALUE = 5500
+
+STAGES = ['parse_header', 'parse_ticks', 'process_round_results', 'integrate_round_results', 'finalize_ticks_dataframe',
+          'filter_initial_round_ticks', 'set_categorical_data_types', 'build_round_summary', 'validate', 'write_trajectories']
+
+def _parse_header(parser, demo_path: str) -> dict:
+    header = parser.parse_header()
+    header['demo_path'] = demo_path
+    header['map_png_path'] = get_maps_background_paths().get(header['map_name'], None)
+    return header
+
+def _parse_ticks(parser) -> pd.DataFrame:
+    ticks_df = parser.parse_ticks(wanted_props=TICK_PROPS)
+    ticks_df.sort_values(['total_rounds_played', 'tick', 'team_name'], inplace=True)
+    return ticks_df
+
 # Parse a demo file
 def parse_demo(demo_path: str):
     try:
-        parser = DemoParser(demo_path=demo_path)
-        header = parser.parse_header()
-        header['demo_path'] = demo_path
-        header['map_png_path'] = maps_background_paths.get(header['map_name'], None)
-        ticks_df = parser.parse_ticks(wanted_props=['tick', 'X', 'Y', 'health', 'weapon_name', 'is_freeze_period', 'is_warmup_period','team_name', 'round_win_status', 'round_win_reason', 'bomb_planted', 'round_start_time',
-        'round_end_time', 'is_bomb_planted', 'game_time', 'total_rounds_played', 'current_equip_value'])
-        ticks_df.sort_values(['total_rounds_played', 'tick', 'team_name'], inplace=True)
+        parser = _demo_parser(demo_path)
+        header = _parse_header(parser, demo_path)
+        ticks_df = _parse_ticks(parser)
         return ticks_df, header
     except Exception as e:
         return None, None
 
-def _worker_standalone(demo_path):
-    def fail():
-        return pd.DataFrame(), [demo_path]
-    
+def _rss_mb():
+    # Current resident set size of this worker
+    psutil = _psutil()
+    if psutil is None:
+        return None
+    return round(psutil.Process().memory_info().rss / 2**20, 1)
+
+def _reset_hwm() -> bool:
+    # Linux: writing 5 to clear_refs resets the process' VmHWM to its current RSS
     try:
-        ticks_df, header = parse_demo(demo_path)
-        map_name = header.get('map_name')
-        if ticks_df is None:
-            return fail()
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def _hwm_mb():
+    with open('/proc/self/status', 'r') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return round(int(line.split()[1]) / 2**10, 1)
+    return None
+
+class _PeakRss():
+    """
+    Peak RSS of this worker since the last reset(), in MB.
 
+    ru_maxrss is not usable here: it is the high-water mark of the whole
+    process, and pool workers are reused for several demos. On Linux the
+    kernel's own mark is reset through /proc/self/clear_refs, which is exact;
+    elsewhere a thread samples the RSS with psutil every SAMPLE_SECONDS.
+    Without either, peak_mb() is None.
+    """
+    SAMPLE_SECONDS = 0.01
+
+    def __init__(self):
+        self._kernel = _reset_hwm()
+        self._peak = None
+        self._stop = None
+        if not self._kernel and _psutil() is not None:
+            self._peak = _rss_mb()
+            self._stop = threading.Event()
+            threading.Thread(target=self._sample, daemon=True).start()
+
+    def _sample(self):
+        while not self._stop.wait(self.SAMPLE_SECONDS):
+            rss = _rss_mb()
+            if rss > self._peak:
+                self._peak = rss
+
+    def reset(self):
+        if self._kernel:
+            _reset_hwm()
+        elif self._stop is not None:
+            self._peak = _rss_mb()
+
+    def peak_mb(self):
+        if self._kernel:
+            return _hwm_mb()
+        if self._stop is None:
+            return None
+        return max(self._peak, _rss_mb())
+
+    def close(self):
+        if self._stop is not None:
+            self._stop.set()
+
+class DemoRejected(Exception):
+    """A demo parsed fine but cannot be used; the message is the failure reason."""
+
+def _write_trajectories(ticks_df: pd.DataFrame, demo_path: str, folder: str, map_name: str):
+    # Same demo id as the round summaries dataset, so a round found there can be replayed
+    from dedup import sampled_hash
+    if os.path.dirname(MODEL_FOLDER) not in sys.path:
+        sys.path.append(os.path.dirname(MODEL_FOLDER))
+    from backend.trajectory import TrajectoryStore
+    TrajectoryStore(folder).write(ticks_df, sampled_hash(demo_path), {'map_name': map_name})
+
+def _worker_report(demo_path, trajectory_folder=None):
+    """
+    Process one demo and describe how it went.
+
+    Args:
+        demo_path (str): Path to the .dem file.
+        trajectory_folder (str): Also write the player trajectories of a
+            demo that passed validation there (see backend.trajectory), named
+            by the dataset demo id. A failed write is only recorded in
+            report['trajectory_error'].
+
+    Returns:
+        tuple: (round_summary_df, report). round_summary_df is empty on failure.
+            report holds the demo size and tick count, wall time and RSS per
+            stage, and on failure the stage, reason and exception class.
+            RSS figures are this demo's own: start_rss_mb when the task
+            began, peak_rss_mb the highest RSS while it ran (per stage too).
+    """
+    report = {
+        'demo_path': demo_path,
+        'demo_bytes': os.path.getsize(demo_path) if os.path.exists(demo_path) else None,
+        'map_name': None,
+        'ticks': None,
+        'rows': None,
+        'rounds': None,
+        'status': 'ok',
+        'reason': None,
+        'failed_stage': None,
+        'exception': None,
+        'error': None,
+        'trajectory_error': None,
+        'stages': {},
+        'pid': os.getpid(),
+        'start_rss_mb': None,
+        'peak_rss_mb': None,
+    }
+    start = time.perf_counter()
+    current = {'stage': None}
+    peak = _PeakRss()
+    report['start_rss_mb'] = peak.peak_mb()
+
+    def stage(name):
+        # Close the previous stage and open the next one
+        now = time.perf_counter()
+        if current['stage'] is not None:
+            stage_peak = peak.peak_mb()
+            report['stages'][current['stage']] = {
+                'seconds': round(now - current['start'], 6),
+                'rss_mb': _rss_mb(),
+                'peak_rss_mb': stage_peak,
+            }
+            if stage_peak is not None:
+                report['peak_rss_mb'] = max(report['peak_rss_mb'] or 0, stage_peak)
+        peak.reset()
+        current['stage'], current['start'] = name, time.perf_counter()
+
+    round_summary_df = pd.DataFrame()
+    try:
+        stage('parse_header')
+        parser = _demo_parser(demo_path)
+        header = _parse_header(parser, demo_path)
+        report['map_name'] = header.get('map_name')
+
+        stage('parse_ticks')
+        ticks_df = _parse_ticks(parser)
+        if ticks_df is None or ticks_df.empty:
+            raise DemoRejected('no_ticks')
+        report['rows'] = int(len(ticks_df))
+        report['ticks'] = int(ticks_df['tick'].nunique())
+
+        stage('process_round_results')
         round_results = process_round_results(ticks_df)
+        if round_results.empty:
+            raise DemoRejected('no_round_winners')
+        stage('integrate_round_results')
         ticks_df = integrate_round_results(ticks_df, round_results)
+        stage('finalize_ticks_dataframe')
         ticks_df = finalize_ticks_dataframe(ticks_df)
+        stage('filter_initial_round_ticks')
         ticks_df = filter_initial_round_ticks(ticks_df)
+        stage('set_categorical_data_types')
         ticks_df = set_categorical_data_types(ticks_df)
 
+        stage('build_round_summary')
         round_summary_df = build_round_summary(ticks_df, round_results)
+        if not trajectory_folder:
+            del ticks_df
+
+        stage('validate')
         if round_summary_df is None or round_summary_df.empty:
-            return fail()
-        round_summary_df['map_name'] = map_name
+            raise DemoRejected('no_rounds')
+        round_summary_df['map_name'] = report['map_name']
+        report['rounds'] = int(len(round_summary_df))
 
         first = round_summary_df.iloc[0][['team_ct_current_equip_value', 'team_t_current_equip_value']]
         if first.isna().any():
-            return fail()
+            raise DemoRejected('missing_equip_values')
+        if not (first['team_ct_current_equip_value'] <= MAX_PISTOL_EQUIP_VALUE and first['team_t_current_equip_value'] <= MAX_PISTOL_EQUIP_VALUE):
+            raise DemoRejected('first_round_not_pistol')
+
+        if trajectory_folder:
+            # Only demos that made it into the dataset, and best effort: the rounds are still good without them
+            stage('write_trajectories')
+            try:
+                _write_trajectories(ticks_df, demo_path, trajectory_folder, report['map_name'])
+            except Exception as e:
+                report['trajectory_error'] = f"{type(e).__name__}: {str(e)[:200]}"
+                logging.warning(f"Could not write the trajectories of {demo_path} to {trajectory_folder}: {e}")
+            del ticks_df
+
+    except DemoRejected as e:
+        report.update(status='failed', reason=str(e), failed_stage=current['stage'])
+        round_summary_df = pd.DataFrame()
+    except Exception as e:
+        report.update(status='failed', reason=f"{current['stage']}_error", failed_stage=current['stage'],
+                      exception=type(e).__name__, error=str(e)[:500])
+        round_summary_df = pd.DataFrame()
+    finally:
+        stage(None)
+        peak.close()
+        report['seconds'] = round(time.perf_counter() - start, 6)
 
-        if first['team_ct_current_equip_value'] <= 5500 and first['team_t_current_equip_value'] <= 5500:
-            return round_summary_df, []
-        else:
-            return fail()
+    return round_summary_df, report
 
-    except Exception as e:
-        return fail()
\ No newline at end of file
+def _worker_standalone(demo_path):
+    # (round_summary_df, [demo_path] on failure); see _worker_report for the details
+    round_summary_df, report = _worker_report(demo_path)
+    if report['status'] != 'ok':
+        return pd.DataFrame(), [demo_path]
+    return round_summary_df, []